@@ -0,0 +1,113 @@
+# benchmark of fuzzy pn matching, run it to see how fuzzy search scales with library size
+# run with parameters «--sizes N1,N2,...» to set numbers of generated components (4000,16000,64000 by default)
+#                     «--distance K» to set max edit distance (1 by default)
+# script exits with code 1 if time grows quadratically or faster with library size or transposed pn is not found
+
+import math
+import random
+import sys
+import time
+from typing import List
+
+import data_types
+import duplicates
+import pn_index
+
+# pn families of generated library, random tail is added to family
+families: List[str] = ['GRM155R71C', 'GRM188R61A', 'RC0402FR-07', 'TPS6', 'STM32F4', 'LM', 'BLM15', 'SN74LVC']
+footprints: List[str] = ['0402', '0603', 'SOT-23', 'QFN-16']
+symbols: str = '0123456789ABCDEFGHJKLMNPRSTUVWXYZ'
+# max exponent of time growth
+max_exponent: float = 1.8
+
+
+def get_library(size: int, seed: int = 1) -> List[data_types.Component]:
+    """
+    generates components with pns of several families and some typos in pns: replaced or transposed symbols
+    :param size: number of components
+    :param seed: random seed
+    :return: list of components
+    """
+    generator = random.Random(seed)
+    components: List[data_types.Component] = list()
+    for row in range(size):
+        if components and generator.random() < 0.1:
+            # typo in pn of existing component
+            pn: str = generator.choice(components).pn
+            position: int = generator.randrange(len(pn) - 1)
+            if generator.random() < 0.5:
+                pn = pn[:position] + generator.choice(symbols) + pn[position + 1:]
+            else:
+                pn = pn[:position] + pn[position + 1] + pn[position] + pn[position + 2:]
+        else:
+            pn = generator.choice(families) + ''.join(generator.choice(symbols) for _ in range(generator.randint(4, 8)))
+        component = data_types.Component(row=row, component_type=data_types.ComponentType.CHIP, pn=pn,
+                                         footprint=generator.choice(footprints), filename='generated.xlsx')
+        data_types.set_match_keys(component)
+        components.append(component)
+    return components
+
+
+def measure_pairwise(components: List[data_types.Component], pairs: int = 20000) -> float:
+    """
+    estimates time of comparing all pairs of components by edit distance
+    :param components: list of components
+    :param pairs: number of pairs to measure
+    :return: estimated time in s
+    """
+    start: float = time.perf_counter()
+    for index in range(pairs):
+        pn_index.get_edit_distance(components[index % len(components)].pn_key,
+                                   components[(index * 7 + 1) % len(components)].pn_key)
+    return (time.perf_counter() - start) / pairs * len(components) * (len(components) - 1) / 2
+
+
+def check_transposition() -> bool:
+    """
+    checks that pns with two transposed symbols are found with edit distance 1
+    :return: True if pair is found
+    """
+    components: List[data_types.Component] = list()
+    for (row, pn) in enumerate(['GRM155R71C104KA88D', 'GRM155R71C140KA88D']):
+        component = data_types.Component(row=row, component_type=data_types.ComponentType.CHIP, pn=pn,
+                                         footprint='0402', filename='generated.xlsx')
+        data_types.set_match_keys(component)
+        components.append(component)
+    found: bool = len(duplicates.compare_pns_fuzzy(components, 1)) == 1
+    print("transposed pn is %s" % ("found" if found else "not found"))
+    return found
+
+
+def main(sizes: List[int], max_distance: int) -> bool:
+    """
+    measures fuzzy search for libraries of sizes and prints results
+    :param sizes: numbers of components, increasing
+    :param max_distance: max edit distance
+    :return: True if time grows slower than quadratically
+    """
+    times: List[float] = list()
+    for size in sizes:
+        components: List[data_types.Component] = get_library(size)
+        start: float = time.perf_counter()
+        pairs: int = len(duplicates.compare_pns_fuzzy(components, max_distance))
+        times.append(time.perf_counter() - start)
+        print("%i components: index %.2f s, %i pairs, all pairs comparing %.2f s (estimated)" %
+              (size, times[-1], pairs, measure_pairwise(components)))
+    if not check_transposition():
+        return False
+    if len(sizes) < 2:
+        return True
+    # time ~ size ** exponent, it is measured between the smallest and the biggest library
+    exponent: float = math.log(times[-1] / times[0]) / math.log(sizes[-1] / sizes[0])
+    print("time growth exponent: %.2f, all pairs comparing: 2.00" % exponent)
+    return exponent < max_exponent
+
+
+if __name__ == '__main__':
+    library_sizes = [4000, 16000, 64000]
+    distance = 1
+    if '--sizes' in sys.argv[1:-1]:
+        library_sizes = [int(size) for size in sys.argv[sys.argv.index('--sizes') + 1].split(',')]
+    if '--distance' in sys.argv[1:-1]:
+        distance = int(sys.argv[sys.argv.index('--distance') + 1])
+    sys.exit(0 if main(library_sizes, distance) else 1)
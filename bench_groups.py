@@ -0,0 +1,95 @@
+# benchmark of grouping capacitors and resistors by value and footprint on generated library
+# compares grouping of components which builds columns from components for every comparison and grouping
+# of component table which columns are built once
+# run with parameters «--size N» to set number of generated components (200000 by default)
+#                     «--repeats N» to set number of comparisons of capacitors and resistors (3 by default)
+# script exits with code 1 if table grouping is not faster than grouping of components
+
+import random
+import sys
+import time
+from typing import List, Tuple, Dict
+
+import component_table
+import data_types
+import value_groups
+
+footprints: List[str] = ['0402', '0603', '0805', '1206', 'SOT-23']
+# values with units of capacitors
+capacitor_values: List[Tuple[float, int]] = [(1, data_types.CapUnits.N), (2.2, data_types.CapUnits.N),
+                                             (10, data_types.CapUnits.N), (100, data_types.CapUnits.N),
+                                             (22, data_types.CapUnits.PF), (1, data_types.CapUnits.U),
+                                             (4.7, data_types.CapUnits.U)]
+resistor_values: List[float] = [0, 10, 49.9, 100, 1000, 4700, 10000, 22000, 100000]
+# pf in capacitor unit
+unit_pfs: Dict[int, int] = {data_types.CapUnits.PF: 1, data_types.CapUnits.N: 1000, data_types.CapUnits.U: 1000000}
+
+
+def get_library(size: int, seed: int = 1) -> List[data_types.Component]:
+    """
+    generates capacitors, resistors and chips with random values and footprints
+    :param size: number of components
+    :param seed: random seed
+    :return: list of components
+    """
+    generator = random.Random(seed)
+    components: List[data_types.Component] = list()
+    for row in range(size):
+        kind: float = generator.random()
+        comp_type: data_types.ComponentType = data_types.ComponentType.CHIP
+        details = None
+        if kind < 0.4:
+            value, unit = generator.choice(capacitor_values)
+            comp_type = data_types.ComponentType.CAPACITOR
+            details = data_types.Capacitor(value=value, unit=unit, absolute_pf_value=value * unit_pfs[unit],
+                                           dielectric=[])
+        elif kind < 0.8:
+            comp_type = data_types.ComponentType.RESISTOR
+            details = data_types.Resistor(value=generator.choice(resistor_values), tolerance=1)
+        component = data_types.Component(row=row, component_type=comp_type, pn='PN%i' % row,
+                                         footprint=generator.choice(footprints), filename='generated.xlsx',
+                                         details=details)
+        data_types.set_match_keys(component)
+        components.append(component)
+    return components
+
+
+def main(size: int, repeats: int) -> bool:
+    """
+    measures grouping of components and of component table and prints results
+    :param size: number of components
+    :param repeats: number of comparisons of capacitors and resistors
+    :return: True if table grouping is faster
+    """
+    components: List[data_types.Component] = get_library(size)
+    comp_types = [data_types.ComponentType.CAPACITOR, data_types.ComponentType.RESISTOR]
+    start: float = time.perf_counter()
+    for _ in range(repeats):
+        component_groups = [value_groups.get_component_groups(components, comp_type) for comp_type in comp_types]
+    components_time: float = time.perf_counter() - start
+    start = time.perf_counter()
+    table = component_table.ComponentTable()
+    table.extend(components)
+    build_time: float = time.perf_counter() - start
+    start = time.perf_counter()
+    for _ in range(repeats):
+        table_groups = [value_groups.get_table_groups(table, comp_type) for comp_type in comp_types]
+    table_time: float = time.perf_counter() - start
+    if table_groups != component_groups:
+        print("groups of table differ from groups of components")
+        return False
+    print("%i components, %s, %i comparisons" %
+          (size, "NumPy" if value_groups.get_numpy() is not None else "python", repeats))
+    print("components: %.3f s, table: %.3f s (%.1f times faster), table is built once in %.3f s" %
+          (components_time, table_time, components_time / table_time, build_time))
+    return table_time < components_time
+
+
+if __name__ == '__main__':
+    library_size = 200000
+    comparisons = 3
+    if '--size' in sys.argv[1:-1]:
+        library_size = int(sys.argv[sys.argv.index('--size') + 1])
+    if '--repeats' in sys.argv[1:-1]:
+        comparisons = int(sys.argv[sys.argv.index('--repeats') + 1])
+    sys.exit(0 if main(library_size, comparisons) else 1)
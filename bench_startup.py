@@ -0,0 +1,91 @@
+# benchmark of entry point start time, run it to see import cost of every entry point
+# run with parameters «--runs N» to set number of measures (5 by default)
+# script exits with code 1 if import time of any entry point is bigger than its budget
+
+import os
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List, Tuple
+
+# import time budget of entry points in ms, interpreter start is not included
+budgets: Dict[str, float] = {'find_duplicates': 150, 'get_xlsx_diff': 150}
+# modules that must not be imported at start
+lazy_modules: List[str] = ['openpyxl', 'multiprocessing', 'numpy']
+
+
+def run_python(code: str, *options: str) -> Tuple[float, str]:
+    """
+    runs python code in new interpreter in the script folder
+    :param code: code to run
+    :param options: interpreter options
+    :return: wall time in ms, stderr of interpreter
+    """
+    start: float = time.perf_counter()
+    process = subprocess.run([sys.executable, *options, '-c', code], cwd=os.path.dirname(os.path.abspath(__file__)),
+                             stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True, check=True)
+    return 1000 * (time.perf_counter() - start), process.stderr
+
+
+def get_import_time(module: str) -> float:
+    """
+    gets cumulative import time of module reported by python -X importtime
+    :param module: module name
+    :return: import time in ms
+    """
+    _, importtime = run_python('import %s' % module, '-X', 'importtime')
+    for line in importtime.splitlines():
+        # import time: self [us] | cumulative | imported package
+        fields: List[str] = line.split('|')
+        if len(fields) == 3 and fields[2].strip() == module:
+            return int(fields[1]) / 1000
+    return 0.0
+
+
+def get_lazy_modules_loaded(module: str) -> List[str]:
+    """
+    gets heavy modules imported with the module
+    :param module: module name
+    :return: names of loaded modules that should be lazy
+    """
+    _, loaded = run_python('import sys, %s\nsys.stderr.write(" ".join(sys.modules))' % module)
+    return [lazy for lazy in lazy_modules if lazy in loaded.split()]
+
+
+def measure(module: str, runs: int) -> Tuple[float, float]:
+    """
+    measures start time of entry point
+    :param module: module name
+    :param runs: number of runs
+    :return: median import time in ms, median wall time of start without interpreter start in ms
+    """
+    empty: float = statistics.median(run_python('pass')[0] for _ in range(runs))
+    wall: float = statistics.median(run_python('import %s' % module)[0] for _ in range(runs))
+    import_time: float = statistics.median(get_import_time(module) for _ in range(runs))
+    return import_time, max(wall - empty, 0.0)
+
+
+def main(runs: int) -> bool:
+    """
+    measures all entry points and prints results
+    :param runs: number of runs
+    :return: True if all entry points are within budget
+    """
+    success: bool = True
+    for (module, budget) in budgets.items():
+        import_time, wall = measure(module, runs)
+        loaded: List[str] = get_lazy_modules_loaded(module)
+        status: str = 'OK' if import_time <= budget and not loaded else 'FAILED'
+        success = success and status == 'OK'
+        print("%s: import %.1f ms, start %.1f ms, budget %.0f ms %s" % (module, import_time, wall, budget, status))
+        if loaded:
+            print("%s imports at start: %s" % (module, ', '.join(loaded)))
+    return success
+
+
+if __name__ == '__main__':
+    runs_number = 5
+    if '--runs' in sys.argv[1:-1]:
+        runs_number = int(sys.argv[sys.argv.index('--runs') + 1])
+    sys.exit(0 if main(runs_number) else 1)
@@ -0,0 +1,187 @@
+# service module, on-disk cache of parsed BOMs for find_duplicates and get_xlsx_diff
+# cache entry is stored per BOM path and is valid while file size, mtime and content hash are the same
+# directory scans do not evict entries after every parced file, they evict once after all files are parced
+
+import hashlib
+import os
+import pickle
+import zlib
+from typing import List, Tuple, Optional, Any
+
+import data_types
+import xlsx_parce
+
+# bump if Component or parcing results change, old entries are ignored then
+cache_version = 7
+# empty BOM_CACHE_DIR environment variable disables cache
+cache_dir = os.environ.get('BOM_CACHE_DIR', os.path.join(os.path.expanduser('~'), '.cache', 'duplicate_bom'))
+# max size of all cache entries in bytes, the oldest entries are removed if exceeded
+max_cache_size = 256 * 1024 * 1024
+entry_ext = '.bomcache'
+
+ParceResult = Tuple[List[data_types.Component], str]
+
+
+def get_file_hash(filename: str) -> str:
+    """
+    gets hash of file content
+    :param filename: name of file
+    :return: hex digest
+    """
+    file_hash = hashlib.sha1()
+    with open(filename, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            file_hash.update(chunk)
+    return file_hash.hexdigest()
+
+
+def get_entry_name(filename: str, directory: str) -> str:
+    """
+    gets cache entry name for BOM file
+    :param filename: name of BOM
+    :param directory: cache directory
+    :return: path of cache entry
+    """
+    path_hash: str = hashlib.sha1(os.path.abspath(filename).encode('utf-8')).hexdigest()
+    return os.path.join(directory, path_hash + entry_ext)
+
+
+def read_entry(entry_name: str) -> Optional[Tuple[Any, ...]]:
+    """
+    reads cache entry
+    :param entry_name: path of cache entry
+    :return: entry data: version, size, mtime, hash, parce result or None if entry is absent or broken
+    """
+    try:
+        with open(entry_name, 'rb') as f:
+            entry = pickle.loads(zlib.decompress(f.read()))
+    except (OSError, zlib.error, pickle.UnpicklingError, EOFError, AttributeError, ImportError, ValueError):
+        return None
+    if not isinstance(entry, tuple) or len(entry) != 5 or entry[0] != cache_version:
+        return None
+    return entry
+
+
+def write_entry(entry_name: str, entry: Tuple[Any, ...]):
+    """
+    writes cache entry, uses temporary file to avoid broken entries
+    :param entry_name: path of cache entry
+    :param entry: entry data
+    :return:
+    """
+    tmp_name: str = '%s.%i.tmp' % (entry_name, os.getpid())
+    with open(tmp_name, 'wb') as f:
+        f.write(zlib.compress(pickle.dumps(entry, protocol=pickle.HIGHEST_PROTOCOL)))
+    os.replace(tmp_name, entry_name)
+
+
+def touch_entry(entry_name: str):
+    """
+    marks entry as recently used
+    :param entry_name: path of cache entry
+    :return:
+    """
+    try:
+        os.utime(entry_name)
+    except OSError:
+        pass
+
+
+def evict(directory: str, max_size: int):
+    """
+    removes least recently used entries while size of cache is bigger than max_size
+    :param directory: cache directory
+    :param max_size: max size of cache in bytes
+    :return:
+    """
+    entries: List[Tuple[float, int, str]] = list()
+    for name in os.listdir(directory):
+        if name.endswith(entry_ext):
+            try:
+                stat = os.stat(os.path.join(directory, name))
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, os.path.join(directory, name)))
+    total: int = sum(size for (_, size, _) in entries)
+    for (_, size, entry_name) in sorted(entries):
+        if total <= max_size:
+            break
+        try:
+            os.remove(entry_name)
+        except OSError:
+            pass
+        total -= size
+
+
+def evict_cache(directory: Optional[str] = None, max_size: Optional[int] = None):
+    """
+    removes least recently used entries of cache once after many BOMs were got without eviction
+    :param directory: cache directory, cache_dir if None
+    :param max_size: max size of cache in bytes, max_cache_size if None
+    :return:
+    """
+    directory = directory if directory is not None else cache_dir
+    if not directory or not os.path.isdir(directory):
+        return
+    try:
+        evict(directory, max_size if max_size is not None else max_cache_size)
+    except OSError:
+        pass
+
+
+def set_keys(result: ParceResult) -> ParceResult:
+    """
+    sets match keys of loaded components again, unpickled keys are equal but not interned
+    :param result: parce result from cache
+    :return: parce result
+    """
+    for component in result[0]:
+        data_types.set_match_keys(component)
+    return result
+
+
+def get_components_cached(filename: str, directory: Optional[str] = None, max_size: Optional[int] = None,
+                          evict_entries: bool = True) -> ParceResult:
+    """
+    gets component list from cache or parces BOM and stores result in cache
+    :param filename: name of BOM
+    :param directory: cache directory, cache_dir if None
+    :param max_size: max size of cache in bytes, max_cache_size if None
+    :param evict_entries: evict entries after new entry is written, False to call evict_cache once for many BOMs
+    :return: component list, warning str
+    """
+    directory = directory if directory is not None else cache_dir
+    max_size = max_size if max_size is not None else max_cache_size
+    if not directory:
+        # empty BOM_CACHE_DIR disables cache
+        return xlsx_parce.get_components_from_file(filename)
+    stat = os.stat(filename)
+    entry_name: str = get_entry_name(filename, directory)
+    entry = read_entry(entry_name)
+    file_hash: Optional[str] = None
+    if entry:
+        _, size, mtime, entry_hash, result = entry
+        if size == stat.st_size:
+            if mtime == stat.st_mtime_ns:
+                touch_entry(entry_name)
+                return set_keys(result)
+            # file was touched, but content may be the same
+            file_hash = get_file_hash(filename)
+            if file_hash == entry_hash:
+                try:
+                    write_entry(entry_name, (cache_version, stat.st_size, stat.st_mtime_ns, file_hash, result))
+                except OSError:
+                    pass
+                return set_keys(result)
+    if file_hash is None:
+        file_hash = get_file_hash(filename)
+    result: ParceResult = xlsx_parce.get_components_from_file(filename)
+    try:
+        os.makedirs(directory, exist_ok=True)
+        write_entry(entry_name, (cache_version, stat.st_size, stat.st_mtime_ns, file_hash, result))
+        if evict_entries:
+            evict(directory, max_size)
+    except OSError:
+        # cache is optional, BOM data is returned anyway
+        pass
+    return result
@@ -0,0 +1,95 @@
+# service module, lookup index of one BOM for comparing it with another BOM
+# components are found by (pn, footprint) or by (type, canonical value, footprint) in one dict lookup,
+# so pairing every component of one BOM with another BOM is linear
+
+from typing import List, Tuple, Dict, Optional
+
+import data_types
+
+PnKey = Tuple[str, str]
+ValueKey = Tuple[int, str, str]
+# type code of part key of components compared by pn
+pn_part = -1
+# (type code, canonical value, footprint) or (pn_part, pn, footprint)
+PartKey = Tuple[int, str, str]
+
+
+def get_part_key(component: data_types.Component) -> PartKey:
+    """
+    gets key of the same components of different BOMs: parametrized component with value is compared by value and
+    footprint, others by pn and footprint
+    zero is value of resistor only (0R), capacitor without value has zero value after parsing and is compared by pn
+    :param component: component
+    :return: key
+    """
+    if component.component_type in data_types.parametrized and component.value_key:
+        return component.type_code, component.value_key, component.footprint_key
+    return pn_part, component.pn_key, component.footprint_key
+
+
+def count_parts(components: List[data_types.Component]) \
+        -> Tuple[Dict[PartKey, data_types.Component], Dict[PartKey, int]]:
+    """
+    counts parts of BOM, quantity of part is the number of designators of all its rows
+    components without pn and value are not counted
+    :param components: list of components
+    :return: the first component of every part, quantity of every part, parts are in the order of components
+    """
+    parts: Dict[PartKey, data_types.Component] = dict()
+    quantities: Dict[PartKey, int] = dict()
+    for component in components:
+        key: PartKey = get_part_key(component)
+        if not key[1]:
+            continue
+        parts.setdefault(key, component)
+        quantities[key] = quantities.get(key, 0) + len(component.designator)
+    return parts, quantities
+
+
+class BomIndex:
+    """
+    index of BOM components by normalized keys, the first component of BOM is kept for every key
+    """
+
+    def __init__(self, components: List[data_types.Component]):
+        self.components: List[data_types.Component] = components
+        # lower pn and footprint of every component
+        self.pns: Dict[PnKey, data_types.Component] = dict()
+        # type code, canonical value and lower footprint of parametrized components with value
+        self.values: Dict[ValueKey, data_types.Component] = dict()
+        for component in components:
+            self.pns.setdefault((component.pn_key, component.footprint_key), component)
+            if component.component_type in data_types.parametrized and component.value_key:
+                self.values.setdefault((component.type_code, component.value_key, component.footprint_key), component)
+
+    def get_by_pn(self, pn_key: str, footprint_key: str) -> Optional[data_types.Component]:
+        """
+        finds component by pn and footprint
+        :param pn_key: lower pn
+        :param footprint_key: lower footprint without spaces around
+        :return: component or None
+        """
+        return self.pns.get((pn_key, footprint_key))
+
+    def get_by_value(self, comp_type: data_types.ComponentType, value_key: str, footprint_key: str) \
+            -> Optional[data_types.Component]:
+        """
+        finds capacitor, resistor or inductor by value and footprint
+        :param comp_type: type of component
+        :param value_key: canonical value: 100pf, 4700R
+        :param footprint_key: lower footprint without spaces around
+        :return: component or None
+        """
+        return self.values.get((comp_type.value, value_key, footprint_key))
+
+    def find(self, key_component: data_types.Component) -> Optional[data_types.Component]:
+        """
+        finds the same component: parametrized component with value by value and footprint, others by pn and
+        footprint
+        :param key_component: component to find, possibly from another BOM
+        :return: component or None
+        """
+        key: PartKey = get_part_key(key_component)
+        if key[0] == pn_part:
+            return self.get_by_pn(key[1], key[2])
+        return self.values.get(key)
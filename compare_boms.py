@@ -1,10 +1,21 @@
 # service module for comparing boms
 
+import dataclasses
+import sys
+from dataclasses import dataclass
 import data_types
-from typing import List, Tuple, Union, Optional, Any
-import duplicates
+from typing import List, Tuple, Union, Optional, Callable, Dict, Hashable
+from bom_index import BomIndex, PartKey, pn_part, count_parts
+from component_table import ComponentTable
+from designators import Designators
+from diff_result import DiffResult, DiffRecord, DiffKind, component_category, render_text
+from data_types import format_value
 
 ParamData = Tuple[Union[float, str], str]
+# category of compared part by type code of its key
+part_categories: Dict[int, str] = {pn_part: 'partnumbers', data_types.ComponentType.CAPACITOR.value: 'capacitors',
+                                   data_types.ComponentType.RESISTOR.value: 'resistors',
+                                   data_types.ComponentType.INDUCTOR.value: 'inductors'}
 
 
 def get_comp_list_precise(components: List[data_types.Component]) -> Tuple[List[ParamData], List[ParamData],
@@ -16,19 +27,43 @@ def get_comp_list_precise(components: List[data_types.Component]) -> Tuple[List[
     """
     pns: List[Tuple[str, str]] = [(component.pn, component.footprint) for component in components
                                   if component.component_type not in data_types.parametrized]
-    capacitors: List[Tuple[str, str]] = [(str(component.details.absolute_pf_value) + 'pf', component.footprint)
-                                         for component in components
-                                         if component.component_type == data_types.ComponentType.CAPACITOR]
-    resistors: List[Tuple[Union[float, str], str]] = [(str(component.details.value) + 'R', component.footprint)
+    capacitors: List[Tuple[str, str]] = [(component.value_key, component.footprint) for component in components
+                                         if component.component_type == data_types.ComponentType.CAPACITOR
+                                         and component.value_key]
+    resistors: List[Tuple[Union[float, str], str]] = [(component.value_key, component.footprint)
                                                       for component in components
                                                       if component.component_type == data_types.ComponentType.RESISTOR
-                                                      and component.details.value != -1]
+                                                      and component.value_key]
     inductors: List[Tuple[Union[float, str], str]] = [(component.details.value, component.footprint)
                                                       for component in components
                                                       if component.component_type == data_types.ComponentType.INDUCTOR]
     return pns, capacitors, resistors, inductors
 
 
+def get_comp_list_precise_table(table: ComponentTable) -> Tuple[List[ParamData], List[ParamData],
+                                                                List[ParamData], List[ParamData]]:
+    """
+    gets lists of partnumbers, capacitors, inductors, resistors with their footprints from component table
+    :param table: component table
+    :return: list of pn+fp, cap+fp, res+fp, ind+fp
+    """
+    pns: List[ParamData] = list()
+    capacitors: List[ParamData] = list()
+    resistors: List[ParamData] = list()
+    inductors: List[ParamData] = list()
+    for index in range(len(table)):
+        comp_type: data_types.ComponentType = table.get_type(index)
+        if comp_type not in data_types.parametrized:
+            pns.append((table.get_pn(index), table.get_footprint(index)))
+        elif comp_type == data_types.ComponentType.CAPACITOR and table.values[index] == table.values[index]:
+            capacitors.append((format_value(table.values[index]) + 'pf', table.get_footprint(index)))
+        elif comp_type == data_types.ComponentType.RESISTOR and table.values[index] == table.values[index]:
+            resistors.append((format_value(table.values[index]) + 'R', table.get_footprint(index)))
+        elif comp_type == data_types.ComponentType.INDUCTOR:
+            inductors.append((table.get_inductor_value(index), table.get_footprint(index)))
+    return pns, capacitors, resistors, inductors
+
+
 def check_component(component: data_types.Component) -> bool:
     """
     checks if compoment is correct
@@ -41,127 +76,174 @@ def check_component(component: data_types.Component) -> bool:
     return True
 
 
-def get_diff(first: List[Any], second: List[Any]):
+def get_part_record(kind: DiffKind, key: PartKey, component: data_types.Component) -> DiffRecord:
     """
-    gets difference between two sets
-    :param first: first set
-    :param second: second set
-    :return: two sets, one first without secons and then vice versa
+    gets record of compared part
+    :param kind: kind of record
+    :param key: part key
+    :param component: the first component of part
+    :return: record without rows and quantities
     """
-    f_set = set(first)
-    s_set = set(second)
-    return f_set.difference(s_set), s_set.difference(f_set)
+    return DiffRecord(kind=kind, category=part_categories.get(key[0], component_category),
+                      key=component.pn if key[0] == pn_part else component.value_key,
+                      footprint=component.footprint, title=get_pn(component))
 
 
-def get_diff_data(first: List[ParamData], second: List[ParamData], type_str: str, deleted: bool) -> \
-        Tuple[set, set, str]:
+def get_bom_diff(old: 'Bom', new: 'Bom') -> DiffResult:
     """
-    prints added and deleted elements of two lists
-    :param deleted: print or not deleted positions
-    :param first: list with first data
-    :param second: list with second data
-    :param type_str: description of data compared
-    :return: result of diff
+    compares two BOMs as counted parts: pns, capacitor, resistor and inductor values with footprints
+    every part of both BOMs is looked up once, quantity of part is summed over all its rows
+    :param old: list of old components or normalized old BOM
+    :param new: list of new components or normalized new BOM
+    :return: result with added and removed parts sorted by key and parts with changed quantity in the order of old rows
     """
-    plus, minus = get_diff(second, first)
-    res = ""
-    if plus:
-        res += "Added %s in second file:" % type_str
-        res += str(plus)
-    if deleted and minus:
-        res += " Deleted %s in second file:" % type_str
-        res += str(minus)
-    return plus, minus, res
+    old = get_normalized(old)
+    new = get_normalized(new)
+    result = DiffResult(old.filename, new.filename)
+    result.compared = True
+    added: List[DiffRecord] = list()
+    removed: List[DiffRecord] = list()
+    changed: List[DiffRecord] = list()
+    for (key, quantity) in old.quantities.items():
+        new_quantity: Optional[int] = new.quantities.get(key)
+        if new_quantity == quantity:
+            continue
+        record: DiffRecord = get_part_record(DiffKind.REMOVED if new_quantity is None else DiffKind.CHANGED, key,
+                                             old.parts[key])
+        record.old_row = old.parts[key].row
+        record.old_quantity = quantity
+        if new_quantity is None:
+            removed.append(record)
+            continue
+        record.new_row = new.parts[key].row
+        record.new_quantity = new_quantity
+        record.changes.append("Quantity changed: was %i, now %i" % (quantity, new_quantity))
+        changed.append(record)
+    for (key, quantity) in new.quantities.items():
+        if key not in old.quantities:
+            record = get_part_record(DiffKind.ADDED, key, new.parts[key])
+            record.new_row = new.parts[key].row
+            record.new_quantity = quantity
+            added.append(record)
+    for records in (added, removed):
+        result.records.extend(sorted(records, key=lambda x: (x.key, x.footprint)))
+    result.records.extend(sorted(changed, key=lambda x: x.old_row))
+    return result
 
 
-def find_new_pns(old: List[data_types.Component], new: List[data_types.Component], deleted: bool):
+def find_new_pns(old: 'Bom', new: 'Bom', deleted: bool):
     """
     compare two lists to find new positions
     :param deleted: print or not deleted positions
-    :param old: list of old components
-    :param new: list of new components
+    :param old: list of old components or normalized old BOM
+    :param new: list of new components or normalized new BOM
     :return:
     """
-    old_pn, old_cap, old_res, old_ind = get_comp_list_precise(old)
-    new_pn, new_cap, new_res, new_ind = get_comp_list_precise(new)
-    print("COMPONENT DIFFERENCE:\n")
-    _, _, str_pn = get_diff_data(old_pn, new_pn, "partnumbers", deleted)
-    _, _, str_cap = get_diff_data(old_cap, new_cap, "capacitors", deleted)
-    _, _, str_res = get_diff_data(old_res, new_res, "resistors", deleted)
-    _, _, str_ind = get_diff_data(old_ind, new_ind, "inductors", deleted)
-    print(str_pn + '\n' + str_cap + '\n' + str_res + '\n' + str_ind + '\n')
-
-
-def join_the_same(components: List[data_types.Component]):
-    """
-    joins the same components and changes list at the place
-    :param components: 
-    :return: 
-    """
-    similar, _, _, _ = duplicates.compare_pns(components, precise=True)
-    similar_sorted: List[Tuple[str, int, int, str, int, int]] = sorted(similar, key=lambda x: x[3], reverse=True)
-    # res_sorted: List[Tuple[str, int, int, str, int, int]] = sorted(similar, key=lambda x: x[3], reverse=True)
-    # cap_sorted: List[Tuple[str, int, int, str, int, int]] = sorted(similar, key=lambda x: x[3], reverse=True)
-    for pair in similar_sorted:
-        first_index: int = pair[2]
-        second_index: int = pair[5]
-        components[first_index].designator.extend(components[second_index].designator)
-        components[first_index].description += components[second_index].description
-    for pair in similar_sorted:
-        components.pop(pair[5])
-    similar_cap = duplicates.compare_capacitors(components)
-    similar_cap_sorted: List[Tuple[str, str, int, str, str, int]] = sorted(similar_cap, key=lambda x: x[1],
-                                                                           reverse=True)
-    for pair in similar_cap_sorted:
-        first_index: int = components.index([component for component in components if component.row == pair[2]][0])
-        second_index: int = components.index([component for component in components if component.row == pair[5]][0])
-        components[first_index].designator.extend(components[second_index].designator)
-        components[first_index].description += components[second_index].description
-    for pair in similar_cap:
-        second_index: int = components.index([component for component in components if component.row == pair[5]][0])
-        components.pop(second_index)
-    similar_res = duplicates.compare_resistors(components)
-    similar_res_sorted: List[Tuple[str, str, int, str, str, int]] = sorted(similar_res, key=lambda x: x[1],
-                                                                           reverse=True)
-    for pair in similar_res_sorted:
-        first_index: int = components.index([component for component in components if component.row == pair[2]][0])
-        second_index: int = components.index([component for component in components if component.row == pair[5]][0])
-        components[first_index].designator.extend(components[second_index].designator)
-        components[first_index].description += components[second_index].description
-    for pair in similar_res:
-        second_index: int = components.index([component for component in components if component.row == pair[5]][0])
-        components.pop(second_index)
-
-
-def find_components_in_list(key_component: data_types.Component, components: List[data_types.Component]) \
+    render_text(get_bom_diff(old, new), sys.stdout, deleted)
+
+
+def join_by_key(components: List[data_types.Component],
+                get_key: Callable[[data_types.Component], Optional[Hashable]]) -> List[data_types.Component]:
+    """
+    joins components with the same key into the first of them, designators and descriptions are added in the order
+    of components, components are not changed: joined component is a copy
+    :param components: list of components
+    :param get_key: function that gets key of component or None if component is not joined
+    :return: new list of components
+    """
+    joined: List[data_types.Component] = list()
+    first_components: Dict[Hashable, data_types.Component] = dict()
+    for component in components:
+        key: Optional[Hashable] = get_key(component)
+        if key is None:
+            joined.append(component)
+            continue
+        first: Optional[data_types.Component] = first_components.get(key)
+        if first is None:
+            first = dataclasses.replace(component, designator=component.designator.copy(),
+                                        rows=list(component.rows or [component.row]))
+            first_components[key] = first
+            joined.append(first)
+        else:
+            first.designator.extend(component.designator)
+            first.description += component.description
+            first.rows.extend(component.rows or [component.row])
+    return joined
+
+
+def get_value_key(comp_type: data_types.ComponentType) \
+        -> Callable[[data_types.Component], Optional[Tuple[str, str]]]:
+    """
+    gets function that gets join key of capacitor or resistor: value and footprint
+    :param comp_type: capacitor or resistor
+    :return: function
+    """
+    return lambda component: (component.value_key, component.footprint_key) \
+        if component.component_type == comp_type and component.value_key else None
+
+
+def join_the_same(components: List[data_types.Component]) -> List[data_types.Component]:
+    """
+    joins components with the same pn, then capacitors and resistors with the same value and footprint
+    :param components: list of components, it is not changed
+    :return: new list of components, joined component has row of the first component and rows of all its components
+    """
+    joined: List[data_types.Component] = join_by_key(components,
+                                                     lambda component: component.pn_key if component.pn else None)
+    joined = join_by_key(joined, get_value_key(data_types.ComponentType.CAPACITOR))
+    return join_by_key(joined, get_value_key(data_types.ComponentType.RESISTOR))
+
+
+@dataclass(frozen=True, **data_types.slots)
+class NormalizedBom:
+    """
+    BOM prepared for comparing: parsed components, joined components with their index and compared keys
+    it is made once and compared with any number of other BOMs, parsed components are not changed
+    """
+    filename: str
+    components: Tuple[data_types.Component, ...]
+    joined: Tuple[data_types.Component, ...]
+    index: BomIndex
+    # the first component and summed quantity of every part by part key
+    parts: Dict[PartKey, data_types.Component]
+    quantities: Dict[PartKey, int]
+
+
+# parsed components or normalized BOM
+Bom = Union[List[data_types.Component], NormalizedBom]
+
+
+def normalize_bom(components: List[data_types.Component], filename: str = "") -> NormalizedBom:
+    """
+    joins the same components of BOM, gets their keys and counts parts
+    :param components: parsed components
+    :param filename: name of BOM file
+    :return: normalized BOM
+    """
+    joined: List[data_types.Component] = join_the_same(components)
+    parts, quantities = count_parts(components)
+    return NormalizedBom(filename=filename, components=tuple(components), joined=tuple(joined),
+                         index=BomIndex(joined), parts=parts, quantities=quantities)
+
+
+def get_normalized(bom: Bom) -> NormalizedBom:
+    """
+    gets normalized BOM, BOM that is already normalized is not normalized again
+    :param bom: parsed components or normalized BOM
+    :return: normalized BOM
+    """
+    return bom if isinstance(bom, NormalizedBom) else normalize_bom(bom)
+
+
+def find_components_in_list(key_component: data_types.Component, index: BomIndex) \
         -> Optional[data_types.Component]:
     """
-    finds component in components and returns its index
+    finds component in indexed components
     :param key_component: component to find
-    :param components: list of components
+    :param index: index of components
     :return: component or None
     """
-    if key_component.component_type not in data_types.parametrized or not key_component.details.value:
-        for component in components:
-            if component.pn.lower() == key_component.pn.lower():
-                if component.footprint.lower() == key_component.footprint.lower():
-                    return component
-        return None
-    same_time_components = [component for component in components
-                            if component.component_type == key_component.component_type]
-    if key_component.component_type == data_types.ComponentType.CAPACITOR:
-        for component in same_time_components:
-            if component.details.absolute_pf_value == key_component.details.absolute_pf_value:
-                if component.footprint == key_component.footprint:
-                    return component
-        return None
-    if key_component.component_type in [data_types.ComponentType.RESISTOR, data_types.ComponentType.INDUCTOR]:
-        for component in same_time_components:
-            if component.details.value == key_component.details.value and component.details.value != -1:
-                if component.footprint == key_component.footprint:
-                    if component.component_type == key_component.component_type:
-                        return component
-        return None
+    return index.find(key_component)
 
 
 def get_pn(component: data_types.Component) -> str:
@@ -180,47 +262,61 @@ def get_pn(component: data_types.Component) -> str:
                                                       component.footprint)
 
 
-def detail_compare(old: List[data_types.Component], new: List[data_types.Component], only_quantity: False):
+def get_detail_diff(old: Bom, new: Bom, only_quantity: bool = False) -> DiffResult:
     """
-    compare two list
-    :param only_quantity: if True warning shows only quantity difference
-    :param old: list with first componentns
-    :param new: list with second components
-    :return:
+    compares the same components of two BOMs
+    :param only_quantity: if True only quantity difference is got
+    :param old: list with first componentns or normalized first BOM
+    :param new: list with second components or normalized second BOM
+    :return: result with changed components in the order of old rows
     """
-    join_the_same(old)
-    join_the_same(new)
-    if not only_quantity:
-        print("DETAILED COMPARING THE SAME POSITIONS:\n")
-    else:
-        print("QUANTITY CHANGED")
-    old_sorted = sorted(old, key=lambda x: x.row)
+    old = get_normalized(old)
+    new = get_normalized(new)
+    result = DiffResult(old.filename, new.filename)
+    result.detailed = not only_quantity
+    old_sorted = sorted(old.joined, key=lambda x: x.row)
     for component in old_sorted:
-        paired = find_components_in_list(component, new)
+        paired = find_components_in_list(component, new.index)
+        record = DiffRecord(kind=DiffKind.CHANGED, category=component_category,
+                            key=component.pn or component.value_key, footprint=component.footprint,
+                            title=get_pn(component), old_row=component.row, old_quantity=len(component.designator))
         if paired:
-            warning = ""
+            record.new_row = paired.row
+            record.new_quantity = len(paired.designator)
             if only_quantity:
                 if len(component.designator) != len(paired.designator):
-                    warning += "Quantity changed: was %i, now %i" % (len(component.designator), len(paired.designator))
+                    record.changes.append("Quantity changed: was %i, now %i" %
+                                          (len(component.designator), len(paired.designator)))
             else:
                 if component.component_type != paired.component_type:
-                    warning += "Type: was %s and now %s\n" % \
-                               (component.component_type.name, paired.component_type.name)
+                    record.changes.append("Type: was %s and now %s" %
+                                          (component.component_type.name, paired.component_type.name))
                 if component.manufacturer != paired.manufacturer:
-                    warning += "Manufacturer: was %s and now %s\n" % (component.manufacturer, paired.manufacturer)
-
-                plus, minus = get_diff(component.designator, paired.designator)
+                    record.changes.append("Manufacturer: was %s and now %s" %
+                                          (component.manufacturer, paired.manufacturer))
+                plus: Designators = component.designator.difference(paired.designator)
+                minus: Designators = paired.designator.difference(component.designator)
                 if plus:
-                    warning += "Following designators added: %s\n" % ", ".join(plus)
+                    record.changes.append("Following designators added: %s" % plus)
                 if minus:
-                    warning += "Following designators removed: %s\n" % ", ".join(minus)
+                    record.changes.append("Following designators removed: %s" % minus)
                 if component.description.lower() != paired.description.lower():
-                    warning += "Description: was %s and now %s\n" % (component.description, paired.description)
-            if warning:
-                print("For %s, former row %i, new row %i changes are the following: \n" %
-                      (get_pn(component), component.row, paired.row) + warning)
-        if not paired:
-            if check_component(component):
-                print("For %s, former row %i changes are the following:" %
-                      (get_pn(component), component.row))
-                print("Quantity changed: was %i, now 0" % len(component.designator))
+                    record.changes.append("Description: was %s and now %s" %
+                                          (component.description, paired.description))
+        elif check_component(component):
+            record.new_quantity = 0
+            record.changes.append("Quantity changed: was %i, now 0" % len(component.designator))
+        if record.changes:
+            result.add(record)
+    return result
+
+
+def detail_compare(old: Bom, new: Bom, only_quantity: False):
+    """
+    compare two list and prints changed components
+    :param only_quantity: if True warning shows only quantity difference
+    :param old: list with first componentns or normalized first BOM
+    :param new: list with second components or normalized second BOM
+    :return:
+    """
+    render_text(get_detail_diff(old, new, only_quantity), sys.stdout)
@@ -0,0 +1,206 @@
+# module with column oriented component storage for comparing big BOM libraries
+# components are stored in arrays: type codes, values, footprint and pn ids, designators and alternative pns
+# are kept in shared string pools, so a library is kept without Component instance for every row
+# capacitors and resistors of table are compared by value and footprint key like components, pns are compared
+# by components only
+
+from array import array
+from typing import List, Dict, Iterable, Optional, Tuple, Any
+
+import data_types
+import xlsx_parce
+
+# value of components without numeric value (not resistor or capacitor, component without value key)
+no_value = float('nan')
+
+
+class StringPool:
+    """
+    pool of unique strings, every string is stored once and referenced by id
+    """
+
+    def __init__(self):
+        self.strings: List[str] = list()
+        self.ids: Dict[str, int] = dict()
+
+    def add(self, string: str) -> int:
+        """
+        adds string to pool
+        :param string: string to add
+        :return: id of string
+        """
+        string_id: Optional[int] = self.ids.get(string)
+        if string_id is None:
+            string_id = len(self.strings)
+            self.ids[string] = string_id
+            self.strings.append(string)
+        return string_id
+
+    def __getitem__(self, string_id: int) -> str:
+        return self.strings[string_id]
+
+    def __len__(self) -> int:
+        return len(self.strings)
+
+
+class ComponentTable:
+    """
+    column oriented table of components, components must have match keys
+    values are resistor values in ohms and capacitor values in pfs, value texts are values as components print them
+    footprint keys have own pool, so their ids are in the order of first component with footprint key
+    """
+
+    def __init__(self):
+        self.rows = array('l')
+        self.type_codes = array('b')
+        self.values = array('d')
+        self.file_ids = array('l')
+        self.pn_ids = array('l')
+        self.footprint_ids = array('l')
+        self.footprint_key_ids = array('l')
+        self.value_text_ids = array('l')
+        # inductor values are strings
+        self.inductor_value_ids = array('l')
+        self.designator_ids = array('l')
+        self.designator_offsets = array('l', [0])
+        self.alt_ids = array('l')
+        self.alt_offsets = array('l', [0])
+        self.files = StringPool()
+        self.strings = StringPool()
+        self.footprint_keys = StringPool()
+        # NumPy arrays of grouping columns, they are made by value_groups
+        self.numpy_columns: Optional[Tuple[Any, Any, Any]] = None
+
+    def append(self, component: data_types.Component):
+        """
+        adds component to table
+        :param component: component to add
+        :return:
+        """
+        self.numpy_columns = None
+        self.rows.append(component.row)
+        self.type_codes.append(component.component_type.value)
+        value: float = no_value
+        value_text_id: int = -1
+        inductor_value_id: int = -1
+        if component.component_type == data_types.ComponentType.CAPACITOR and component.value_key:
+            value = component.details.absolute_pf_value
+            value_text_id = self.strings.add(str(component.details.value) +
+                                             data_types.units_cap[component.details.unit])
+        elif component.component_type == data_types.ComponentType.RESISTOR and component.value_key:
+            value = component.details.value
+            value_text_id = self.strings.add(str(component.details.value) + 'R')
+        elif component.component_type == data_types.ComponentType.INDUCTOR and component.details \
+                and component.details.value is not None:
+            inductor_value_id = self.strings.add(str(component.details.value))
+        self.values.append(value)
+        self.value_text_ids.append(value_text_id)
+        self.inductor_value_ids.append(inductor_value_id)
+        self.file_ids.append(self.files.add(component.filename))
+        self.pn_ids.append(self.strings.add(component.pn))
+        self.footprint_ids.append(self.strings.add(component.footprint))
+        self.footprint_key_ids.append(self.footprint_keys.add(component.footprint_key))
+        self.designator_ids.extend(self.strings.add(designator) for designator in component.designator)
+        self.designator_offsets.append(len(self.designator_ids))
+        self.alt_ids.extend(self.strings.add(alt) for alt in component.pn_alt)
+        self.alt_offsets.append(len(self.alt_ids))
+
+    def extend(self, components: Iterable[data_types.Component]):
+        """
+        adds components to table
+        :param components: components to add
+        :return:
+        """
+        for component in components:
+            self.append(component)
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def get_type(self, index: int) -> data_types.ComponentType:
+        """
+        gets type of component
+        :param index: index of component
+        :return: component type
+        """
+        return data_types.ComponentType(self.type_codes[index])
+
+    def get_filename(self, index: int) -> str:
+        """
+        gets BOM name of component
+        :param index: index of component
+        :return: BOM name
+        """
+        return self.files[self.file_ids[index]]
+
+    def get_pn(self, index: int) -> str:
+        """
+        gets pn of component
+        :param index: index of component
+        :return: pn
+        """
+        return self.strings[self.pn_ids[index]]
+
+    def get_footprint(self, index: int) -> str:
+        """
+        gets footprint of component
+        :param index: index of component
+        :return: footprint
+        """
+        return self.strings[self.footprint_ids[index]]
+
+    def get_value_text(self, index: int) -> Optional[str]:
+        """
+        gets value of capacitor or resistor with unit as component prints it
+        :param index: index of component
+        :return: value or None
+        """
+        value_id: int = self.value_text_ids[index]
+        return self.strings[value_id] if value_id != -1 else None
+
+    def get_inductor_value(self, index: int) -> Optional[str]:
+        """
+        gets value of inductor
+        :param index: index of component
+        :return: value or None
+        """
+        value_id: int = self.inductor_value_ids[index]
+        return self.strings[value_id] if value_id != -1 else None
+
+    def get_designators(self, index: int) -> List[str]:
+        """
+        gets designators of component
+        :param index: index of component
+        :return: list of designators
+        """
+        return [self.strings[string_id] for string_id in
+                self.designator_ids[self.designator_offsets[index]:self.designator_offsets[index + 1]]]
+
+    def get_alternatives(self, index: int) -> List[str]:
+        """
+        gets alternative pns of component
+        :param index: index of component
+        :return: list of alternative pns
+        """
+        return [self.strings[string_id] for string_id in
+                self.alt_ids[self.alt_offsets[index]:self.alt_offsets[index + 1]]]
+
+    def get_indexes(self, comp_type: data_types.ComponentType) -> List[int]:
+        """
+        gets indexes of all components of type
+        :param comp_type: type of component
+        :return: list of indexes
+        """
+        return [index for (index, type_code) in enumerate(self.type_codes) if type_code == comp_type.value]
+
+
+def get_table_from_files(filenames: Iterable[str]) -> ComponentTable:
+    """
+    parces BOMs into one component table, components of one file only exist at the same time
+    :param filenames: names of BOMs
+    :return: component table
+    """
+    table = ComponentTable()
+    for filename in filenames:
+        table.extend(xlsx_parce.get_components_from_file(filename)[0])
+    return table
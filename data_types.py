@@ -1,9 +1,14 @@
 # module with data types for comparing boms
+import math
+import re
+import sys
 from enum import Enum
-from typing import List, Union, Optional
+from typing import List, Union, Optional, Tuple
 
 from dataclasses import dataclass, field
 
+from designators import Designators
+
 dielectrics = ['np0', 'x5r', 'x7r', 'x5r or x7r']
 units_cap = ['u', 'n', 'pf']
 types = ['resistor', 'capacitor', 'crystal', 'inductor', 'diode', 'chip', 'module', 'emifil', 'connector', 'button',
@@ -11,6 +16,16 @@ types = ['resistor', 'capacitor', 'crystal', 'inductor', 'diode', 'chip', 'modul
 the_same = {'ic': 'chip', 'chip': 'ic', 'emi_filter': 'inductor',
             'inductor': 'emi_filter', 'diode': 'esd', 'esd': 'diode'}
 units = {'resistor': 'R', 'inductor': ''}
+# preferred values of resistors in decade
+e_series = {'e24': [1.0, 1.1, 1.2, 1.3, 1.5, 1.6, 1.8, 2.0, 2.2, 2.4, 2.7, 3.0, 3.3, 3.6, 3.9, 4.3, 4.7, 5.1, 5.6, 6.2,
+                    6.8, 7.5, 8.2, 9.1],
+            'e96': [1.00, 1.02, 1.05, 1.07, 1.10, 1.13, 1.15, 1.18, 1.21, 1.24, 1.27, 1.30, 1.33, 1.37, 1.40, 1.43,
+                    1.47, 1.50, 1.54, 1.58, 1.62, 1.65, 1.69, 1.74, 1.78, 1.82, 1.87, 1.91, 1.96, 2.00, 2.05, 2.10,
+                    2.15, 2.21, 2.26, 2.32, 2.37, 2.43, 2.49, 2.55, 2.61, 2.67, 2.74, 2.80, 2.87, 2.94, 3.01, 3.09,
+                    3.16, 3.24, 3.32, 3.40, 3.48, 3.57, 3.65, 3.74, 3.83, 3.92, 4.02, 4.12, 4.22, 4.32, 4.42, 4.53,
+                    4.64, 4.75, 4.87, 4.99, 5.11, 5.23, 5.36, 5.49, 5.62, 5.76, 5.90, 6.04, 6.19, 6.34, 6.49, 6.65,
+                    6.81, 6.98, 7.15, 7.32, 7.50, 7.68, 7.87, 8.06, 8.25, 8.45, 8.66, 8.87, 9.09, 9.31, 9.53, 9.76]}
+tolerance_grammar = re.compile(r'\s*(?P<number>\d+(?:\.\d*)?|\.\d+)\s*(?P<percent>%)?')
 
 
 class ComponentType(Enum):
@@ -44,27 +59,38 @@ class Dielectric(Enum):
     X7R = 2
 
 
+# records have no instance __dict__ where dataclasses support slots (python 3.10+), it saves memory for big libraries
+slots = {'slots': True} if sys.version_info >= (3, 10) else dict()
+
+
 class CapUnits:
     U = 0
     N = 1
     PF = 2
 
 
-@dataclass
+@dataclass(**slots)
 class Component:
     row: int
     component_type: ComponentType
     pn: str = ""
     footprint: str = ""
     manufacturer: str = ""
-    filename = ""
+    filename: str = field(default="", compare=False)
     pn_alt: List[str] = field(default_factory=list)
-    designator: List[str] = field(default_factory=list)
+    designator: Designators = field(default_factory=Designators)
     description: str = ""
     details: Optional[Union['Capacitor', 'Inductor', 'Resistor']] = None
+    # source rows of component made by compare_boms.join_the_same, empty for parsed component
+    rows: List[int] = field(default_factory=list, compare=False, repr=False)
+    # normalized interned keys for comparing, set by set_match_keys once component is parsed
+    pn_key: str = field(default="", compare=False, repr=False)
+    footprint_key: str = field(default="", compare=False, repr=False)
+    value_key: str = field(default="", compare=False, repr=False)
+    type_code: int = field(default=-1, compare=False, repr=False)
 
 
-@dataclass
+@dataclass(**slots)
 class Capacitor:
     value: float
     unit: CapUnits
@@ -74,12 +100,94 @@ class Capacitor:
     tolerance: Optional[float] = 1.0
 
 
-@dataclass
+@dataclass(**slots)
 class Resistor:
     value: float
     tolerance: 1
 
 
-@dataclass
+@dataclass(**slots)
 class Inductor:
     value: str
+
+
+@dataclass(**slots)
+class DuplicateGroup:
+    members: List[Component]
+    # (member index, member index, reason), reason is kind of duplicate: equal, similar, alternative, capacitors...
+    links: List[Tuple[int, int, str]] = field(default_factory=list)
+
+
+def format_value(value: Union[float, int]) -> str:
+    """
+    gets canonical str of numeric value, integer values have no fraction: 4700 and 4700.0 are 4700
+    :param value: value
+    :return: str of value
+    """
+    value = float(value)
+    return str(int(value)) if value.is_integer() else str(value)
+
+
+def get_value_key(component: Component) -> str:
+    """
+    gets canonical value of parametrized component: capacitor value in pfs, resistor value in ohms, inductor value
+    :param component: component
+    :return: value key or empty str if component has no value
+    """
+    if not component.details:
+        return ""
+    if component.component_type == ComponentType.CAPACITOR:
+        return format_value(component.details.absolute_pf_value) + 'pf' \
+            if component.details.absolute_pf_value else ""
+    if component.component_type == ComponentType.RESISTOR:
+        return format_value(component.details.value) + 'R' \
+            if isinstance(component.details.value, (int, float)) and component.details.value != -1 else ""
+    if component.component_type == ComponentType.INDUCTOR:
+        return str(component.details.value) if component.details.value else ""
+    return ""
+
+
+def get_tolerance(resistor: Resistor) -> float:
+    """
+    gets tolerance of resistor as fraction: 0.01, 1, '1', '1%' and '1%, [NoValue]' are 0.01
+    text tolerance is in percents with or without «%»: '0.5' is 0.005, numeric cell below 1 is fraction
+    :param resistor: resistor details
+    :return: tolerance or 0 if it is unknown
+    """
+    tolerance = resistor.tolerance
+    if isinstance(tolerance, str):
+        match = tolerance_grammar.match(tolerance)
+        if not match:
+            return 0.0
+        return float(match.group('number')) / 100
+    if not isinstance(tolerance, (int, float)) or tolerance < 0:
+        return 0.0
+    # numbers from 1 are percents
+    return float(tolerance) / 100 if tolerance >= 1 else float(tolerance)
+
+
+def get_series_value(value: float, series: str) -> float:
+    """
+    rounds resistor value to the nearest preferred value of series
+    :param value: value in ohms, bigger than 0
+    :param series: series name: e24 or e96
+    :return: preferred value in ohms
+    """
+    decade: int = math.floor(math.log10(value))
+    mantissa: float = value / 10 ** decade
+    # 10 is the first value of next decade
+    nearest: float = min(e_series[series] + [10.0], key=lambda x: abs(math.log(x / mantissa)))
+    return round(nearest * 10 ** decade, 6)
+
+
+def set_match_keys(component: Component):
+    """
+    sets normalized keys of component: lower pn, lower footprint, canonical value and type code
+    keys are interned, so equal keys are the same objects
+    :param component: component
+    :return:
+    """
+    component.pn_key = sys.intern(component.pn.lower())
+    component.footprint_key = sys.intern(component.footprint.strip().lower())
+    component.value_key = sys.intern(get_value_key(component))
+    component.type_code = component.component_type.value
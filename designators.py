@@ -0,0 +1,216 @@
+# service module, compact designators of component
+# designators C1, C2, ..., C48 are stored as prefix C and integer range (1, 48), so thousands of references of one
+# BOM line take a few numbers, designator sets are joined and subtracted by range arithmetic and written as C1-C48
+# range notation «C1-C48» is expanded when designators are parsed, both ends must have the same prefix, so
+# references of sub-parts like «U1-2» are kept as they are
+
+import re
+import sys
+from bisect import bisect_right
+from typing import List, Dict, Tuple, Iterable, Iterator, Optional, Union
+
+# prefix and number of reference, leading zeros are left in prefix: R01 and R1 are different references
+reference_grammar = re.compile(r'^(.*?)(0|[1-9]\d*)$')
+range_grammar = re.compile(r'^(\D.*?)(0|[1-9]\d*)\s*-\s*(\D.*?)(0|[1-9]\d*)$')
+
+Range = Tuple[int, int]
+
+
+def merge_ranges(ranges: List[Range]) -> List[Range]:
+    """
+    sorts ranges and joins overlapping and adjacent ones
+    :param ranges: list of (first, last) ranges
+    :return: sorted list of disjoint not adjacent ranges
+    """
+    merged: List[Range] = list()
+    for (first, last) in sorted(ranges):
+        if merged and first <= merged[-1][1] + 1:
+            if last > merged[-1][1]:
+                merged[-1] = (merged[-1][0], last)
+        else:
+            merged.append((first, last))
+    return merged
+
+
+def subtract_ranges(ranges: List[Range], other: List[Range]) -> List[Range]:
+    """
+    gets numbers of ranges that are not in other ranges
+    :param ranges: sorted disjoint ranges
+    :param other: sorted disjoint ranges
+    :return: sorted disjoint ranges
+    """
+    result: List[Range] = list()
+    index: int = 0
+    for (first, last) in ranges:
+        # other ranges that end before range can not overlap next ranges too
+        while index < len(other) and other[index][1] < first:
+            index += 1
+        other_index: int = index
+        while first <= last:
+            if other_index == len(other) or other[other_index][0] > last:
+                result.append((first, last))
+                break
+            if other[other_index][0] > first:
+                result.append((first, other[other_index][0] - 1))
+            first = other[other_index][1] + 1
+            other_index += 1
+    return result
+
+
+def get_range(text: str) -> Optional[Tuple[str, int, int]]:
+    """
+    parses reference range
+    :param text: range like C1-C48
+    :return: prefix, first and last number or None if text is not range
+    """
+    match = range_grammar.match(text.strip())
+    if not match or match.group(3) != match.group(1) or int(match.group(2)) > int(match.group(4)):
+        return None
+    return match.group(1), int(match.group(2)), int(match.group(4))
+
+
+class Designators:
+    """
+    set of component references: numbered references as prefix ranges, others as they are
+    every reference is counted once, references are iterated by prefix in the order of adding and by number
+    """
+    __slots__ = ('ranges', 'others')
+
+    def __init__(self, references: Iterable[str] = ()):
+        # prefix to sorted disjoint ranges of numbers
+        self.ranges: Dict[str, List[Range]] = dict()
+        # references without number
+        self.others: List[str] = list()
+        self.extend(references)
+
+    @classmethod
+    def parse(cls, text: str) -> 'Designators':
+        """
+        parses designators of BOM cell: «C1, C2, C5-C8»
+        :param text: comma separated references and reference ranges
+        :return: designators
+        """
+        designators = cls()
+        added: Dict[str, List[Range]] = dict()
+        for reference in text.split(','):
+            reference = reference.strip()
+            if not reference:
+                continue
+            reference_range: Optional[Tuple[str, int, int]] = get_range(reference)
+            if reference_range:
+                added.setdefault(reference_range[0], list()).append(reference_range[1:])
+            else:
+                designators.add_reference(reference, added)
+        designators.add_ranges(added)
+        return designators
+
+    def add_reference(self, reference: str, added: Dict[str, List[Range]]):
+        """
+        adds reference to new ranges or to references without number
+        :param reference: reference
+        :param added: new ranges by prefix
+        :return:
+        """
+        match = reference_grammar.match(reference)
+        if match:
+            number: int = int(match.group(2))
+            added.setdefault(match.group(1), list()).append((number, number))
+        elif reference not in self.others:
+            self.others.append(reference)
+
+    def add_ranges(self, added: Dict[str, List[Range]]):
+        """
+        merges new ranges into designators
+        :param added: new ranges by prefix
+        :return:
+        """
+        for (prefix, ranges) in added.items():
+            self.ranges[prefix] = merge_ranges(self.ranges.get(prefix, list()) + ranges)
+
+    def extend(self, references: Union['Designators', Iterable[str]]):
+        """
+        adds references
+        :param references: designators or references
+        :return:
+        """
+        if isinstance(references, Designators):
+            self.add_ranges(references.ranges)
+            self.others.extend(reference for reference in references.others if reference not in self.others)
+            return
+        added: Dict[str, List[Range]] = dict()
+        for reference in references:
+            self.add_reference(reference, added)
+        self.add_ranges(added)
+
+    def difference(self, other: 'Designators') -> 'Designators':
+        """
+        gets references that are not in other designators
+        :param other: designators
+        :return: new designators
+        """
+        result = Designators()
+        for (prefix, ranges) in self.ranges.items():
+            left: List[Range] = subtract_ranges(ranges, other.ranges.get(prefix, list()))
+            if left:
+                result.ranges[prefix] = left
+        result.others = [reference for reference in self.others if reference not in other.others]
+        return result
+
+    def copy(self) -> 'Designators':
+        """
+        gets copy that may be changed without changing designators
+        :return: new designators
+        """
+        result = Designators()
+        result.ranges = {prefix: list(ranges) for (prefix, ranges) in self.ranges.items()}
+        result.others = list(self.others)
+        return result
+
+    def __len__(self) -> int:
+        return sum(last - first + 1 for ranges in self.ranges.values() for (first, last) in ranges) + \
+            len(self.others)
+
+    def __iter__(self) -> Iterator[str]:
+        for (prefix, ranges) in self.ranges.items():
+            for (first, last) in ranges:
+                for number in range(first, last + 1):
+                    yield prefix + str(number)
+        yield from self.others
+
+    def __contains__(self, reference: str) -> bool:
+        match = reference_grammar.match(reference)
+        if not match:
+            return reference in self.others
+        ranges: List[Range] = self.ranges.get(match.group(1), list())
+        number: int = int(match.group(2))
+        # the last range that starts not after number
+        index: int = bisect_right(ranges, (number, sys.maxsize)) - 1
+        return index >= 0 and ranges[index][1] >= number
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, (list, tuple)):
+            other = Designators(other)
+        if not isinstance(other, Designators):
+            return NotImplemented
+        return self.ranges == other.ranges and sorted(self.others) == sorted(other.others)
+
+    __hash__ = None
+
+    def __str__(self) -> str:
+        """
+        gets compressed references: ranges of three and more references are written as C1-C3
+        :return: comma separated references
+        """
+        parts: List[str] = list()
+        for (prefix, ranges) in self.ranges.items():
+            for (first, last) in ranges:
+                if last - first >= 2:
+                    parts.append('%s%i-%s%i' % (prefix, first, prefix, last))
+                else:
+                    parts.extend(prefix + str(number) for number in range(first, last + 1))
+        parts.extend(self.others)
+        return ', '.join(parts)
+
+    def __repr__(self) -> str:
+        return "Designators(%r)" % str(self)
+
@@ -0,0 +1,76 @@
+# service module, warnings collected while BOM parcing
+
+import threading
+from collections import Counter
+from enum import Enum
+from typing import List, Optional
+
+from dataclasses import dataclass
+
+
+class WarningCode(Enum):
+    ABSENT_HEADERS = 0
+    DIELECTRIC_MISMATCH = 1
+    INCORRECT_COMPONENT = 2
+    NOT_USED = 3
+    ENCODING = 4
+
+
+@dataclass
+class WarningRecord:
+    code: WarningCode
+    message: str
+    row: Optional[int] = None
+    filename: str = ""
+
+
+class Diagnostics:
+    """
+    collects warnings of one BOM parcing, text is rendered only when asked
+    adding records is thread safe, so one collector may be shared by several parcings
+    """
+
+    def __init__(self, filename: str = ""):
+        self.filename: str = filename
+        self.records: List[WarningRecord] = list()
+        self.counters: Counter = Counter()
+        self.lock = threading.Lock()
+
+    def add(self, code: WarningCode, message: str, row: Optional[int] = None):
+        """
+        adds warning record
+        :param code: kind of warning
+        :param message: warning text
+        :param row: row of BOM
+        :return:
+        """
+        record = WarningRecord(code=code, message=message, row=row, filename=self.filename)
+        with self.lock:
+            self.records.append(record)
+            self.counters[code] += 1
+
+    def extend(self, other: 'Diagnostics'):
+        """
+        adds all records of other collector
+        :param other: other collector
+        :return:
+        """
+        with self.lock:
+            self.records.extend(other.records)
+            self.counters.update(other.counters)
+
+    def count(self, code: WarningCode) -> int:
+        """
+        gets number of warnings of the kind
+        :param code: kind of warning
+        :return: number of warnings
+        """
+        return self.counters[code]
+
+    def render(self) -> str:
+        """
+        gets text of all warnings
+        :return: warnings text
+        """
+        with self.lock:
+            return ''.join(record.message for record in self.records)
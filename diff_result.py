@@ -0,0 +1,266 @@
+# service module, result of BOM comparing as records and its renderers
+# records are added, removed and changed components, renderers write them one by one to a file as text,
+# JSON Lines or CSV, so result is not formatted as a whole and may be read by other programs
+
+import csv
+import json
+from enum import Enum
+from typing import List, Optional, Dict, Any, TextIO, Iterator
+
+from dataclasses import dataclass, field
+
+# categories of compared keys in the order of text output
+categories: List[str] = ['partnumbers', 'capacitors', 'resistors', 'inductors']
+# category of detailed comparing records
+component_category = 'component'
+formats: List[str] = ['text', 'jsonl', 'csv']
+csv_fields: List[str] = ['kind', 'category', 'key', 'footprint', 'title', 'old_row', 'new_row', 'old_quantity',
+                         'new_quantity', 'changes']
+
+
+class DiffKind(Enum):
+    ADDED = 0
+    REMOVED = 1
+    CHANGED = 2
+
+
+@dataclass
+class DiffRecord:
+    kind: DiffKind
+    category: str
+    # pn or canonical value and footprint of component
+    key: str
+    footprint: str
+    # component description for text output
+    title: str = ""
+    old_row: Optional[int] = None
+    new_row: Optional[int] = None
+    old_quantity: Optional[int] = None
+    new_quantity: Optional[int] = None
+    # text of every change of changed component
+    changes: List[str] = field(default_factory=list)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        gets record as dict of json types
+        :return: dict
+        """
+        return {'kind': self.kind.name.lower(), 'category': self.category, 'key': self.key,
+                'footprint': self.footprint, 'title': self.title, 'old_row': self.old_row, 'new_row': self.new_row,
+                'old_quantity': self.old_quantity, 'new_quantity': self.new_quantity, 'changes': self.changes}
+
+
+class DiffResult:
+    """
+    records of comparing two BOMs: added and removed keys of every category, changed components if BOMs were compared
+    in details
+    """
+
+    def __init__(self, old_filename: str = "", new_filename: str = ""):
+        self.old_filename: str = old_filename
+        self.new_filename: str = new_filename
+        self.records: List[DiffRecord] = list()
+        # True if keys were compared, False or True if components were compared in details, only quantity or not
+        self.compared: bool = False
+        self.detailed: Optional[bool] = None
+        # True if quantity changes of compared parts are the main result, they are written in their own section
+        self.quantity: bool = False
+
+    def add(self, record: DiffRecord):
+        """
+        adds record
+        :param record: record
+        :return:
+        """
+        self.records.append(record)
+
+    def extend(self, other: 'DiffResult'):
+        """
+        adds all records of other result
+        :param other: other result of the same BOMs
+        :return:
+        """
+        self.records.extend(other.records)
+        self.compared = self.compared or other.compared
+        self.quantity = self.quantity or other.quantity
+        if other.detailed is not None:
+            self.detailed = other.detailed
+
+    def get_records(self, kind: Optional[DiffKind] = None, category: Optional[str] = None) -> Iterator[DiffRecord]:
+        """
+        gets records of kind and category
+        :param kind: kind of records, None for all kinds
+        :param category: category of records, None for all categories
+        :return: records in the order of adding
+        """
+        return (record for record in self.records if (kind is None or record.kind == kind)
+                and (category is None or record.category == category))
+
+    def added(self) -> List[DiffRecord]:
+        """
+        gets added keys
+        :return: list of records
+        """
+        return list(self.get_records(DiffKind.ADDED))
+
+    def removed(self) -> List[DiffRecord]:
+        """
+        gets removed keys
+        :return: list of records
+        """
+        return list(self.get_records(DiffKind.REMOVED))
+
+    def changed(self) -> List[DiffRecord]:
+        """
+        gets changed components
+        :return: list of records
+        """
+        return list(self.get_records(DiffKind.CHANGED))
+
+
+def write_keys(stream: TextIO, records: List[DiffRecord]):
+    """
+    writes keys like python set of (key, footprint)
+    :param stream: file to write
+    :param records: records
+    :return:
+    """
+    stream.write('{')
+    for (index, record) in enumerate(records):
+        stream.write('%s%r' % (', ' if index else '', (record.key, record.footprint)))
+    stream.write('}')
+
+
+def write_quantities(stream: TextIO, records: List[DiffRecord]):
+    """
+    writes quantity changes like python dict of (key, footprint): old quantity -> new quantity
+    :param stream: file to write
+    :param records: records of changed parts
+    :return:
+    """
+    stream.write('{')
+    for (index, record) in enumerate(records):
+        stream.write('%s%r: %i -> %i' % (', ' if index else '', (record.key, record.footprint), record.old_quantity,
+                                         record.new_quantity))
+    stream.write('}')
+
+
+def is_kept(result: DiffResult, record: DiffRecord, deleted: bool) -> bool:
+    """
+    checks if record is written, removed part is quantity change to 0 in result of quantity comparing
+    :param result: result of comparing
+    :param record: record
+    :param deleted: write or not removed keys
+    :return: True or False
+    """
+    return deleted or result.quantity or record.kind != DiffKind.REMOVED
+
+
+def render_quantities(result: DiffResult, stream: TextIO):
+    """
+    writes quantity changes of compared parts in the order of old rows
+    :param result: result of comparing
+    :param stream: file to write
+    :return:
+    """
+    stream.write("QUANTITY CHANGED\n")
+    changed: List[DiffRecord] = sorted((record for record in result.records if record.category in categories
+                                        and record.kind != DiffKind.ADDED), key=lambda x: x.old_row)
+    for record in changed:
+        if record.kind == DiffKind.REMOVED:
+            stream.write("For %s, former row %i changes are the following:\n" % (record.title, record.old_row))
+            stream.write("Quantity changed: was %i, now 0\n" % record.old_quantity)
+            continue
+        stream.write("For %s, former row %i, new row %i changes are the following: \n" %
+                     (record.title, record.old_row, record.new_row))
+        stream.write(''.join(record.changes))
+        stream.write('\n')
+
+
+def render_text(result: DiffResult, stream: TextIO, deleted: bool = True):
+    """
+    writes result as text
+    :param result: result of comparing
+    :param stream: file to write
+    :param deleted: write or not removed keys
+    :return:
+    """
+    if result.compared:
+        stream.write("COMPONENT DIFFERENCE:\n\n")
+        for category in categories:
+            added: List[DiffRecord] = list(result.get_records(DiffKind.ADDED, category))
+            if added:
+                stream.write("Added %s in second file:" % category)
+                write_keys(stream, added)
+            removed: List[DiffRecord] = list(result.get_records(DiffKind.REMOVED, category))
+            if deleted and removed:
+                stream.write(" Deleted %s in second file:" % category)
+                write_keys(stream, removed)
+            changed: List[DiffRecord] = list(result.get_records(DiffKind.CHANGED, category))
+            if not result.quantity and changed:
+                stream.write(" Quantity changed %s in second file:" % category)
+                write_quantities(stream, changed)
+            stream.write('\n')
+        stream.write('\n')
+    if result.quantity:
+        render_quantities(result, stream)
+    if result.detailed is None:
+        return
+    stream.write("QUANTITY CHANGED\n" if result.detailed is False else "DETAILED COMPARING THE SAME POSITIONS:\n\n")
+    for record in result.get_records(DiffKind.CHANGED, component_category):
+        if record.new_row is None:
+            stream.write("For %s, former row %i changes are the following:\n" % (record.title, record.old_row))
+            stream.write("%s\n" % record.changes[0])
+            continue
+        stream.write("For %s, former row %i, new row %i changes are the following: \n" %
+                     (record.title, record.old_row, record.new_row))
+        if result.detailed:
+            stream.write(''.join(change + '\n' for change in record.changes))
+        else:
+            stream.write(''.join(record.changes))
+        stream.write('\n')
+
+
+def render_jsonl(result: DiffResult, stream: TextIO, deleted: bool = True):
+    """
+    writes result as JSON Lines, one record in line
+    :param result: result of comparing
+    :param stream: file to write
+    :param deleted: write or not removed keys
+    :return:
+    """
+    for record in result.records:
+        if is_kept(result, record, deleted):
+            stream.write(json.dumps(record.to_dict(), ensure_ascii=False) + '\n')
+
+
+def render_csv(result: DiffResult, stream: TextIO, deleted: bool = True):
+    """
+    writes result as CSV with header, changes of component are joined by «; »
+    :param result: result of comparing
+    :param stream: file to write
+    :param deleted: write or not removed keys
+    :return:
+    """
+    writer = csv.DictWriter(stream, fieldnames=csv_fields, lineterminator='\n')
+    writer.writeheader()
+    for record in result.records:
+        if is_kept(result, record, deleted):
+            row: Dict[str, Any] = record.to_dict()
+            row['changes'] = '; '.join(record.changes)
+            writer.writerow(row)
+
+
+renderers = {'text': render_text, 'jsonl': render_jsonl, 'csv': render_csv}
+
+
+def render(result: DiffResult, stream: TextIO, output_format: str = 'text', deleted: bool = True):
+    """
+    writes result in format
+    :param result: result of comparing
+    :param stream: file to write
+    :param output_format: text, jsonl or csv
+    :param deleted: write or not removed keys
+    :return:
+    """
+    renderers[output_format](result, stream, deleted)
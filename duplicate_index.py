@@ -0,0 +1,218 @@
+# service module, incremental index of duplicate components for find_duplicates watch mode
+# components are kept in buckets by pn, capacitor and resistor value and in prefix index of pns, so adding or
+# removing a BOM changes its buckets only and findings are got for changed files without comparing all components
+# alternative pns are kept in gram index, so alternatives containing pn are found without scanning all of them
+
+from typing import List, Tuple, Dict, Hashable, Optional, Set, Iterable
+
+import data_types
+from pn_index import PrefixIndex, GramIndex
+
+Pair = Tuple[str, int, str, int]
+kinds = ['equal', 'similar', 'alternative', 'capacitors', 'resistors']
+# kinds of findings got from buckets
+bucket_kinds = ['equal', 'capacitors', 'resistors']
+
+
+def get_similar_group(component: data_types.Component) -> Optional[Hashable]:
+    """
+    gets group of component for similar pn search
+    :param component: component
+    :return: footprint and type or None if component is not compared by similar pn
+    """
+    if not component.pn or component.component_type in data_types.parametrized:
+        return None
+    return component.footprint_key, component.type_code
+
+
+def is_similar(component: data_types.Component, other: data_types.Component, root_len: int, tail_len: int) -> bool:
+    """
+    checks if pns of components of the same group are similar like in duplicates.compare_pns: the greater pn starts
+    with root of the less pn, component with the less pn has footprint, tails are equal
+    :param component: component
+    :param other: other component
+    :param root_len: len of common components part
+    :param tail_len: number of last symbols that must be equal, 0 to not compare them
+    :return: True or False
+    """
+    first, second = (component, other) if component.pn <= other.pn else (other, component)
+    return len(first.footprint) >= 4 and second.pn.startswith(first.pn[:root_len + 1]) \
+        and (not tail_len or first.pn[-tail_len:] == second.pn[-tail_len:])
+
+
+class DuplicateIndex:
+    """
+    index of components of several BOM files
+    """
+
+    def __init__(self, root_len: int = 8, tail_len: int = 0):
+        self.root_len: int = root_len
+        # similar pns have the same last tail_len symbols, tail is not compared if 0
+        self.tail_len: int = tail_len
+        self.files: Dict[str, List[data_types.Component]] = dict()
+        self.buckets: Dict[str, Dict[Hashable, List[data_types.Component]]] = {kind: dict() for kind in bucket_kinds}
+        # pns of components compared by similar pn, items are ids of components
+        self.prefixes = PrefixIndex()
+        self.components: Dict[int, data_types.Component] = dict()
+        # component pn and alternative pns for alternative search
+        self.pns: Dict[str, List[data_types.Component]] = dict()
+        self.alts: Dict[str, List[data_types.Component]] = dict()
+        self.alt_grams = GramIndex()
+
+    def get_keys(self, component: data_types.Component) -> Dict[str, Hashable]:
+        """
+        gets bucket keys of component
+        :param component: component
+        :return: bucket key by kind
+        """
+        keys: Dict[str, Hashable] = dict()
+        if component.pn:
+            keys['equal'] = component.pn_key
+        if component.component_type == data_types.ComponentType.CAPACITOR and component.value_key:
+            keys['capacitors'] = (component.value_key, component.footprint_key)
+        if component.component_type == data_types.ComponentType.RESISTOR and component.value_key:
+            keys['resistors'] = (component.value_key, component.footprint_key)
+        return keys
+
+    def add_components(self, components: Iterable[data_types.Component]):
+        """
+        adds components to buckets
+        :param components: components to add
+        :return:
+        """
+        for component in components:
+            for (kind, key) in self.get_keys(component).items():
+                self.buckets[kind].setdefault(key, list()).append(component)
+            group: Optional[Hashable] = get_similar_group(component)
+            if group is not None:
+                self.prefixes.insert(component.pn, group, id(component))
+                self.components[id(component)] = component
+            if component.pn:
+                self.pns.setdefault(component.pn, list()).append(component)
+            for alt in component.pn_alt:
+                self.alts.setdefault(alt, list()).append(component)
+                self.alt_grams.add(alt)
+
+    def remove_components(self, components: List[data_types.Component]):
+        """
+        removes components from buckets
+        :param components: components to remove
+        :return:
+        """
+        removed: Set[int] = {id(component) for component in components}
+
+        def remove_from(buckets: Dict[Hashable, List[data_types.Component]], key: Hashable):
+            bucket = [component for component in buckets.get(key, list()) if id(component) not in removed]
+            if bucket:
+                buckets[key] = bucket
+            else:
+                buckets.pop(key, None)
+
+        for component in components:
+            for (kind, key) in self.get_keys(component).items():
+                remove_from(self.buckets[kind], key)
+            group: Optional[Hashable] = get_similar_group(component)
+            if group is not None:
+                self.prefixes.remove(component.pn, group, id(component))
+                self.components.pop(id(component), None)
+            if component.pn:
+                remove_from(self.pns, component.pn)
+            for alt in component.pn_alt:
+                remove_from(self.alts, alt)
+                if alt not in self.alts:
+                    self.alt_grams.remove(alt)
+
+    def update_file(self, filename: str, components: List[data_types.Component]):
+        """
+        replaces components of BOM file
+        :param filename: name of BOM
+        :param components: new components of BOM
+        :return:
+        """
+        self.remove_file(filename)
+        self.files[filename] = components
+        self.add_components(components)
+
+    def remove_file(self, filename: str):
+        """
+        removes components of BOM file
+        :param filename: name of BOM
+        :return:
+        """
+        if filename in self.files:
+            self.remove_components(self.files.pop(filename))
+
+    def get_similar(self, component: data_types.Component) -> List[data_types.Component]:
+        """
+        gets components with similar pn: pns that start with root of pn and pns which roots pn starts with
+        :param component: component
+        :return: list of components
+        """
+        group: Optional[Hashable] = get_similar_group(component)
+        if group is None:
+            return list()
+        root: str = component.pn[:self.root_len + 1]
+        items: List[int] = self.prefixes.get_items(root, group)
+        # pns shorter than root are roots themselves
+        for length in range(1, min(len(component.pn), self.root_len) + 1):
+            items.extend(self.prefixes.get_equal_items(component.pn[:length], group))
+        similar: List[data_types.Component] = list()
+        for item in dict.fromkeys(items):
+            other: data_types.Component = self.components[item]
+            if other is not component and is_similar(component, other, self.root_len, self.tail_len):
+                similar.append(other)
+        return similar
+
+    def get_alternative_pairs(self, component: data_types.Component) \
+            -> List[Tuple[data_types.Component, data_types.Component]]:
+        """
+        gets pairs (component with pn, component with this pn in alternative pn) for component
+        :param component: component
+        :return: list of pairs
+        """
+        pairs: List[Tuple[data_types.Component, data_types.Component]] = list()
+        if component.pn:
+            for alt in self.alt_grams.search(component.pn):
+                pairs.extend((component, alt_comp) for alt_comp in self.alts[alt])
+        for alt in component.pn_alt:
+            # all substrings of alternative pn that are pns
+            substrings: Set[str] = {alt[start:end] for start in range(len(alt))
+                                    for end in range(start + 1, len(alt) + 1)}
+            for substring in substrings & self.pns.keys():
+                pairs.extend((pn_comp, component) for pn_comp in self.pns[substring])
+        return [(pn_comp, alt_comp) for (pn_comp, alt_comp) in pairs
+                if pn_comp is not alt_comp and pn_comp.type_code == alt_comp.type_code]
+
+    def get_findings(self, filenames: Optional[Iterable[str]] = None) -> Dict[str, List[Pair]]:
+        """
+        gets pairs of duplicate components with at least one component from filenames
+        :param filenames: BOM files to get findings for, all files if None
+        :return: list of pairs (file, row, file, row) by kind
+        """
+        filenames = list(self.files.keys()) if filenames is None else [name for name in filenames
+                                                                        if name in self.files]
+        changed: List[data_types.Component] = [component for name in filenames for component in self.files[name]]
+        findings: Dict[str, List[Pair]] = {kind: list() for kind in kinds}
+        seen: Set[Tuple[str, int, int]] = set()
+
+        def add_pair(kind: str, first: data_types.Component, second: data_types.Component):
+            pair_id: Tuple[str, int, int] = (kind, id(first), id(second)) if kind == 'alternative' \
+                else (kind, min(id(first), id(second)), max(id(first), id(second)))
+            if pair_id not in seen:
+                seen.add(pair_id)
+                if kind != 'alternative' and (second.filename, second.row) < (first.filename, first.row):
+                    first, second = second, first
+                findings[kind].append((first.filename, first.row, second.filename, second.row))
+
+        for component in changed:
+            for (kind, key) in self.get_keys(component).items():
+                for other in self.buckets[kind][key]:
+                    if other is not component:
+                        add_pair(kind, component, other)
+            for other in self.get_similar(component):
+                add_pair('similar', component, other)
+            for (pn_comp, alt_comp) in self.get_alternative_pairs(component):
+                add_pair('alternative', pn_comp, alt_comp)
+        for kind in kinds:
+            findings[kind].sort()
+        return findings
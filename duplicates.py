@@ -1,14 +1,148 @@
 # srevice module for finding similar components for find_duplicates script
 
 import data_types
-from typing import List, Tuple
+import value_groups
+from component_table import ComponentTable
+from duplicate_index import DuplicateIndex, get_similar_group
+from pn_index import AhoCorasick, PrefixIndex, DeletionIndex
+from heapq import heappush, heappop
+from typing import List, Tuple, Dict, Set, Hashable, Optional, Callable
 
-# number of symbols that must be equal in pns
+# number of symbols that must be equal in pns: first root + 1 symbols and last tail symbols (0 to not compare tail)
+# they are default values of find_duplicates --root-len and --tail-len and of DuplicateIndex
 root = 8
-tail = 4
+tail = 0
 
 
-def compare_pns(components: List[data_types.Component], root_len: int = 8, precise: bool = False) \
+class DisjointSet:
+    """
+    disjoint set of items 0..size-1 with union by size and path halving
+    """
+
+    def __init__(self, size: int):
+        self.parent: List[int] = list(range(size))
+        self.size: List[int] = [1] * size
+
+    def find(self, item: int) -> int:
+        """
+        finds root of item set
+        :param item: item
+        :return: root item
+        """
+        while self.parent[item] != item:
+            self.parent[item] = self.parent[self.parent[item]]
+            item = self.parent[item]
+        return item
+
+    def union(self, first: int, second: int) -> bool:
+        """
+        joins sets of two items
+        :param first: item
+        :param second: item
+        :return: True if items were in different sets
+        """
+        first, second = self.find(first), self.find(second)
+        if first == second:
+            return False
+        if self.size[first] < self.size[second]:
+            first, second = second, first
+        self.parent[second] = first
+        self.size[first] += self.size[second]
+        return True
+
+
+def get_duplicate_groups(components: List[data_types.Component], root_len: int = root, tail_len: int = tail,
+                         max_distance: int = 0) -> List[data_types.DuplicateGroup]:
+    """
+    joins equal, similar, alternative pns and capacitors and resistors with the same value into groups of one part
+    component is linked with the first component with the same key only, so number of links is less than number
+    of components and pairs inside group are not enumerated
+    :param components: list of components
+    :param root_len: len of common components part for similar pns
+    :param tail_len: number of last symbols that must be equal in similar pns, 0 to not compare them
+    :param max_distance: max edit distance of fuzzy pns, 0 to not link fuzzy pns
+    :return: groups of two or more components in the order of their first component
+    """
+    disjoint = DisjointSet(len(components))
+    links: List[Tuple[int, int, str]] = list()
+
+    def link(first: int, second: int, reason: str):
+        # only links that join two groups are kept
+        if disjoint.union(first, second):
+            links.append((first, second, reason))
+
+    # first component with key by kind, kinds are the same as in duplicates index
+    index = DuplicateIndex(root_len, tail_len)
+    firsts: Dict[str, Dict[Hashable, int]] = dict()
+    automaton = AhoCorasick()
+    for (position, component) in enumerate(components):
+        for (kind, key) in index.get_keys(component).items():
+            link(firsts.setdefault(kind, dict()).setdefault(key, position), position, kind)
+        if component.pn:
+            firsts.setdefault('pn', dict()).setdefault((automaton.add(component.pn), component.type_code), position)
+    link_similar(components, root_len, tail_len, link)
+    automaton.build()
+    for (position, alternative_comp) in enumerate(components):
+        for alt in alternative_comp.pn_alt:
+            for pn_id in automaton.search(alt):
+                first: int = firsts['pn'].get((pn_id, alternative_comp.type_code), position)
+                if first != position:
+                    link(first, position, 'alternative')
+    if max_distance:
+        for (_, _, first, _, _, second) in compare_pns_fuzzy(components, max_distance):
+            link(first, second, 'fuzzy')
+
+    members: Dict[int, List[int]] = dict()
+    for position in range(len(components)):
+        members.setdefault(disjoint.find(position), list()).append(position)
+    # position of component in its group
+    local: Dict[int, int] = {position: number for group in members.values() for (number, position) in enumerate(group)}
+    groups: Dict[int, data_types.DuplicateGroup] = {root: data_types.DuplicateGroup([components[position]
+                                                                                      for position in group])
+                                                    for (root, group) in members.items() if len(group) > 1}
+    for (first, second, reason) in links:
+        groups[disjoint.find(first)].links.append((local[first], local[second], reason))
+    return list(groups.values())
+
+
+def link_similar(components: List[data_types.Component], root_len: int, tail_len: int,
+                 link: Callable[[int, int, str], None]):
+    """
+    links similar pns like compare_pns: component is linked with components after it in pn order which pns start
+    with its root, components with the same root of root_len + 1 symbols and tail are linked by the first of them
+    only, so only short pns are linked with every component that starts with them
+    :param components: list of components
+    :param root_len: len of common components part
+    :param tail_len: number of last symbols that must be equal in similar pns, 0 to not compare them
+    :param link: function to link positions of components with reason
+    :return:
+    """
+    sorted_positions: List[int] = sorted((position for (position, component) in enumerate(components)
+                                          if get_similar_group(component) is not None),
+                                         key=lambda x: components[x].pn)
+    prefix_index = PrefixIndex()
+    for (index, position) in enumerate(sorted_positions):
+        prefix_index.add(components[position].pn, get_similar_group(components[position]), index)
+    linked_roots: Set[Hashable] = set()
+    for (index, position) in enumerate(sorted_positions):
+        component: data_types.Component = components[position]
+        if len(component.footprint) < 4:
+            continue
+        group: Optional[Hashable] = get_similar_group(component)
+        pn_root: str = component.pn[:root_len + 1]
+        pn_tail: str = component.pn[-tail_len:] if tail_len else ""
+        if len(pn_root) > root_len:
+            # components after the first one with the same root are linked with it already
+            if (group, pn_root, pn_tail) in linked_roots:
+                continue
+            linked_roots.add((group, pn_root, pn_tail))
+        for next_index in prefix_index.get_items(pn_root, group, index):
+            if not tail_len or components[sorted_positions[next_index]].pn[-tail_len:] == pn_tail:
+                link(position, sorted_positions[next_index], 'similar')
+
+
+def compare_pns(components: List[data_types.Component], root_len: int = root, precise: bool = False,
+                tail_len: int = tail) \
         -> Tuple[List[Tuple[str, int, int, str, int, int]], List[Tuple[str, int, int, str, int, int]],
                  List[Tuple[str, int, int, str, int, int]], str]:
     """
@@ -16,52 +150,121 @@ def compare_pns(components: List[data_types.Component], root_len: int = 8, preci
     :param precise: use precise comparizon of pns only
     :param root_len: len of common components part
     :param components:
+    :param tail_len: number of last symbols that must be equal in similar pns, 0 to not compare them
     :return: 
     """
     equal: List[Tuple[str, int, int, str, int, int]] = list()
     similar: List[Tuple[str, int, int, str, int, int]] = list()
     alternative: List[Tuple[str, int, int, str, int, int]] = list()
     warning: str = ""
+    # stable component ids are positions in input list
+    positions: Dict[int, int] = {id(component): position for (position, component) in enumerate(components)}
     sorted_components = sorted(components, key=lambda x: x.pn)
     # remove components without pns, we can not compare them by pn
     sorted_components = [component for component in sorted_components if component.pn]
+    prefix_index = PrefixIndex()
+    if not precise:
+        for (index, component) in enumerate(sorted_components):
+            prefix_index.add(component.pn, (component.footprint_key, component.type_code), index)
     for (index, component) in enumerate(sorted_components[:-1]):
         next_comp = sorted_components[index + 1]
-        if component.pn.lower() == next_comp.pn.lower():
+        if component.pn_key == next_comp.pn_key:
             # similar.append((component.filename, component.row, index, next_comp.filename, next_comp.row, index+1))
-            if component.footprint != next_comp.footprint:
+            if component.footprint_key != next_comp.footprint_key:
                 warning += "Components in file %s row %i and  file %s row %i have same partnumbers but different " \
                            "footprint\n" % (component.filename, component.row, next_comp.filename, next_comp.row)
-            if component.component_type != next_comp.component_type:
+            if component.type_code != next_comp.type_code:
                 if component.component_type.name.lower() not in data_types.the_same.keys() \
                         or data_types.the_same[component.component_type.name.lower()] \
                         != next_comp.component_type.name.lower():
                     warning += "Components in file %s row %i and  file %s row %i have same partnumbers but different " \
                                "type\n" % (component.filename, component.row, next_comp.filename, next_comp.row)
-            equal.append((component.filename, component.row, components.index(component),
-                          next_comp.filename, next_comp.row, components.index(next_comp)))
+            equal.append((component.filename, component.row, positions[id(component)],
+                          next_comp.filename, next_comp.row, positions[id(next_comp)]))
         if not precise:
             if component.component_type not in data_types.parametrized and len(component.footprint) >= 4:
-                next_index = index + 1
-                while next_index < len(sorted_components) and \
-                        sorted_components[next_index].pn.startswith(component.pn[:root_len + 1]):
-                    if component.footprint == sorted_components[next_index].footprint:
-                        if component.component_type == sorted_components[next_index].component_type:
-                            similar.append((component.filename, component.row, index,
-                                            sorted_components[next_index].filename, sorted_components[next_index].row,
-                                            next_index))
-                    next_index += 1
-            for alternative_comp in components:
-                crosses = [alt for alt in alternative_comp.pn_alt if component.pn in alt]
-                if crosses and component.row != alternative_comp.row:
-                    if component.component_type == alternative_comp.component_type:
-                        if (component.row, next_comp.row) not in equal:
-                            alternative.append((component.filename, component.row, index,
-                                                alternative_comp.filename, alternative_comp.row,
-                                                components.index(alternative_comp)))
+                for next_index in prefix_index.get_items(component.pn[:root_len + 1],
+                                                         (component.footprint_key, component.type_code), index):
+                    similar_comp = sorted_components[next_index]
+                    if not tail_len or component.pn[-tail_len:] == similar_comp.pn[-tail_len:]:
+                        similar.append((component.filename, component.row, index,
+                                        similar_comp.filename, similar_comp.row, next_index))
+    if not precise:
+        alternative = get_alternative_crosses(components, sorted_components, positions)
     return equal, similar, alternative, warning
 
 
+def get_alternative_crosses(components: List[data_types.Component], sorted_components: List[data_types.Component],
+                            positions: Dict[int, int]) -> List[Tuple[str, int, int, str, int, int]]:
+    """
+    finds components which pn is a part of alternative pn of other component of the same type
+    all pns are put in one Aho-Corasick automaton, so every alternative pn is scanned once
+    :param components: list of components
+    :param sorted_components: components with pns sorted by pn
+    :param positions: position of component in components list by id of component
+    :return: list of (filename, row, id, alternative filename, alternative row, alternative id), ids are positions
+    in components list
+    """
+    alternative: List[Tuple[str, int, int, str, int, int]] = list()
+    automaton = AhoCorasick()
+    for component in sorted_components:
+        automaton.add(component.pn)
+    automaton.build()
+    # ids of components with alternative pn containing pn by pn id
+    crosses: Dict[int, Set[int]] = dict()
+    for (position, alternative_comp) in enumerate(components):
+        for alt in alternative_comp.pn_alt:
+            for pn_id in automaton.search(alt):
+                crosses.setdefault(pn_id, set()).add(position)
+    for component in sorted_components:
+        position = positions[id(component)]
+        for alternative_position in sorted(crosses.get(automaton.pattern_ids[component.pn], set())):
+            alternative_comp = components[alternative_position]
+            if alternative_position != position and component.type_code == alternative_comp.type_code:
+                alternative.append((component.filename, component.row, position,
+                                    alternative_comp.filename, alternative_comp.row, alternative_position))
+    return alternative
+
+
+def compare_pns_fuzzy(components: List[data_types.Component], max_distance: int = 1) \
+        -> List[Tuple[str, int, int, str, int, int]]:
+    """
+    finds components of the same type, footprint and value which pns differ in up to max_distance symbols (typos,
+    other vendor suffix), pns are compared without case, equal pns are not reported
+    pns are kept in deletion index for every footprint, type and value, so pns are not compared by pairs
+    :param components: list of components
+    :param max_distance: max edit distance between pns
+    :return: list of (filename, row, id, filename, row, id), ids are positions in components list
+    """
+    fuzzy: List[Tuple[str, int, int, str, int, int]] = list()
+    indexes: Dict[Tuple[str, int, str], DeletionIndex] = dict()
+    # positions of components by pn key id of their index
+    positions: Dict[Tuple[str, int, str], List[List[int]]] = dict()
+    for (position, component) in enumerate(components):
+        if not component.pn:
+            continue
+        # capacitors and resistors with different values have similar pns, they are not the same part
+        group: Tuple[str, int, str] = (component.footprint_key, component.type_code, component.value_key)
+        index: DeletionIndex = indexes.setdefault(group, DeletionIndex(max_distance))
+        key_positions: List[List[int]] = positions.setdefault(group, list())
+        key_id: int = -1
+        # every pair is found once: by the later component before it is added
+        for (found_id, distance) in index.search(component.pn_key):
+            if distance:
+                for other_position in key_positions[found_id]:
+                    other: data_types.Component = components[other_position]
+                    fuzzy.append((other.filename, other.row, other_position,
+                                  component.filename, component.row, position))
+            else:
+                key_id = found_id
+        if key_id == -1:
+            key_id = index.add(component.pn_key)
+            key_positions.append(list())
+        key_positions[key_id].append(position)
+    fuzzy.sort(key=lambda x: (x[2], x[5]))
+    return fuzzy
+
+
 def compare_capacitors(components: List[data_types.Component]) -> List[Tuple[str, str, int, str, str, int]]:
     """
     compare capacitors by value and footprint
@@ -69,22 +272,15 @@ def compare_capacitors(components: List[data_types.Component]) -> List[Tuple[str
     :return:
     """
     similar_caps: List[Tuple[str, str, int, str, str, int]] = list()
-    cap_sorted: List[data_types.Component] = sorted([component for component in components
-                                                     if component.component_type == data_types.ComponentType.CAPACITOR
-                                                     and component.details.absolute_pf_value],
-                                                      key=lambda x: x.details.absolute_pf_value)
-    if len(cap_sorted) < 2:
-        return list()
-    for (index, cap) in enumerate(cap_sorted):
-        next_index = index + 1
-        while next_index < len(cap_sorted) and cap_sorted[next_index].details.absolute_pf_value \
-                == cap.details.absolute_pf_value and cap_sorted[next_index].footprint == cap.footprint:
-            similar_caps.append((cap.filename, str(cap.details.value)+data_types.units_cap[cap.details.unit], cap.row,
-                                 cap_sorted[next_index].filename,
-                                 str(cap_sorted[next_index].details.value) +
-                                 data_types.units_cap[cap_sorted[next_index].details.unit],
-                                 cap_sorted[next_index].row))
-            next_index += 1
+    for group in value_groups.get_component_groups(components, data_types.ComponentType.CAPACITOR):
+        for (position, index) in enumerate(group):
+            cap = components[index]
+            for next_index in group[position + 1:]:
+                similar_caps.append((cap.filename, str(cap.details.value) + data_types.units_cap[cap.details.unit],
+                                     cap.row, components[next_index].filename,
+                                     str(components[next_index].details.value) +
+                                     data_types.units_cap[components[next_index].details.unit],
+                                     components[next_index].row))
     return similar_caps
 
 
@@ -95,18 +291,95 @@ def compare_resistors(components: List[data_types.Component]) -> List[Tuple[str,
     :return:
     """
     similar_resistors: List[Tuple[str, str, int, str, str, int]] = list()
-    res_sorted: List[data_types.Component] = sorted([component for component in components
-                                                     if component.component_type == data_types.ComponentType.RESISTOR
-                                                     and component.details.value != -1],
-                                                    key=lambda x: x.details.value)
-    if len(res_sorted) < 2:
-        return list()
-    for (index, res) in enumerate(res_sorted):
-        next_index = index + 1
-        while next_index < len(res_sorted) and res_sorted[next_index].details.value == res.details.value \
-                and res_sorted[next_index].footprint == res.footprint:
-            similar_resistors.append((res.filename, str(res.details.value)+'R', res.row,
-                                      res_sorted[next_index].filename, str(res_sorted[next_index].details.value)+'R',
-                                      res_sorted[next_index].row))
-            next_index += 1
+    for group in value_groups.get_component_groups(components, data_types.ComponentType.RESISTOR):
+        for (position, index) in enumerate(group):
+            res = components[index]
+            for next_index in group[position + 1:]:
+                similar_resistors.append((res.filename, str(res.details.value) + 'R', res.row,
+                                          components[next_index].filename,
+                                          str(components[next_index].details.value) + 'R',
+                                          components[next_index].row))
+    return similar_resistors
+
+
+def get_overlapping_pairs(intervals: List[Tuple[float, float]]) -> List[Tuple[int, int]]:
+    """
+    finds overlapping intervals by sweep of sorted interval starts, intervals that ended are removed from heap
+    :param intervals: list of (low, high)
+    :return: list of (index, index) of overlapping intervals, first interval starts earlier
+    """
+    pairs: List[Tuple[int, int]] = list()
+    # heap of (high, index) of intervals that could overlap next intervals
+    active: List[Tuple[float, int]] = list()
+    for index in sorted(range(len(intervals)), key=lambda x: intervals[x]):
+        low, high = intervals[index]
+        while active and active[0][0] < low:
+            heappop(active)
+        pairs.extend((active_index, index) for (_, active_index) in sorted(active, key=lambda x: intervals[x[1]]))
+        heappush(active, (high, index))
+    return pairs
+
+
+def compare_resistors_tolerance(components: List[data_types.Component], series: Optional[str] = None) \
+        -> List[Tuple[str, str, int, str, str, int]]:
+    """
+    compare resistors by value band and footprint: resistors are interchangeable if their value bands
+    value * (1 +- tolerance) overlap, 4.99k 1% and 5.1k 5% are interchangeable
+    :param components: list of components
+    :param series: e24 or e96 to round values to preferred values of series before comparing, None to not round
+    :return: list of (filename, value, row, filename, value, row)
+    """
+    similar_resistors: List[Tuple[str, str, int, str, str, int]] = list()
+    resistors: Dict[str, List[data_types.Component]] = dict()
+    for component in components:
+        if component.component_type == data_types.ComponentType.RESISTOR and component.value_key \
+                and component.details.value > 0:
+            resistors.setdefault(component.footprint_key, list()).append(component)
+    for footprint_resistors in resistors.values():
+        intervals: List[Tuple[float, float]] = list()
+        for res in footprint_resistors:
+            value: float = data_types.get_series_value(res.details.value, series) if series else res.details.value
+            tolerance: float = data_types.get_tolerance(res.details)
+            intervals.append((value * (1 - tolerance), value * (1 + tolerance)))
+        # pairs are in the order of components
+        for (first, second) in sorted((min(pair), max(pair)) for pair in get_overlapping_pairs(intervals)):
+            res, other = footprint_resistors[first], footprint_resistors[second]
+            similar_resistors.append((res.filename, str(res.details.value) + 'R', res.row,
+                                      other.filename, str(other.details.value) + 'R', other.row))
     return similar_resistors
+
+
+def compare_values_table(table: ComponentTable, comp_type: data_types.ComponentType) \
+        -> List[Tuple[str, str, int, str, str, int]]:
+    """
+    compare components of table by value and footprint key like compare_capacitors and compare_resistors
+    :param table: component table
+    :param comp_type: type of components to compare
+    :return: list of (filename, value, row, filename, value, row) for components with the same value and footprint
+    """
+    similar: List[Tuple[str, str, int, str, str, int]] = list()
+    for group in value_groups.get_table_groups(table, comp_type):
+        for (position, index) in enumerate(group):
+            for next_index in group[position + 1:]:
+                similar.append((table.get_filename(index), table.get_value_text(index), table.rows[index],
+                                table.get_filename(next_index), table.get_value_text(next_index),
+                                table.rows[next_index]))
+    return similar
+
+
+def compare_capacitors_table(table: ComponentTable) -> List[Tuple[str, str, int, str, str, int]]:
+    """
+    compare capacitors of component table by value and footprint
+    :param table: component table
+    :return:
+    """
+    return compare_values_table(table, data_types.ComponentType.CAPACITOR)
+
+
+def compare_resistors_table(table: ComponentTable) -> List[Tuple[str, str, int, str, str, int]]:
+    """
+    compare resistors of component table by value and footprint
+    :param table: component table
+    :return:
+    """
+    return compare_values_table(table, data_types.ComponentType.RESISTOR)
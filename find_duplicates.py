@@ -1,38 +1,191 @@
 # main script for comparing BOM's and finding duplicates
 # run with parameters «--compare filename1 filename2» to compare two BOMs by pns
-#                     «--compare filename1 filename2» to compare two BOMs by pns and quantity
+#                     «--quantity filename1 filename2» to compare two BOMs by pns and quantity of parts
 #                     «--detailed filename1 filename2 to get detailed compare
+#                     «--revisions filename1 filename2 ...» to get part x revision matrix of quantities with
+#                     revisions where part was added first and removed last, every BOM is parsed once
+#                     «--format text», «--format jsonl» or «--format csv» with --compare, --quantity, --detailed or
+#                     --revisions sets output format of comparing (text by default)
 #                     «--duplicate path» to find duplicates in path
+#                     «--jobs N» with --duplicates to parse files in N processes
+#                     «--stats» to print value parcer cache statistics of all processes, BOMs loaded from
+#                     parced BOM cache are not counted
+#                     «--watch» with --duplicates to watch path and print findings for changed files,
+#                     «--interval S» sets seconds between checks (2 by default)
+#                     «--groups» with --duplicates to print groups of duplicate components instead of pairs
+#                     «--root-len N» with --duplicates sets len of common pn root of similar pns (8 by default)
+#                     «--tail-len N» with --duplicates sets number of last symbols that must be equal in similar pns
+#                     (0 by default to not compare pn tails)
+#                     «--fuzzy K» with --duplicates to find pns with up to K different symbols (typos, vendor suffixes)
+#                     «--tolerance» with --duplicates to compare resistors by value bands with tolerance
+#                     «--series E24» or «--series E96» with --tolerance rounds resistor values to preferred values
+#                     «--index path» to add BOMs of path to where-used database, unchanged BOMs are skipped
+#                     «--where-used PN» to find BOMs with PN in where-used database
+#                     «--where-value VALUE FOOTPRINT» to find capacitors and resistors with value and footprint
+#                     «--where-alt PN» to find alternatives of PN in where-used database
+#                     «--db filename» sets where-used database (~/.cache/duplicate_bom/where_used.sqlite by default)
 
 import duplicates
+import duplicate_index
 import compare_boms
+import component_table
+import diff_result
+import bom_cache
 import xlsx_parce
 import data_types
 import os
 import sys
-from typing import List
+import time
+from typing import List, Tuple, Optional, Dict
 
 
-def find_similar():
+def pop_option(name: str, default: Optional[str] = None) -> Optional[str]:
+    """
+    removes option with its value from command line arguments
+    :param name: option name
+    :param default: value if option is absent
+    :return: option value
+    """
+    if name not in sys.argv[1:]:
+        return default
+    index: int = sys.argv.index(name, 1)
+    value: Optional[str] = sys.argv[index + 1] if index + 1 < len(sys.argv) else default
+    del sys.argv[index:index + 2]
+    return value
+
+
+def pop_flag(name: str) -> bool:
+    """
+    removes flag from command line arguments
+    :param name: flag name
+    :return: True if flag was used
+    """
+    if name not in sys.argv[1:]:
+        return False
+    sys.argv.remove(name)
+    return True
+
+
+def parse_bom(filename: str) -> Tuple[List[data_types.Component], str]:
+    """
+    parces one BOM of directory, any error skips the file only, cache is evicted after all BOMs of directory
+    :param filename: name of BOM
+    :return: component list, error str
+    """
+    try:
+        data, _ = bom_cache.get_components_cached(filename, evict_entries=False)
+    except Exception as e:
+        return list(), "File %s skipped: %s\n" % (filename, e)
+    return data, ""
+
+
+def parse_bom_counted(filename: str) -> Tuple[Tuple[List[data_types.Component], str], Dict[str, Dict[str, int]]]:
+    """
+    parces one BOM in other process and counts value parcer cache hits and misses of parcing
+    :param filename: name of BOM
+    :return: (component list, error str), hits and misses by parcer name
+    """
+    before = xlsx_parce.get_value_cache_stats()
+    result: Tuple[List[data_types.Component], str] = parse_bom(filename)
+    after = xlsx_parce.get_value_cache_stats()
+    return result, {name: {'hits': int(after[name]['hits'] - before[name]['hits']),
+                           'misses': int(after[name]['misses'] - before[name]['misses'])} for name in after}
+
+
+def get_bom_filenames(path: str) -> List[str]:
+    """
+    gets sorted names of readable BOMs in directory
+    :param path: directory with BOMs
+    :return: list of BOM names with path
+    """
+    return sorted(os.path.join(path, filename) for filename in os.listdir(path)
+                  if os.path.splitext(filename)[1].lower() in xlsx_parce.bom_extensions
+                  and os.access(os.path.join(path, filename), os.R_OK))
+
+
+def parse_boms(filenames: List[str], jobs: int = 1) -> List[Tuple[List[data_types.Component], str]]:
+    """
+    parces BOMs, any error skips the file only
+    :param filenames: names of BOMs
+    :param jobs: number of processes for parcing
+    :return: list of (component list, error str) in the order of filenames
+    """
+    if jobs > 1 and len(filenames) > 1:
+        # multiprocessing is imported for parallel scans only to keep start fast
+        from concurrent.futures import ProcessPoolExecutor
+        results: List[Tuple[List[data_types.Component], str]] = list()
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            for (result, stats) in executor.map(parse_bom_counted, filenames):
+                # value caches of processes are separate, their statistics is summed for --stats
+                xlsx_parce.add_value_cache_stats(stats)
+                results.append(result)
+    else:
+        results = [parse_bom(filename) for filename in filenames]
+    bom_cache.evict_cache()
+    return results
+
+
+def get_components_from_dir(path: str, jobs: int = 1) -> Tuple[List[data_types.Component], str]:
+    """
+    parces all BOMs in directory, files are merged in the order of their names
+    :param path: directory with BOMs
+    :param jobs: number of processes for parcing
+    :return: component list, errors str
+    """
+    results: List[Tuple[List[data_types.Component], str]] = parse_boms(get_bom_filenames(path), jobs)
+    components_list: List[data_types.Component] = list()
+    errors: str = ""
+    for (data, error) in results:
+        components_list.extend(data)
+        errors += error
+    return components_list, errors
+
+
+def print_groups(groups: List[data_types.DuplicateGroup]):
+    """
+    prints groups of duplicate components with links between them
+    :param groups: groups of duplicate components
+    :return:
+    """
+    for (number, group) in enumerate(groups):
+        print("Group %i:" % (number + 1))
+        for component in group.members:
+            print("    %s row %i %s %s" % (component.filename, component.row, component.pn,
+                                         component.value_key or component.footprint))
+        for (first, second, reason) in group.links:
+            print("    %s row %i - %s row %i: %s" % (group.members[first].filename, group.members[first].row,
+                                                   group.members[second].filename, group.members[second].row, reason))
+
+
+def find_similar(jobs: int = 1, groups: bool = False, root_len: int = duplicates.root,
+                 tail_len: int = duplicates.tail, max_distance: int = 0, tolerance: bool = False,
+                 series: Optional[str] = None):
     """
     main function for finding similar positions
+    :param jobs: number of processes for parcing
+    :param groups: print groups of duplicate components instead of pairs
+    :param root_len: len of common pn root of similar pns
+    :param tail_len: number of last symbols that must be equal in similar pns
+    :param max_distance: max number of different symbols of fuzzy pns, 0 to not search fuzzy pns
+    :param tolerance: compare resistors by value bands with tolerance
+    :param series: e24 or e96 to round resistor values to preferred values for tolerance compare
     :return:
     """
     path = sys.argv[2] if len(sys.argv) >= 3 else '.'
     if os.path.exists(path):
         if os.path.isdir(path):
-            components_list: List[data_types.Component] = list()
-            for filename in os.listdir(path):
-                if os.path.splitext(filename)[1].lower() == '.xlsx' \
-                        and os.access(os.path.join(path, filename), os.R_OK):
-                    try:
-                        data, _ = xlsx_parce.get_components_from_xlxs(os.path.join(path, filename))
-                        components_list.extend(data)
-                    except PermissionError:
-                        pass
+            components_list, errors = get_components_from_dir(path, jobs)
+            if errors:
+                print(errors)
         else:
-            components_list: List[data_types.Component] = xlsx_parce.get_components_from_xlxs(path)[0]
-        equal, similar, alternative, error = duplicates.compare_pns(components_list, root_len=8, precise=False)
+            components_list: List[data_types.Component] = bom_cache.get_components_cached(path)[0]
+        if groups:
+            print_groups(duplicates.get_duplicate_groups(components_list, root_len=root_len, tail_len=tail_len,
+                                                         max_distance=max_distance))
+            print("Search in %s complited" % path)
+            return
+        equal, similar, alternative, error = duplicates.compare_pns(components_list, root_len=root_len, precise=False,
+                                                                    tail_len=tail_len)
         if error:
             print(error)
         if equal:
@@ -44,13 +197,21 @@ def find_similar():
         if alternative:
             print('These rows have similar alternative pn:\n')
             print([(pn1, row1, pn2, row2) for (pn1, row1, in1, pn2, row2, ind2) in alternative])
-        similar_caps = duplicates.compare_capacitors(components_list)
+        fuzzy = duplicates.compare_pns_fuzzy(components_list, max_distance) if max_distance else list()
+        if fuzzy:
+            print("These rows have pns with up to %i different symbols:\n" % max_distance)
+            print([(pn1, row1, pn2, row2) for (pn1, row1, in1, pn2, row2, ind2) in fuzzy])
+        # capacitors and resistors are grouped by table columns
+        table = component_table.ComponentTable()
+        table.extend(components_list)
+        similar_caps = duplicates.compare_capacitors_table(table)
         if similar_caps:
             print("Those capacitors are similar:")
             print(similar_caps)
-        similar_resistors = duplicates.compare_resistors(components_list)
+        similar_resistors = duplicates.compare_resistors_tolerance(components_list, series) if tolerance \
+            else duplicates.compare_resistors_table(table)
         if similar_resistors:
-            print("Similar resistor rows: ")
+            print("Resistors interchangeable within tolerance: " if tolerance else "Similar resistor rows: ")
             print(similar_resistors)
 
         print("Search in %s complited" % path)
@@ -58,9 +219,126 @@ def find_similar():
         print("Incorrect filename")
 
 
-def compare_boms_new_pns(quantity=False, detailed=False):
+def update_index(path: str, index: duplicate_index.DuplicateIndex, mtimes: Dict[str, float]) \
+        -> Tuple[List[str], str]:
+    """
+    parces BOMs of directory changed since last update and updates index
+    :param path: directory with BOMs
+    :param index: duplicate index
+    :param mtimes: mtimes of BOMs at last update, updated by function
+    :return: changed or removed BOM names, errors str
+    """
+    changed: List[str] = list()
+    errors: str = ""
+    filenames: List[str] = get_bom_filenames(path)
+    for filename in sorted(set(mtimes.keys()) - set(filenames)):
+        index.remove_file(filename)
+        mtimes.pop(filename)
+        changed.append(filename)
+    for filename in filenames:
+        try:
+            mtime: float = os.stat(filename).st_mtime
+        except OSError:
+            continue
+        if mtimes.get(filename) == mtime:
+            continue
+        mtimes[filename] = mtime
+        data, error = parse_bom(filename)
+        errors += error
+        index.update_file(filename, data)
+        changed.append(filename)
+    if changed:
+        bom_cache.evict_cache()
+    return changed, errors
+
+
+def print_findings(findings: Dict[str, List[duplicate_index.Pair]]):
+    """
+    prints duplicate findings
+    :param findings: pairs of rows by kind
+    :return:
+    """
+    titles: Dict[str, str] = {'equal': "These rows have equal pns:\n", 'similar': "These rows have similar pns:\n",
+                              'alternative': 'These rows have similar alternative pn:\n',
+                              'capacitors': "Those capacitors are similar:", 'resistors': "Similar resistor rows: "}
+    for kind in duplicate_index.kinds:
+        if findings[kind]:
+            print(titles[kind])
+            print(findings[kind])
+
+
+def watch_similar(interval: float = 2.0, cycles: Optional[int] = None, root_len: int = duplicates.root,
+                  tail_len: int = duplicates.tail):
+    """
+    main function for watch mode: finds similar positions and prints new findings when BOMs in path are changed
+    :param interval: seconds between checks of directory
+    :param cycles: number of checks, endless if None
+    :param root_len: len of common pn root of similar pns
+    :param tail_len: number of last symbols that must be equal in similar pns
+    :return:
+    """
+    path = sys.argv[2] if len(sys.argv) >= 3 else '.'
+    if not os.path.isdir(path):
+        print("Path should be existing folder")
+        return
+    index = duplicate_index.DuplicateIndex(root_len=root_len, tail_len=tail_len)
+    mtimes: Dict[str, float] = dict()
+    cycle: int = 0
+    try:
+        while cycles is None or cycle < cycles:
+            changed, errors = update_index(path, index, mtimes)
+            if errors:
+                print(errors)
+            if changed:
+                print("Changed files: %s" % ', '.join(os.path.basename(filename) for filename in changed))
+                print_findings(index.get_findings(changed))
+                print("Search in %s complited, watching for changes" % path)
+            cycle += 1
+            if cycles is None or cycle < cycles:
+                time.sleep(interval)
+    except KeyboardInterrupt:
+        pass
+
+
+def where_used_command(db_name: Optional[str] = None):
+    """
+    main function for where-used database: indexes BOMs of path or prints where-used query results
+    :param db_name: name of database file, default database if None
+    :return:
+    """
+    # sqlite is imported for where-used commands only to keep start fast
+    import where_used
+    connection = where_used.connect(db_name or where_used.default_db)
+    command: str = sys.argv[1].lower()
+    if command == '--index':
+        path = sys.argv[2] if len(sys.argv) >= 3 else '.'
+        if not os.path.isdir(path):
+            print("Path should be existing folder")
+            return
+        changed, errors = where_used.update_index(connection, get_bom_filenames(path), path)
+        if errors:
+            print(errors)
+        print("Indexed in %s: %i changed files" % (path, len(changed)))
+        return
+    if len(sys.argv) < (4 if command == '--where-value' else 3):
+        print("Parameters are missing")
+        return
+    if command == '--where-used':
+        rows = where_used.find_pn(connection, sys.argv[2])
+    elif command == '--where-value':
+        rows = where_used.find_value(connection, sys.argv[2], sys.argv[3])
+    else:
+        rows = where_used.find_alternatives(connection, sys.argv[2])
+    for (filename, row, pn, footprint, value, designators) in rows:
+        print("%s row %i: %s %s %s %s" % (filename, row, pn, footprint, value, designators))
+    if not rows:
+        print("Nothing found")
+
+
+def compare_boms_new_pns(quantity=False, detailed=False, output_format='text'):
     """
     main function for bom comparing. Use detailed=True to get detailed comparing and False to compare PNs only
+    :param output_format: text, jsonl or csv
     :return:
     """
     if len(sys.argv) != 4:
@@ -70,28 +348,108 @@ def compare_boms_new_pns(quantity=False, detailed=False):
             or os.path.isdir(sys.argv[3]):
         print("Both files should be existing files (not folders)")
         return
-    old, warning = xlsx_parce.get_components_from_xlxs(sys.argv[2])
-    print(warning)
-    new, warning = xlsx_parce.get_components_from_xlxs(sys.argv[3])
-    print(warning)
-    compare_boms.find_new_pns(old, new, not quantity)
+    # parcing warnings are not mixed with JSON Lines and CSV
+    warning_stream = sys.stdout if output_format == 'text' else sys.stderr
+    old_components, warning = bom_cache.get_components_cached(sys.argv[2])
+    print(warning, file=warning_stream)
+    new_components, warning = bom_cache.get_components_cached(sys.argv[3])
+    print(warning, file=warning_stream)
+    # BOMs are joined and indexed once for all comparings
+    old = compare_boms.normalize_bom(old_components, sys.argv[2])
+    new = compare_boms.normalize_bom(new_components, sys.argv[3])
+    # added, removed and quantity changed parts are counted once for --compare and --quantity
+    result = compare_boms.get_bom_diff(old, new)
+    result.quantity = quantity
     if detailed:
-        compare_boms.detail_compare(old, new, False)
-    if quantity:
-        compare_boms.detail_compare(old, new, True)
+        result.extend(compare_boms.get_detail_diff(old, new, False))
+    diff_result.render(result, sys.stdout, output_format, deleted=not quantity)
+
+
+def compare_revisions(jobs: int = 1, output_format: str = 'text'):
+    """
+    main function for comparing revision chain, every BOM is parsed once
+    :param jobs: number of processes for parcing
+    :param output_format: text, jsonl or csv
+    :return:
+    """
+    # revisions module is imported for revision matrix only to keep start fast
+    import revisions
+    filenames: List[str] = sys.argv[2:]
+    if len(filenames) < 2:
+        print("Wrong params: two or more bom files to compare expected")
+        return
+    absent: List[str] = [filename for filename in filenames if not os.path.isfile(filename)]
+    if absent:
+        print("Files should be existing files (not folders): %s" % ", ".join(absent))
+        return
+    boms: List[Tuple[str, List[data_types.Component]]] = list()
+    for (filename, (data, error)) in zip(filenames, parse_boms(filenames, jobs)):
+        if error:
+            print(error, file=sys.stderr)
+        boms.append((filename, data))
+    revisions.renderers[output_format](revisions.get_revision_matrix(boms), sys.stdout)
 
 
 if __name__ == '__main__':
+    try:
+        jobs_number = int(pop_option('--jobs', '1'))
+    except ValueError:
+        jobs_number = 1
+        print("Wrong --jobs value, files are parsed in one process")
+    print_stats = pop_flag('--stats')
+    watch = pop_flag('--watch')
+    print_duplicate_groups = pop_flag('--groups')
+    try:
+        pn_root_len = int(pop_option('--root-len', str(duplicates.root)))
+        pn_tail_len = int(pop_option('--tail-len', str(duplicates.tail)))
+    except ValueError:
+        pn_root_len, pn_tail_len = duplicates.root, duplicates.tail
+        print("Wrong --root-len or --tail-len value, %i and %i are used" % (pn_root_len, pn_tail_len))
+    where_used_db = pop_option('--db')
+    compare_tolerance = pop_flag('--tolerance')
+    resistor_series = pop_option('--series')
+    if resistor_series is not None and resistor_series.lower() not in data_types.e_series.keys():
+        print("Wrong --series value, values are not rounded")
+        resistor_series = None
+    if resistor_series is not None and not compare_tolerance:
+        print("--series is used with --tolerance only, values are not rounded")
+        resistor_series = None
+    try:
+        fuzzy_distance = int(pop_option('--fuzzy', '0'))
+    except ValueError:
+        fuzzy_distance = 0
+        print("Wrong --fuzzy value, fuzzy pns are not searched")
+    diff_format = pop_option('--format', 'text').lower()
+    if diff_format not in diff_result.formats:
+        print("Wrong --format value, text is used")
+        diff_format = 'text'
+    try:
+        watch_interval = float(pop_option('--interval', '2'))
+    except ValueError:
+        watch_interval = 2.0
+        print("Wrong --interval value, 2 seconds are used")
     if len(sys.argv) < 2:
         print("Parameters are missing, need type parameters and 1 or 2 filenames")
     if sys.argv[1].lower() == '--compare':
-        compare_boms_new_pns()
+        compare_boms_new_pns(output_format=diff_format)
     elif sys.argv[1].lower() == '--detailed':
-        compare_boms_new_pns(detailed=True)
+        compare_boms_new_pns(detailed=True, output_format=diff_format)
     elif sys.argv[1].lower() == '--quantity':
-        compare_boms_new_pns(quantity=True)
+        compare_boms_new_pns(quantity=True, output_format=diff_format)
+    elif sys.argv[1].lower() == '--revisions':
+        compare_revisions(jobs_number, diff_format)
+    elif sys.argv[1].lower() in ['--index', '--where-used', '--where-value', '--where-alt']:
+        where_used_command(where_used_db)
+    elif sys.argv[1].lower() == '--duplicates' and watch:
+        watch_similar(watch_interval, root_len=pn_root_len, tail_len=pn_tail_len)
     elif sys.argv[1].lower() == '--duplicates':
-        find_similar()
+        find_similar(jobs_number, print_duplicate_groups, pn_root_len, pn_tail_len, fuzzy_distance, compare_tolerance,
+                     resistor_series.lower() if resistor_series else None)
     else:
         print("Wrong parameter")
+    if print_stats:
+        print("Value cache statistics of BOMs parced in this run, BOMs loaded from parced BOM cache are not parced")
+        for (parcer, stats) in xlsx_parce.get_value_cache_stats().items():
+            print("Value cache %s: %i hits, %i misses, hit rate %.1f%%" %
+                  (parcer, stats['hits'], stats['misses'], 100 * stats['hit_rate']))
 
@@ -5,51 +5,49 @@
 
 
 import data_types
-from typing import List, Optional, Dict, Union
-from openpyxl import Workbook, load_workbook
-from openpyxl.styles import Font, Border, Side, PatternFill, Alignment
+from typing import List, Optional, Dict
 from string import ascii_uppercase
 import sys
 import xlsx_parce
+import bom_cache
 import os
 import compare_boms
+from bom_index import PartKey, get_part_key
 
 
-def get_component_by_pn(pn: str, footprint: str, components=List[data_types.Component]) \
-        -> Optional[data_types.Component]:
+def get_written_details(component: data_types.Component) -> Optional[bool]:
     """
-    finds component by pn
-    :param pn: pn of component
-    :param footprint: footprint of component to find
-    :param components: list of componentns
-    :return: found component or None
+    checks if row of new BOM is written to report
+    :param component: component
+    :return: None if row is not written, True if it is written with value details, False if without them
     """
-    for component in components:
-        if component.pn == pn and component.footprint == footprint:
-            return component
+    if component.component_type == data_types.ComponentType.RESISTOR:
+        return True if component.details and component.details.value != -1 else None
+    if component.component_type == data_types.ComponentType.CAPACITOR:
+        return True if component.details and component.details.value else None
+    if component.pn:
+        return False
+    if component.component_type == data_types.ComponentType.INDUCTOR and component.details \
+            and component.details.value:
+        return True
     return None
 
 
-def get_component_by_value(value: Union[str, int], footprint: str, comp_type: data_types.ComponentType,
-                           components=List[data_types.Component]) \
-        -> Optional[data_types.Component]:
+def color_quantity(headers: Dict[str, Optional[int]], sheet, index: int, old_quantity: int, new_quantity: int):
     """
-    finds component by value and footprint (capacitor, resistor, inductor)
-    :param comp_type: type of component
-    :param value: value of component
-    :param footprint: footprint of component to find
-    :param components: list of componentns
-    :return: found component or None
+    makes quantity cell red if quantity is decreased and green if it is increased
+    :param headers: headers of row
+    :param sheet: sheet with data
+    :param index: row
+    :param old_quantity: quantity of part in old BOM
+    :param new_quantity: quantity of part in new BOM
+    :return:
     """
-    for component in components:
-        if component.component_type == comp_type:
-            if comp_type == data_types.ComponentType.CAPACITOR:
-                if component.details:
-                    if component.details.absolute_pf_value == value and component.footprint == footprint:
-                        return component
-            elif component.details and component.details.value == value and component.footprint == footprint:
-                return component
-    return None
+    from openpyxl.styles import PatternFill
+    if not headers['quantity'] or old_quantity == new_quantity:
+        return
+    sheet["%s%i" % (ascii_uppercase[headers['quantity'] - 1], index)].fill = \
+        PatternFill("solid", fgColor='FF0000' if old_quantity > new_quantity else "00FF00")
 
 
 def color_row(headers: Dict[str, Optional[int]], sheet, color: str, index: int):
@@ -61,6 +59,7 @@ def color_row(headers: Dict[str, Optional[int]], sheet, color: str, index: int):
     :param color: color
     :return:
     """
+    from openpyxl.styles import PatternFill
     for key in headers.keys():
         if headers[key]:
             sheet['%s%i' % (ascii_uppercase[headers[key] - 1], index)].fill = \
@@ -77,6 +76,7 @@ def add_row(component: data_types.Component, headers: Dict[str, Optional[int]],
     :param sheet: sheet to add
     :return:
     """
+    from openpyxl.styles import Border, Side
     bd = Side(style='thin', color="000000")
     simple_keys = ['pn', 'manufacturer', 'footprint', 'description']
     if headers['type']:
@@ -93,7 +93,7 @@ def add_row(component: data_types.Component, headers: Dict[str, Optional[int]],
                     sheet["%s%i" % (ascii_uppercase[headers['pn alternative 2'] - 1], row)] = \
                         component.pn_alt[1]
     if headers['designator']:
-        sheet["%s%i" % (ascii_uppercase[headers['designator'] - 1], row)] = ', '.join(component.designator)
+        sheet["%s%i" % (ascii_uppercase[headers['designator'] - 1], row)] = str(component.designator)
     if headers['quantity']:
         sheet["%s%i" % (ascii_uppercase[headers['quantity'] - 1], row)] = len(component.designator)
     for key in headers.keys():
@@ -133,123 +133,62 @@ def add_details(component: data_types.Component, headers: Dict[str, Optional[int
                     ', '.join([dielectric.name for dielectric in component.details.dielectric])
 
 
-def find_new_pns(old: List[data_types.Component], new: List[data_types.Component], sheet,
-                 headers: Dict[str, Optional[int]], quantity: bool):
+def find_new_pns(old: compare_boms.Bom, new: compare_boms.Bom, sheet, headers: Dict[str, Optional[int]],
+                 quantity: bool):
     """
     compare two lists to find new positions
+    rows of new BOM are written in their order, added parts are green, then the first rows of removed parts are
+    written red, parts are found by their keys in part dicts of normalized BOMs
     :param quantity: add quantity?
     :param sheet: sheet
     :param headers: headers
-    :param old: list of old components
-    :param new: list of new components
+    :param old: list of old components or normalized old BOM
+    :param new: list of new components or normalized new BOM
     :return:
     """
-    old_pn, old_cap, old_res, old_ind = compare_boms.get_comp_list_precise(old)
-    new_pn, new_cap, new_res, new_ind = compare_boms.get_comp_list_precise(new)
-    plus_pn, minus_pn, _ = compare_boms.get_diff_data(old_pn, new_pn, "partnumbers", True)
-    plus_cap, minus_cap, _ = compare_boms.get_diff_data(old_cap, new_cap, "capacitors", True)
-    plus_res, minus_res, _ = compare_boms.get_diff_data(old_res, new_res, "resistors", True)
-    plus_ind, minus_ind, _ = compare_boms.get_diff_data(old_ind, new_ind, "inductors", True)
-    new_sorted = sorted(new, key=lambda x: x.row)
+    old = compare_boms.get_normalized(old)
+    new = compare_boms.get_normalized(new)
+    new_sorted = sorted(new.components, key=lambda x: x.row)
     index = 0
     for (index, component) in enumerate(new_sorted):
-        if component.component_type not in [data_types.ComponentType.CAPACITOR, data_types.ComponentType.RESISTOR]:
-            if component.pn:
-                add_row(component, headers, sheet, index + 2, False)
-            if quantity:
-                paired = get_component_by_pn(component.pn, component.footprint, old)
-                if paired:
-                    if len(paired.designator) > len(component.designator):
-                        sheet["%s%i" % (ascii_uppercase[headers['quantity'] - 1], index + 2)].fill = \
-                            PatternFill("solid", fgColor='FF0000')
-                    elif len(paired.designator) < len(component.designator):
-                        sheet["%s%i" % (ascii_uppercase[headers['quantity'] - 1], index + 2)].fill = \
-                            PatternFill("solid", fgColor="00FF00")
-            if (component.pn, component.footprint) in plus_pn:
-                color_row(headers, sheet, '00FF00', index + 2)
-
-        if component.component_type == data_types.ComponentType.RESISTOR:
-            if component.details and component.details.value != -1:
-                add_row(component, headers, sheet, index + 2, True)
-                if (str(component.details.value) + 'R', component.footprint) in plus_res:
-                    color_row(headers, sheet, '00FF00', index + 2)
-                if quantity:
-                    paired = get_component_by_value(str(component.details.value) + 'R',
-                                                    component.footprint, component.component_type, old)
-                    if paired:
-                        if len(paired.designator) > len(component.designator):
-                            sheet["%s%i" % (ascii_uppercase[headers['quantity'] - 1], index + 2)].fill = \
-                                PatternFill("solid", fgColor='FF0000')
-                        elif len(paired.designator) < len(component.designator):
-                            sheet["%s%i" % (ascii_uppercase[headers['quantity'] - 1], index + 2)].fill = \
-                                PatternFill("solid", fgColor="00FF00")
-
-        if component.component_type == data_types.ComponentType.CAPACITOR:
-            if component.details and component.details.value:
-                add_row(component, headers, sheet, index + 2, True)
-                if (str(component.details.absolute_pf_value) + 'pf', component.footprint) in plus_cap:
-                    color_row(headers, sheet, '00FF00', index + 2)
-
-                if quantity:
-                    paired = get_component_by_value(str(component.details.absolute_pf_value) + 'pf',
-                                                    component.footprint, component.component_type, old)
-                    if paired:
-                        if len(paired.designator) > len(component.designator):
-                            sheet["%s%i" % (ascii_uppercase[headers['quantity'] - 1], index + 2)].fill = \
-                                PatternFill("solid", fgColor='FF0000')
-                        elif len(paired.designator) < len(component.designator):
-                            sheet["%s%i" % (ascii_uppercase[headers['quantity'] - 1], index + 2)].fill = \
-                                PatternFill("solid", fgColor="00FF00")
-
-        if component.component_type == data_types.ComponentType.INDUCTOR:
-            if not component.pn and component.details and component.details.value:
-                add_row(component, headers, sheet, index + 2, True)
-                if (component.details.value, component.footprint) in plus_ind:
-                    color_row(headers, sheet, '00FF00', index + 2)
-                if quantity:
-                    paired = get_component_by_value(str(component.details.value),
-                                                    component.footprint, component.component_type, old)
-                    if paired:
-                        if len(paired.designator) > len(component.designator):
-                            sheet["%s%i" % (ascii_uppercase[headers['quantity'] - 1], index + 2)].fill = \
-                                PatternFill("solid", fgColor='FF0000')
-                        elif len(paired.designator) < len(component.designator):
-                            sheet["%s%i" % (ascii_uppercase[headers['quantity'] - 1], index + 2)].fill = \
-                                PatternFill("solid", fgColor="00FF00")
+        details: Optional[bool] = get_written_details(component)
+        if details is None:
+            continue
+        add_row(component, headers, sheet, index + 2, details)
+        key: PartKey = get_part_key(component)
+        if key not in new.quantities:
+            continue
+        old_quantity: Optional[int] = old.quantities.get(key)
+        if old_quantity is None:
+            color_row(headers, sheet, '00FF00', index + 2)
+        elif quantity:
+            # quantities of part are summed over all its rows in both BOMs
+            color_quantity(headers, sheet, index + 2, old_quantity, new.quantities[key])
 
     added_rows = index + 3
-    for (pn, footprint) in minus_pn:
-        component = get_component_by_pn(pn, footprint, old)
-        if component:
-            add_row(component, headers, sheet, added_rows, False)
-            color_row(headers, sheet, 'FF0000', added_rows)
-            added_rows += 1
-    for (value, footprint) in minus_cap:
-        component = get_component_by_value(value, footprint, data_types.ComponentType.CAPACITOR, old)
-        if component:
-            add_row(component, headers, sheet, added_rows, False)
-            color_row(headers, sheet, 'FF0000', added_rows)
-            added_rows += 1
-    for (value, footprint) in minus_res & minus_ind:
-        component = get_component_by_value(value, footprint, data_types.ComponentType.RESISTOR, old)
-        if component:
-            add_row(component, headers, sheet, added_rows, False)
-            color_row(headers, sheet, 'FF0000', added_rows)
-            added_rows += 1
+    removed: List[data_types.Component] = sorted((component for (key, component) in old.parts.items()
+                                                  if key not in new.quantities), key=lambda x: x.row)
+    for component in removed:
+        # removed capacitors, resistors and inductors are written with their values
+        add_row(component, headers, sheet, added_rows, bool(get_written_details(component)))
+        color_row(headers, sheet, 'FF0000', added_rows)
+        added_rows += 1
 
 
-def write_results(old: List[data_types.Component], new: List[data_types.Component], filename1: str, filename2: str,
+def write_results(old: compare_boms.Bom, new: compare_boms.Bom, filename1: str, filename2: str,
                   headers: Dict[str, Optional[int]], quantity=False):
     """
     write results to results.xlsx workbook
     :param quantity: use quantity
-    :param new: list with new components
+    :param new: list with new components or normalized new BOM
     :param headers: headers
     :param filename2: name of second file
     :param filename1: name of first file
-    :param old: list with components
+    :param old: list with components or normalized old BOM
     :return:
     """
+    from openpyxl import Workbook
+    from openpyxl.styles import Font, Alignment
     wb = Workbook()
     ws1 = wb.active
     for header in headers.keys():
@@ -276,12 +215,15 @@ def compare_boms_new_pns(quantity=False, detailed=False):
             or os.path.isdir(sys.argv[3]):
         print("Both files should be existing files (not folders)")
         return
-    old, warning = xlsx_parce.get_components_from_xlxs(sys.argv[2])
+    old_components, warning = bom_cache.get_components_cached(sys.argv[2])
     print(warning)
-    new, warning = xlsx_parce.get_components_from_xlxs(sys.argv[3])
+    new_components, warning = bom_cache.get_components_cached(sys.argv[3])
     print(warning)
+    # BOMs are joined and indexed once for xlsx report and detailed comparing
+    old = compare_boms.normalize_bom(old_components, sys.argv[2])
+    new = compare_boms.normalize_bom(new_components, sys.argv[3])
     write_results(old, new, sys.argv[2], sys.argv[3],
-                  xlsx_parce.get_headers(load_workbook(filename=sys.argv[3]).active), quantity)
+                  xlsx_parce.get_file_headers(sys.argv[3]), quantity)
     if detailed:
         compare_boms.detail_compare(old, new, False)
 
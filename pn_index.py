@@ -0,0 +1,334 @@
+# service module with pn indexes for finding similar components
+# AhoCorasick finds all pns that are substrings of alternative pns in one pass over every alternative pn
+# PrefixIndex finds pns with common prefix of any length by bisect of sorted pns, pns may be inserted and removed
+# in any order for incremental indexes
+# DeletionIndex finds pns within edit distance for fuzzy matching
+# GramIndex finds alternative pns containing pn by substrings of fixed len, alternative pns may be added and removed
+
+import sys
+from bisect import bisect_left, bisect_right
+from typing import List, Dict, Set, Hashable, Optional, Tuple
+
+
+class AhoCorasick:
+    """
+    multi pattern substring search automaton, patterns are added, then automaton is built and texts are searched
+    """
+
+    def __init__(self):
+        self.patterns: List[str] = list()
+        self.pattern_ids: Dict[str, int] = dict()
+        # trie transitions, failure links, pattern ending in node and link to the nearest node with pattern
+        self.goto: List[Dict[str, int]] = [dict()]
+        self.fail: List[int] = [0]
+        self.output: List[int] = [-1]
+        self.output_link: List[int] = [-1]
+
+    def add(self, pattern: str) -> int:
+        """
+        adds pattern to automaton, must be called before build
+        :param pattern: not empty pattern
+        :return: pattern id, equal patterns have the same id
+        """
+        if pattern in self.pattern_ids:
+            return self.pattern_ids[pattern]
+        node: int = 0
+        for symbol in pattern:
+            next_node = self.goto[node].get(symbol)
+            if next_node is None:
+                next_node = len(self.goto)
+                self.goto[node][symbol] = next_node
+                self.goto.append(dict())
+                self.fail.append(0)
+                self.output.append(-1)
+                self.output_link.append(-1)
+            node = next_node
+        pattern_id: int = len(self.patterns)
+        self.patterns.append(pattern)
+        self.pattern_ids[pattern] = pattern_id
+        self.output[node] = pattern_id
+        return pattern_id
+
+    def build(self):
+        """
+        builds failure and output links by breadth first walk of trie
+        :return:
+        """
+        # nodes of first level fail to root
+        queue: List[int] = list(self.goto[0].values())
+        for node in queue:
+            for (symbol, next_node) in self.goto[node].items():
+                fail: int = self.fail[node]
+                while fail and symbol not in self.goto[fail]:
+                    fail = self.fail[fail]
+                self.fail[next_node] = self.goto[fail].get(symbol, 0)
+                fail_node: int = self.fail[next_node]
+                self.output_link[next_node] = fail_node if self.output[fail_node] != -1 else \
+                    self.output_link[fail_node]
+                queue.append(next_node)
+
+    def search(self, text: str) -> Set[int]:
+        """
+        finds all patterns that are substrings of text
+        :param text: text
+        :return: set of pattern ids
+        """
+        found: Set[int] = set()
+        node: int = 0
+        for symbol in text:
+            while node and symbol not in self.goto[node]:
+                node = self.fail[node]
+            node = self.goto[node].get(symbol, 0)
+            match: int = node if self.output[node] != -1 else self.output_link[node]
+            while match > 0:
+                found.add(self.output[match])
+                match = self.output_link[match]
+        return found
+
+
+def get_prefix_end(prefix: str) -> Optional[str]:
+    """
+    gets the least str that is bigger than all strs starting with prefix
+    :param prefix: prefix
+    :return: str or None if there is no such str
+    """
+    while prefix and prefix[-1] == chr(sys.maxunicode):
+        prefix = prefix[:-1]
+    if not prefix:
+        return None
+    return prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+class PrefixIndex:
+    """
+    sorted pns split by group (footprint and type), items of group with common pn prefix are got by bisect
+    items must be added in the order of pns, items of equal pns in increasing order, or inserted in any order
+    """
+
+    def __init__(self):
+        self.pns: Dict[Hashable, List[str]] = dict()
+        self.items: Dict[Hashable, List[int]] = dict()
+
+    def add(self, pn: str, group: Hashable, item: int):
+        """
+        adds pn to index
+        :param pn: pn, not less than last pn of group
+        :param group: group key
+        :param item: item id, bigger than last item of group with the same pn
+        :return:
+        """
+        self.pns.setdefault(group, list()).append(pn)
+        self.items.setdefault(group, list()).append(item)
+
+    def get_position(self, pn: str, group: Hashable, item: int) -> int:
+        """
+        gets position of item in group, items of equal pns are sorted
+        :param pn: pn
+        :param group: group key
+        :param item: item id
+        :return: position of item or position to insert item
+        """
+        pns: List[str] = self.pns.get(group, list())
+        start: int = bisect_left(pns, pn)
+        end: int = bisect_right(pns, pn, start)
+        return bisect_left(self.items.get(group, list()), item, start, end)
+
+    def insert(self, pn: str, group: Hashable, item: int):
+        """
+        inserts pn to index keeping pns sorted
+        :param pn: pn
+        :param group: group key
+        :param item: item id, not in index
+        :return:
+        """
+        position: int = self.get_position(pn, group, item)
+        self.pns.setdefault(group, list()).insert(position, pn)
+        self.items.setdefault(group, list()).insert(position, item)
+
+    def remove(self, pn: str, group: Hashable, item: int):
+        """
+        removes pn from index
+        :param pn: pn
+        :param group: group key
+        :param item: item id, absent item is not removed
+        :return:
+        """
+        position: int = self.get_position(pn, group, item)
+        items: List[int] = self.items.get(group, list())
+        if position == len(items) or items[position] != item or self.pns[group][position] != pn:
+            return
+        del self.pns[group][position]
+        del items[position]
+        if not items:
+            del self.pns[group]
+            del self.items[group]
+
+    def get_equal_items(self, pn: str, group: Hashable) -> List[int]:
+        """
+        gets items of group with pn
+        :param pn: pn
+        :param group: group key
+        :return: list of items
+        """
+        pns: List[str] = self.pns.get(group, list())
+        start: int = bisect_left(pns, pn)
+        return self.items.get(group, list())[start:bisect_right(pns, pn, start)]
+
+    def get_items(self, prefix: str, group: Hashable, after: int = -1) -> List[int]:
+        """
+        gets items of group which pns start with prefix
+        :param prefix: pn prefix of any length
+        :param group: group key
+        :param after: only items bigger than after are got, items must increase with pns for it
+        :return: list of items in pn order
+        """
+        pns: List[str] = self.pns.get(group, list())
+        start: int = bisect_left(pns, prefix)
+        prefix_end: Optional[str] = get_prefix_end(prefix)
+        end: int = bisect_left(pns, prefix_end, start) if prefix_end is not None else len(pns)
+        items: List[int] = self.items.get(group, list())
+        if after != -1:
+            start = bisect_right(items, after, start, end)
+        return items[start:end]
+
+
+def get_edit_distance(first: str, second: str) -> int:
+    """
+    gets optimal string alignment distance: number of inserted, deleted and replaced symbols and transpositions of
+    two adjacent symbols, every symbol is edited once
+    :param first: str
+    :param second: str
+    :return: distance
+    """
+    if len(first) < len(second):
+        first, second = second, first
+    # rows of distances for prefixes of first without the last two symbols and without the last symbol
+    before_previous: List[int] = list()
+    previous: List[int] = list(range(len(second) + 1))
+    for (index, symbol) in enumerate(first):
+        current: List[int] = [index + 1]
+        for (second_index, second_symbol) in enumerate(second):
+            distance: int = min(previous[second_index + 1] + 1, current[second_index] + 1,
+                                previous[second_index] + (symbol != second_symbol))
+            if index and second_index and symbol == second[second_index - 1] \
+                    and first[index - 1] == second_symbol:
+                distance = min(distance, before_previous[second_index - 1] + 1)
+            current.append(distance)
+        before_previous, previous = previous, current
+    return previous[-1]
+
+
+def get_deletions(key: str, max_distance: int) -> Set[str]:
+    """
+    gets all strs made by deleting up to max_distance symbols of key, key itself included
+    :param key: str
+    :param max_distance: max number of deleted symbols
+    :return: set of strs
+    """
+    deletions: Set[str] = {key}
+    level: Set[str] = {key}
+    for _ in range(max_distance):
+        level = {variant[:index] + variant[index + 1:] for variant in level for index in range(len(variant))}
+        deletions |= level
+    return deletions
+
+
+class DeletionIndex:
+    """
+    inverted index of strs by their deletion variants for search of strs within edit distance
+    if edit distance of two strs is up to k, they have common variant made by deleting up to k symbols of each,
+    so only strs with common variants are compared and strs are not compared by pairs
+    """
+
+    def __init__(self, max_distance: int = 1):
+        self.max_distance: int = max_distance
+        self.keys: List[str] = list()
+        self.variants: Dict[str, List[int]] = dict()
+
+    def add(self, key: str) -> int:
+        """
+        adds key to index
+        :param key: str key
+        :return: key id
+        """
+        key_id: int = len(self.keys)
+        self.keys.append(key)
+        for variant in get_deletions(key, self.max_distance):
+            self.variants.setdefault(variant, list()).append(key_id)
+        return key_id
+
+    def search(self, key: str) -> List[Tuple[int, int]]:
+        """
+        finds keys within edit distance of key
+        :param key: str key
+        :return: list of (key id, distance) sorted by key id
+        """
+        candidates: Set[int] = set()
+        for variant in get_deletions(key, self.max_distance):
+            candidates.update(self.variants.get(variant, list()))
+        found: List[Tuple[int, int]] = list()
+        for key_id in sorted(candidates):
+            if abs(len(self.keys[key_id]) - len(key)) <= self.max_distance:
+                distance: int = get_edit_distance(key, self.keys[key_id])
+                if distance <= self.max_distance:
+                    found.append((key_id, distance))
+        return found
+
+
+class GramIndex:
+    """
+    inverted index of strs by their substrings of gram_len symbols (grams) for substring search
+    str containing pattern has all grams of pattern, so only strs with the rarest gram of pattern are checked
+    strs may be added and removed in any order, patterns shorter than gram_len are checked with all strs
+    """
+
+    def __init__(self, gram_len: int = 3):
+        self.gram_len: int = gram_len
+        self.texts: Set[str] = set()
+        self.grams: Dict[str, Set[str]] = dict()
+
+    def get_grams(self, text: str) -> Set[str]:
+        """
+        gets grams of str
+        :param text: str
+        :return: set of grams, empty if str is shorter than gram_len
+        """
+        return {text[start:start + self.gram_len] for start in range(len(text) - self.gram_len + 1)}
+
+    def add(self, text: str):
+        """
+        adds str to index
+        :param text: str, str that is in index is not added again
+        :return:
+        """
+        if text in self.texts:
+            return
+        self.texts.add(text)
+        for gram in self.get_grams(text):
+            self.grams.setdefault(gram, set()).add(text)
+
+    def remove(self, text: str):
+        """
+        removes str from index
+        :param text: str, absent str is not removed
+        :return:
+        """
+        if text not in self.texts:
+            return
+        self.texts.discard(text)
+        for gram in self.get_grams(text):
+            texts: Set[str] = self.grams[gram]
+            texts.discard(text)
+            if not texts:
+                del self.grams[gram]
+
+    def search(self, pattern: str) -> List[str]:
+        """
+        finds strs containing pattern
+        :param pattern: str to find
+        :return: list of strs in any order
+        """
+        grams: Set[str] = self.get_grams(pattern)
+        candidates: Set[str] = min((self.grams.get(gram, set()) for gram in grams), key=len) if grams \
+            else self.texts
+        return [text for text in candidates if pattern in text]
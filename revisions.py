@@ -0,0 +1,144 @@
+# service module, comparing of BOM revision chain
+# components of all revisions are counted in one dict by part key, so every BOM is read once and comparing is
+# linear in the number of rows of all revisions, not in the number of revision pairs
+
+import csv
+import json
+from typing import List, Optional, Dict, Tuple, TextIO, Any
+
+from dataclasses import dataclass
+
+import data_types
+from bom_index import PartKey, pn_part, count_parts
+
+
+@dataclass
+class PartRow:
+    key: PartKey
+    # pn or value of the part
+    title: str
+    footprint: str
+    # summed quantity of part rows in every revision, None if part is absent
+    quantities: List[Optional[int]]
+
+    def get_first_added(self) -> int:
+        """
+        gets revision where part appears first
+        :return: revision index
+        """
+        return next(index for (index, quantity) in enumerate(self.quantities) if quantity is not None)
+
+    def get_last_removed(self) -> Optional[int]:
+        """
+        gets the last revision where part is absent and it is present in previous revision
+        :return: revision index or None if part was never removed
+        """
+        for index in range(len(self.quantities) - 1, 0, -1):
+            if self.quantities[index] is None and self.quantities[index - 1] is not None:
+                return index
+        return None
+
+
+class RevisionMatrix:
+    """
+    part x revision matrix of quantities, parts are in the order of their first appearance
+    """
+
+    def __init__(self, revisions: List[str]):
+        self.revisions: List[str] = revisions
+        self.parts: Dict[PartKey, PartRow] = dict()
+
+    def add(self, revision: int, components: List[data_types.Component]):
+        """
+        adds components of revision, components without pn and value are skipped
+        :param revision: revision index
+        :param components: parsed components of revision
+        :return:
+        """
+        first_components, quantities = count_parts(components)
+        for (key, quantity) in quantities.items():
+            part: Optional[PartRow] = self.parts.get(key)
+            if part is None:
+                component: data_types.Component = first_components[key]
+                title: str = component.pn if key[0] == pn_part else \
+                    "%s %s" % (component.component_type.name.lower(), component.value_key)
+                part = PartRow(key=key, title=title, footprint=component.footprint,
+                               quantities=[None] * len(self.revisions))
+                self.parts[key] = part
+            part.quantities[revision] = quantity
+
+
+def get_revision_matrix(boms: List[Tuple[str, List[data_types.Component]]]) -> RevisionMatrix:
+    """
+    builds matrix of revisions
+    :param boms: list of (filename, components) in revision order
+    :return: matrix
+    """
+    matrix = RevisionMatrix([filename for (filename, _) in boms])
+    for (revision, (_, components)) in enumerate(boms):
+        matrix.add(revision, components)
+    return matrix
+
+
+def get_part_dict(matrix: RevisionMatrix, part: PartRow) -> Dict[str, Any]:
+    """
+    gets part row as dict of json types
+    :param matrix: matrix
+    :param part: part row
+    :return: dict
+    """
+    removed: Optional[int] = part.get_last_removed()
+    return {'part': part.title, 'footprint': part.footprint, 'quantities': part.quantities,
+            'present': [quantity is not None for quantity in part.quantities],
+            'first_added': matrix.revisions[part.get_first_added()],
+            'last_removed': matrix.revisions[removed] if removed is not None else None}
+
+
+def render_text(matrix: RevisionMatrix, stream: TextIO):
+    """
+    writes matrix as text table, absent part is «-»
+    :param matrix: matrix
+    :param stream: file to write
+    :return:
+    """
+    for (index, revision) in enumerate(matrix.revisions):
+        stream.write("R%i: %s\n" % (index + 1, revision))
+    columns: str = ' '.join('%6s' % ('R%i' % (index + 1)) for index in range(len(matrix.revisions)))
+    stream.write("%-30s %-15s %s %-7s %s\n" % ('Part', 'Footprint', columns, 'Added', 'Removed'))
+    for part in matrix.parts.values():
+        removed: Optional[int] = part.get_last_removed()
+        stream.write("%-30s %-15s %s %-7s %s\n" %
+                     (part.title, part.footprint, ' '.join('%6s' % ('-' if quantity is None else quantity)
+                                                           for quantity in part.quantities),
+                      'R%i' % (part.get_first_added() + 1), 'R%i' % (removed + 1) if removed is not None else '-'))
+
+
+def render_jsonl(matrix: RevisionMatrix, stream: TextIO):
+    """
+    writes matrix as JSON Lines, revisions in the first line and then one part in line
+    :param matrix: matrix
+    :param stream: file to write
+    :return:
+    """
+    stream.write(json.dumps({'revisions': matrix.revisions}, ensure_ascii=False) + '\n')
+    for part in matrix.parts.values():
+        stream.write(json.dumps(get_part_dict(matrix, part), ensure_ascii=False) + '\n')
+
+
+def render_csv(matrix: RevisionMatrix, stream: TextIO):
+    """
+    writes matrix as CSV with quantity column for every revision, absent part has empty quantity
+    :param matrix: matrix
+    :param stream: file to write
+    :return:
+    """
+    writer = csv.writer(stream, lineterminator='\n')
+    writer.writerow(['part', 'footprint', *matrix.revisions, 'first_added', 'last_removed'])
+    for part in matrix.parts.values():
+        row: Dict[str, Any] = get_part_dict(matrix, part)
+        writer.writerow([part.title, part.footprint, *['' if quantity is None else quantity
+                                                       for quantity in part.quantities],
+                         row['first_added'], row['last_removed'] or ''])
+
+
+renderers = {'text': render_text, 'jsonl': render_jsonl, 'csv': render_csv}
@@ -1,6 +1,28 @@
 import unittest
+import os
+import shutil
+import tempfile
 import xlsx_parce
+import bom_cache
+import find_duplicates
+import diagnostics
+import csv
+import io
+import json
+import bench_startup
+import duplicate_index
+import component_table
+import sys
+from concurrent.futures import ThreadPoolExecutor
 import duplicates
+import pn_index
+import value_groups
+import bom_index
+import diff_result
+import revisions
+import designators
+import where_used
+import get_xlsx_diff
 from openpyxl import load_workbook
 import data_types
 import compare_boms
@@ -19,6 +41,14 @@ filename_new = "test_data\\v2.1.xlsx"
 filename_old = 'test_data\\V1.6.xlsx'
 filename_duplicate = 'test_data\\BOM_Test.xlsx'
 
+
+def make_component(row, component_type, **fields):
+    # component with match keys like parced one
+    component = data_types.Component(row=row, component_type=component_type, **fields)
+    data_types.set_match_keys(component)
+    return component
+
+
 types_etalon = {1: 14, 5: 9, 8: 1, 2: 2, 4: 2, 7: 3, 3: 3, 0: 30, 11: 1}
 
 
@@ -68,6 +98,93 @@ class XLSXParceTest(unittest.TestCase):
         self.assertTrue(xlsx_parce.check_for_not_used((sheet, 14, header_index_etalon)))
         self.assertFalse(xlsx_parce.check_for_not_used((sheet, 15, header_index_etalon)))
 
+    def testReadOnlyTheSame(self):
+        data, warning = xlsx_parce.get_components_from_xlxs(filename, read_only=True)
+        self.assertEqual(data, self.data)
+        self.assertEqual(warning, self.warning)
+
+    def testRowValues(self):
+        offsets = xlsx_parce.get_offsets(header_index_etalon)
+        values = ('Resistor', None, None, None, None, 'R1, R2', 'R0402', None, '4k7', None, 0.01, 'not used')
+        self.assertEqual(xlsx_parce.get_value('designator', values, 2, offsets), 'R1, R2')
+        self.assertEqual(xlsx_parce.get_value('quantity', values, 2, offsets), "")
+        self.assertTrue(xlsx_parce.check_for_not_used((values, 2, offsets)))
+
+
+class CSVParceTest(unittest.TestCase):
+
+    def setUp(self):
+        self.bom_dir = tempfile.mkdtemp()
+        sheet = load_workbook(filename=filename).active
+        for (extension, delimiter) in [('.csv', ','), ('.tsv', '\t')]:
+            with open(os.path.join(self.bom_dir, 'v2.1' + extension), 'w', newline='', encoding='utf-8') as f:
+                writer = csv.writer(f, delimiter=delimiter)
+                for row in sheet.iter_rows(values_only=True):
+                    writer.writerow(['' if value is None else value for value in row])
+        self.data, self.warning = xlsx_parce.get_components_from_xlxs(filename)
+
+    def tearDown(self):
+        shutil.rmtree(self.bom_dir)
+
+    def testCSVTheSame(self):
+        data, warning = xlsx_parce.get_components_from_file(os.path.join(self.bom_dir, 'v2.1.csv'))
+        self.assertEqual(data, self.data)
+        self.assertEqual(warning.count('not used'), 3)
+
+    def testTSVTheSame(self):
+        data, _ = xlsx_parce.get_components_from_file(os.path.join(self.bom_dir, 'v2.1.tsv'))
+        self.assertEqual(data, self.data)
+
+    def testCSVHeaders(self):
+        self.assertEqual(xlsx_parce.get_file_headers(os.path.join(self.bom_dir, 'v2.1.csv')), header_index_etalon)
+
+    def testNotUtf8(self):
+        name = os.path.join(self.bom_dir, 'cp1251.csv')
+        with open(os.path.join(self.bom_dir, 'v2.1.csv'), encoding='utf-8', newline='') as f:
+            lines = [line for line in f if line == line.encode('cp1251', 'ignore').decode('cp1251')]
+        lines[1] = lines[1].replace('\r\n', ',Конденсатор\r\n')
+        for (encoding, bom) in [('utf-8', 'utf8.csv'), ('cp1251', 'cp1251.csv')]:
+            with open(os.path.join(self.bom_dir, bom), 'w', newline='', encoding=encoding) as f:
+                f.write(''.join(lines))
+        collector = diagnostics.Diagnostics()
+        data, warning = xlsx_parce.get_components_from_file(name, collector)
+        utf8_data, utf8_warning = xlsx_parce.get_components_from_file(os.path.join(self.bom_dir, 'utf8.csv'))
+        self.assertTrue(data)
+        self.assertEqual(data, utf8_data)
+        self.assertFalse('is not utf-8' in utf8_warning)
+        self.assertTrue('is not utf-8, it is read as cp1251' in warning)
+        self.assertEqual(collector.count(diagnostics.WarningCode.ENCODING), 1)
+        self.assertEqual(xlsx_parce.get_file_headers(name), header_index_etalon)
+
+
+class DiagnosticsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.diagnostics = diagnostics.Diagnostics()
+        _, self.warning = xlsx_parce.get_components_from_xlxs(filename, read_only=True, diagnostics=self.diagnostics)
+
+    def testNotUsedCount(self):
+        self.assertEqual(self.diagnostics.count(diagnostics.WarningCode.NOT_USED), 3)
+        self.assertEqual([record.row for record in self.diagnostics.records
+                          if record.code == diagnostics.WarningCode.NOT_USED],
+                         [int(line.split()[1]) for line in self.warning.splitlines() if 'not used' in line])
+
+    def testRender(self):
+        self.assertTrue(self.warning.endswith(self.diagnostics.render()))
+        self.assertTrue(all(record.filename == filename for record in self.diagnostics.records))
+
+    def testAbsentHeaders(self):
+        header_diagnostics = diagnostics.Diagnostics()
+        xlsx_parce.get_headers_from_values(('Type', 'PN', 'Designator'), header_diagnostics)
+        self.assertEqual(header_diagnostics.count(diagnostics.WarningCode.ABSENT_HEADERS), 1)
+        self.assertTrue('footprint, value' in header_diagnostics.render())
+
+    def testThreads(self):
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            results = list(executor.map(xlsx_parce.get_components_from_xlxs, [filename_old, filename_new]))
+        self.assertEqual(results[0][1], xlsx_parce.get_components_from_xlxs(filename_old)[1])
+        self.assertEqual(results[1][1], self.warning)
+
 
 class FootprintsTest(unittest.TestCase):
 
@@ -105,6 +222,31 @@ class ResistorTest(unittest.TestCase):
     def testMValue(self):
         self.assertEqual(xlsx_parce.get_resistor_value('1M'), 1000000)
 
+    def testOhmValue(self):
+        self.assertEqual(xlsx_parce.get_resistor_value('10 kOhm'), 10000)
+
+    def testFractionAfterLetter(self):
+        self.assertEqual(xlsx_parce.get_resistor_value('6r8'), 6.8)
+
+    def testCacheStats(self):
+        xlsx_parce.get_resistor_value('33k')
+        hits = xlsx_parce.get_value_cache_stats()['resistor']['hits']
+        xlsx_parce.get_resistor_value('33k')
+        stats = xlsx_parce.get_value_cache_stats()['resistor']
+        self.assertEqual(stats['hits'], hits + 1)
+        self.assertTrue(0 < stats['hit_rate'] <= 1)
+
+    def testAddedStats(self):
+        stats = xlsx_parce.get_value_cache_stats()
+        added = dict(xlsx_parce.added_cache_stats)
+        try:
+            xlsx_parce.add_value_cache_stats({'resistor': {'hits': 2, 'misses': 3}})
+            self.assertEqual(xlsx_parce.get_value_cache_stats()['resistor']['hits'], stats['resistor']['hits'] + 2)
+            self.assertEqual(xlsx_parce.get_value_cache_stats()['resistor']['misses'],
+                             stats['resistor']['misses'] + 3)
+        finally:
+            xlsx_parce.added_cache_stats = added
+
 
 class CapacitorDataTest(unittest.TestCase):
 
@@ -125,6 +267,22 @@ class CapacitorDataTest(unittest.TestCase):
     def testError(self):
         self.assertEqual(xlsx_parce.get_capacitor_value_and_unit("4.7fF"), (None, None, None, None))
 
+    def testFractionAfterLetter(self):
+        self.assertEqual(xlsx_parce.get_capacitor_value_and_unit("4n7"), (4.7, data_types.units_cap.index('n'),
+                                                                          [data_types.Dielectric.X5R,
+                                                                           data_types.Dielectric.X7R], 4700))
+        self.assertEqual(xlsx_parce.get_capacitor_value_and_unit("2u2F")[::3], (2.2, 2200000))
+        self.assertEqual(xlsx_parce.get_capacitor_value_and_unit("1.5pF")[::3], (1.5, 1.5))
+
+    def testNoUnit(self):
+        self.assertEqual(xlsx_parce.get_capacitor_value_and_unit("100"), (None, None, None, None))
+
+    def testDielectricNotShared(self):
+        first = xlsx_parce.get_capacitor_value_and_unit("10uF")[2]
+        first.append(data_types.Dielectric.NP0)
+        self.assertEqual(xlsx_parce.get_capacitor_value_and_unit("10uF")[2],
+                         [data_types.Dielectric.X5R, data_types.Dielectric.X7R])
+
 
 class CompareTest(unittest.TestCase):
 
@@ -137,7 +295,9 @@ class CompareTest(unittest.TestCase):
                                   filename_duplicate.split('\\')[1], 35, 31)])
 
     def testSimilarPns(self):
-        _, similar, _, _ = duplicates.compare_pns(self.data, 5, False)
+        # tails are not compared by default like in duplicates index
+        self.assertEqual(duplicates.compare_pns(self.data, 5, False), duplicates.compare_pns(self.data, 5, False, 0))
+        _, similar, _, _ = duplicates.compare_pns(self.data, 5, False, tail_len=0)
         self.assertEqual(similar, [(filename_duplicate.split('\\')[1], 30, 9,
                                     filename_duplicate.split('\\')[1], 31, 10),
                                    (filename_duplicate.split('\\')[1], 30, 9,
@@ -147,11 +307,17 @@ class CompareTest(unittest.TestCase):
 
     def testAltPns(self):
         _, _, alternative, _ = duplicates.compare_pns(self.data, 8, False)
-        self.assertEqual(alternative, [(filename_duplicate.split('\\')[1], 19, 1,
+        self.assertEqual(alternative, [(filename_duplicate.split('\\')[1], 19, 15,
                                         filename_duplicate.split('\\')[1], 23, 19),
-                                       (filename_duplicate.split('\\')[1], 30, 9,
+                                       (filename_duplicate.split('\\')[1], 30, 26,
                                         filename_duplicate.split('\\')[1], 31, 27)])
 
+    def testSimilarPnsTail(self):
+        # crystals KX-6 have different frequencies at the end of pn
+        _, similar, _, _ = duplicates.compare_pns(self.data, 5, False, tail_len=4)
+        self.assertEqual(similar, [(filename_duplicate.split('\\')[1], 25, 17,
+                                    filename_duplicate.split('\\')[1], 26, 18)])
+
     def testPNPrecise(self):
         equal, similar, alt, _ = duplicates.compare_pns(self.data, 8, True)
         self.assertEqual(equal,
@@ -179,38 +345,39 @@ class CompareBoms(unittest.TestCase):
     def setUp(self):
         self.new, _ = xlsx_parce.get_components_from_xlxs(filename_new)
         self.old, _ = xlsx_parce.get_components_from_xlxs(filename_old)
-        self.old_pn, self.old_cap, self.old_res, self.old_ind = compare_boms.get_comp_list_precise(self.old)
-        self.new_pn, self.new_cap, self.new_res, self.new_ind = compare_boms.get_comp_list_precise(self.new)
+        self.result = compare_boms.get_bom_diff(self.old, self.new)
+
+    def get_keys(self, records, category):
+        return {(record.key, record.footprint) for record in records if record.category == category}
 
     def testPNDiff(self):
-        plus, minus, _ = compare_boms.get_diff_data(self.old_pn, self.new_pn, "partnumbers", True)
-        self.assertEqual(plus, {('LMBR160FT1G', 'SOD123-FL')})
-        self.assertEqual(minus, {('AP6398S', 'AP6356S'),
-                                 ('KX-6 37.4 MHz 10/10ppm 18pF', '2520'),
-                                 ('NU/LMBR160FT1G', 'SOD123-FL'),
-                                 ('U.FL-R-SMT-1', 'U.FL-R-SMT-1'),
-                                 ('WPM3401', 'SOT23')})
+        self.assertEqual(self.get_keys(self.result.added(), 'partnumbers'), {('LMBR160FT1G', 'SOD123-FL')})
+        self.assertEqual(self.get_keys(self.result.removed(), 'partnumbers'),
+                         {('AP6398S', 'AP6356S'),
+                          ('KX-6 37.4 MHz 10/10ppm 18pF', '2520'),
+                          ('NU/LMBR160FT1G', 'SOD123-FL'),
+                          ('U.FL-R-SMT-1', 'U.FL-R-SMT-1'),
+                          ('WPM3401', 'SOT23')})
 
     def testCapDiff(self):
-        plus, minus, _ = compare_boms.get_diff_data(self.old_cap, self.new_cap, "capacitors", True)
-        self.assertEqual(plus, {('18pf', '0603')})
-        self.assertEqual(minus, {('10pf', '0402'), ('18pf', '0402')})
+        self.assertEqual(self.get_keys(self.result.added(), 'capacitors'), {('18pf', '0603')})
+        self.assertEqual(self.get_keys(self.result.removed(), 'capacitors'), {('10pf', '0402'), ('18pf', '0402')})
 
     def testResDiff(self):
-        plus, minus, _ = compare_boms.get_diff_data(self.old_res, self.new_res, "resistors", True)
-        self.assertEqual(plus, {('12000R', '0402')})
-        self.assertEqual(minus, {('127000R', '0402')})
+        self.assertEqual(self.get_keys(self.result.added(), 'resistors'), {('12000R', '0402')})
+        self.assertEqual(self.get_keys(self.result.removed(), 'resistors'), {('127000R', '0402')})
 
     def testNoDeleted(self):
-        _, _, res = compare_boms.get_diff_data(self.old_pn, self.new_pn, "partnumbers", False)
-        self.assertFalse('deleted' in res.lower())
+        stream = io.StringIO()
+        diff_result.render_text(self.result, stream, deleted=False)
+        self.assertFalse('deleted' in stream.getvalue().lower())
 
     def testComponentsInList(self):
-        self.assertEqual(self.new[3], compare_boms.find_components_in_list(self.old[3], self.new))
+        self.assertEqual(self.new[3], compare_boms.find_components_in_list(self.old[3], bom_index.BomIndex(self.new)))
 
     def testAbsentComponents(self):
         component = [component for component in self.old if component.pn == 'AP6398S'][0]
-        self.assertIsNone(compare_boms.find_components_in_list(component, self.new))
+        self.assertIsNone(compare_boms.find_components_in_list(component, bom_index.BomIndex(self.new)))
 
 
 class TestJoin(unittest.TestCase):
@@ -219,7 +386,8 @@ class TestJoin(unittest.TestCase):
         self.new, _ = xlsx_parce.get_components_from_xlxs(filename_new)
         self.old, _ = xlsx_parce.get_components_from_xlxs(filename_old)
         self.old_len = len(self.old)
-        compare_boms.join_the_same(self.old)
+        self.parsed = self.old
+        self.old = compare_boms.join_the_same(self.old)
 
     def testJoinPN(self):
         self.assertEqual(len(self.old) + 3, self.old_len)
@@ -236,6 +404,17 @@ class TestJoin(unittest.TestCase):
         self.assertEqual(len(joined_res.designator), 5)
         self.assertTrue('R200' in joined_res.designator)
 
+    def testJoinRows(self):
+        self.assertEqual(len(self.parsed), self.old_len)
+        self.assertEqual(sorted(row for component in self.old for row in component.rows or [component.row]),
+                         sorted(component.row for component in self.parsed))
+        joined_res = [component for component in self.old if component.row == 49][0]
+        self.assertEqual(joined_res.rows[0], 49)
+        self.assertEqual(len(joined_res.rows), 2)
+        parsed_res = [component for component in self.parsed if component.row == 49][0]
+        self.assertEqual(parsed_res.rows, [])
+        self.assertNotEqual(len(parsed_res.designator), len(joined_res.designator))
+
     # def testCorrect(self):
     #    component_false = [component for component in self.old if component.row == 46][0]
     #    self.assertFalse(compare_boms.check_component(component_false))
@@ -245,6 +424,837 @@ class TestJoin(unittest.TestCase):
         self.new_pn = self.new_res = self.new_ind = list()
 
 
+class BomIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        self.components, _ = xlsx_parce.get_components_from_xlxs(filename_duplicate)
+        self.index = bom_index.BomIndex(self.components)
+
+    def testFindAll(self):
+        for component in self.components:
+            found = self.index.find(component)
+            self.assertEqual(found.footprint_key, component.footprint_key)
+            self.assertLessEqual(self.components.index(found), self.components.index(component))
+
+    def testByValue(self):
+        capacitor = [component for component in self.components
+                     if component.component_type == data_types.ComponentType.CAPACITOR and component.value_key][0]
+        self.assertIs(self.index.get_by_value(data_types.ComponentType.CAPACITOR, capacitor.value_key,
+                                              capacitor.footprint_key), capacitor)
+        self.assertIsNone(self.index.get_by_value(data_types.ComponentType.RESISTOR, capacitor.value_key,
+                                                  capacitor.footprint_key))
+
+    def testByPn(self):
+        component = [component for component in self.components if component.pn][0]
+        self.assertIs(self.index.get_by_pn(component.pn.lower(), component.footprint.strip().lower()), component)
+        self.assertIsNone(self.index.get_by_pn(component.pn_key, 'absent footprint'))
+
+    def testNoValue(self):
+        # capacitor without value has zero value after parsing, it is compared by pn
+        bom = [make_component(row, comp_type, pn='GRM155R71C104KA88D', footprint='0402',
+                              designator=designators.Designators.parse('C1, C2'), details=details)
+               for (row, comp_type, details) in [
+                   (2, data_types.ComponentType.CAPACITOR, data_types.Capacitor(value=0, unit=data_types.CapUnits.PF,
+                                                                                absolute_pf_value=0, dielectric=[])),
+                   (3, data_types.ComponentType.RESISTOR, data_types.Resistor(value=0, tolerance=1))]]
+        self.assertEqual(bom_index.get_part_key(bom[0]), (bom_index.pn_part, 'grm155r71c104ka88d', '0402'))
+        self.assertEqual(bom_index.get_part_key(bom[1]), (data_types.ComponentType.RESISTOR.value, '0R', '0402'))
+        self.assertIs(bom_index.BomIndex(bom).find(bom[0]), bom[0])
+        self.assertEqual(compare_boms.get_detail_diff(bom[:1], bom[:1], True).records, [])
+        self.assertEqual(list(bom_index.count_parts(bom[:1])[1].values()), [2])
+
+
+class NormalizedBomTest(unittest.TestCase):
+
+    def setUp(self):
+        self.old, _ = xlsx_parce.get_components_from_xlxs(filename_old)
+        self.designators = [list(component.designator) for component in self.old]
+        self.bom = compare_boms.normalize_bom(self.old, filename_old)
+
+    def testNotChanged(self):
+        self.assertEqual([component.designator for component in self.old], self.designators)
+        self.assertEqual(list(self.bom.components), self.old)
+        with self.assertRaises(AttributeError):
+            self.bom.joined = tuple()
+
+    def testJoined(self):
+        self.assertEqual(len(self.bom.joined) + 3, len(self.old))
+        joined_component = [component for component in self.bom.joined if component.pn == 'TLV62569PDDC'][0]
+        self.assertEqual(len(joined_component.designator), 4)
+        self.assertIs(self.bom.index.find(joined_component), joined_component)
+
+    def testNormalizedOnce(self):
+        self.assertIs(compare_boms.get_normalized(self.bom), self.bom)
+        self.assertIsNot(compare_boms.get_normalized(self.old), self.bom)
+
+
+class DiffResultTest(unittest.TestCase):
+
+    def setUp(self):
+        self.new, _ = xlsx_parce.get_components_from_xlxs(filename_new)
+        self.old, _ = xlsx_parce.get_components_from_xlxs(filename_old)
+        self.result = compare_boms.get_bom_diff(self.old, self.new)
+        self.result.extend(compare_boms.get_detail_diff(self.old, self.new))
+
+    def testKeys(self):
+        old_pn, _, _, _ = compare_boms.get_comp_list_precise(self.old)
+        new_pn, _, _, _ = compare_boms.get_comp_list_precise(self.new)
+        self.assertEqual({(record.key, record.footprint) for record in self.result.added()
+                          if record.category == 'partnumbers'}, set(new_pn) - set(old_pn))
+        self.assertEqual({(record.key, record.footprint) for record in self.result.removed()
+                          if record.category == 'partnumbers'}, set(old_pn) - set(new_pn))
+
+    def testChanged(self):
+        changed = [record for record in self.result.changed() if record.category == diff_result.component_category]
+        self.assertTrue(changed)
+        self.assertTrue(all(record.changes for record in changed))
+        self.assertEqual([record.old_row for record in changed], sorted(record.old_row for record in changed))
+        removed = [record for record in changed if record.new_row is None]
+        self.assertTrue(all(record.new_quantity == 0 for record in removed))
+
+    def testText(self):
+        stream = io.StringIO()
+        diff_result.render(self.result, stream)
+        text = stream.getvalue()
+        self.assertTrue(text.startswith("COMPONENT DIFFERENCE:\n\nAdded partnumbers in second file:{("))
+        self.assertTrue("DETAILED COMPARING THE SAME POSITIONS:" in text)
+        self.assertEqual(text.count("changes are the following"),
+                         len(list(self.result.get_records(diff_result.DiffKind.CHANGED,
+                                                          diff_result.component_category))))
+
+    def testJsonLines(self):
+        stream = io.StringIO()
+        diff_result.render(self.result, stream, 'jsonl', deleted=False)
+        records = [json.loads(line) for line in stream.getvalue().splitlines()]
+        self.assertEqual(len(records), len(self.result.records) - len(self.result.removed()))
+        self.assertEqual(records[0]['kind'], 'added')
+        self.assertTrue(all(record['kind'] != 'removed' for record in records))
+
+    def testCSV(self):
+        stream = io.StringIO()
+        diff_result.render(self.result, stream, 'csv')
+        rows = list(csv.DictReader(io.StringIO(stream.getvalue())))
+        self.assertEqual(len(rows), len(self.result.records))
+        self.assertEqual(rows[-1]['changes'], '; '.join(self.result.records[-1].changes))
+
+
+class PartDiffTest(unittest.TestCase):
+
+    def setUp(self):
+        self.new, _ = xlsx_parce.get_components_from_xlxs(filename_new)
+        self.old, _ = xlsx_parce.get_components_from_xlxs(filename_old)
+        self.result = compare_boms.get_bom_diff(self.old, self.new)
+
+    def get_bom(self, rows):
+        return [make_component(row, data_types.ComponentType.CHIP, pn=pn, footprint='SOT23',
+                               designator=designators.Designators.parse(references))
+                for (row, pn, references) in rows]
+
+    def testSplitRows(self):
+        old = self.get_bom([(2, 'BAT54', 'D1, D2'), (3, 'BAT54', 'D3'), (4, 'LM358', 'U1')])
+        new = self.get_bom([(2, 'bat54', 'D1-D3'), (3, 'LM358', 'U1'), (4, 'LM358', 'U2')])
+        result = compare_boms.get_bom_diff(old, new)
+        self.assertEqual(len(result.records), 1)
+        record = result.records[0]
+        self.assertEqual((record.kind, record.key, record.old_row, record.new_row), (diff_result.DiffKind.CHANGED,
+                                                                                     'LM358', 4, 3))
+        self.assertEqual((record.old_quantity, record.new_quantity), (1, 2))
+        self.assertEqual(record.changes, ["Quantity changed: was 1, now 2"])
+
+    def testQuantities(self):
+        part = [record for record in self.result.changed() if record.key == 'TLV62569PDDC'][0]
+        self.assertEqual((part.category, part.old_quantity, part.new_quantity), ('partnumbers', 4, 2))
+        removed = [record for record in self.result.removed() if record.key == 'WPM3401'][0]
+        self.assertEqual((removed.old_quantity, removed.new_quantity), (1, None))
+        self.assertTrue(all(record.category in diff_result.categories for record in self.result.records))
+
+    def testText(self):
+        stream = io.StringIO()
+        diff_result.render(self.result, stream)
+        self.assertTrue(" Quantity changed partnumbers in second file:{('TLV62569PDDC', 'DDC(R-PDSO-G6)'): 4 -> 2"
+                        in stream.getvalue())
+        self.assertFalse("QUANTITY CHANGED" in stream.getvalue())
+        self.result.quantity = True
+        stream = io.StringIO()
+        diff_result.render(self.result, stream, deleted=False)
+        text = stream.getvalue()
+        self.assertFalse(" Deleted " in text or " Quantity changed " in text)
+        self.assertTrue("For PN: TLV62569PDDC, footprint: DDC(R-PDSO-G6), former row 25, new row 25 changes are the "
+                        "following: \nQuantity changed: was 4, now 2\n" in text)
+        self.assertTrue("For PN: WPM3401, footprint: SOT23, former row" in text)
+        self.assertEqual(text.count("changes are the following"),
+                         len(self.result.changed()) + len(self.result.removed()))
+
+
+class XlsxDiffTest(unittest.TestCase):
+
+    def setUp(self):
+        from openpyxl import Workbook
+        self.old = compare_boms.normalize_bom(xlsx_parce.get_components_from_xlxs(filename_old)[0])
+        self.new = compare_boms.normalize_bom(xlsx_parce.get_components_from_xlxs(filename_new)[0])
+        self.headers = xlsx_parce.get_file_headers(filename_new)
+        self.sheet = Workbook().active
+        get_xlsx_diff.find_new_pns(self.old, self.new, self.sheet, self.headers, True)
+
+    def get_cell(self, row, header):
+        return self.sheet.cell(row=row, column=self.headers[header])
+
+    def testRemoved(self):
+        removed = [row for row in range(2, self.sheet.max_row + 1)
+                   if self.get_cell(row, 'designator').fill.fgColor.rgb == '00FF0000'
+                   and self.get_cell(row, 'type').fill.fgColor.rgb == '00FF0000']
+        self.assertEqual(len(removed), len([record for record in compare_boms.get_bom_diff(self.old, self.new).records
+                                            if record.kind == diff_result.DiffKind.REMOVED]))
+        self.assertTrue('R62' in [self.get_cell(row, 'designator').value for row in removed])
+
+    def testQuantity(self):
+        rows = {(self.get_cell(row, 'value').value, self.get_cell(row, 'footprint').value): row
+                for row in range(2, self.sheet.max_row + 1)}
+        # 22R resistors: 13 in old BOM, 6 in new one
+        self.assertEqual(self.get_cell(rows[('22R', '0402')], 'quantity').fill.fgColor.rgb, '00FF0000')
+        # the same quantity of 1000R resistors
+        self.assertEqual(self.get_cell(rows[('1000R', '0402')], 'quantity').fill.fill_type, None)
+        # removed resistor is written with its value
+        self.assertEqual(self.get_cell(rows[('127000R', '0402')], 'designator').value, 'R62')
+
+
+class RevisionsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.old, _ = xlsx_parce.get_components_from_xlxs(filename_old)
+        self.new, _ = xlsx_parce.get_components_from_xlxs(filename_new)
+        self.matrix = revisions.get_revision_matrix([(filename_old, self.old), (filename_new, self.new),
+                                                     (filename_old, self.old)])
+
+    def testQuantities(self):
+        for (revision, components) in enumerate([self.old, self.new]):
+            self.assertEqual(sum(part.quantities[revision] or 0 for part in self.matrix.parts.values()),
+                             sum(len(component.designator) for component in components
+                                 if bom_index.get_part_key(component)[1]))
+        part = self.matrix.parts[(bom_index.pn_part, 'tlv62569pddc', 'ddc(r-pdso-g6)')]
+        self.assertEqual(part.quantities, [4, 2, 4])
+
+    def testAddedRemoved(self):
+        removed = self.matrix.parts[(bom_index.pn_part, 'wpm3401', 'sot23')]
+        self.assertEqual(removed.quantities, [1, None, 1])
+        self.assertEqual(removed.get_first_added(), 0)
+        self.assertEqual(removed.get_last_removed(), 1)
+        added = self.matrix.parts[(bom_index.pn_part, 'lmbr160ft1g', 'sod123-fl')]
+        self.assertEqual(added.quantities, [None, 1, None])
+        self.assertEqual(added.get_first_added(), 1)
+        self.assertEqual(added.get_last_removed(), 2)
+
+    def testRenderers(self):
+        stream = io.StringIO()
+        revisions.render_jsonl(self.matrix, stream)
+        lines = [json.loads(line) for line in stream.getvalue().splitlines()]
+        self.assertEqual(lines[0]['revisions'], [filename_old, filename_new, filename_old])
+        self.assertEqual(len(lines), len(self.matrix.parts) + 1)
+        stream = io.StringIO()
+        revisions.render_csv(self.matrix, stream)
+        rows = list(csv.reader(io.StringIO(stream.getvalue())))
+        self.assertEqual(len(rows), len(self.matrix.parts) + 1)
+        self.assertTrue(all(len(row) == 7 for row in rows))
+
+
+class DesignatorsTest(unittest.TestCase):
+
+    def testParseRanges(self):
+        parsed = designators.Designators.parse('C1-C4, C6,C7, R10-R12, X1A, C5')
+        self.assertEqual(list(parsed), ['C1', 'C2', 'C3', 'C4', 'C5', 'C6', 'C7', 'R10', 'R11', 'R12', 'X1A'])
+        self.assertEqual(str(parsed), 'C1-C7, R10-R12, X1A')
+        self.assertEqual(len(parsed), 11)
+
+    def testSubParts(self):
+        # range needs the same prefix at both ends, references of sub-parts are not ranges
+        parsed = designators.Designators.parse('U1-1, U1-2, U3-1, U2-4, R10-12, 1-3')
+        self.assertEqual(len(parsed), 6)
+        self.assertEqual(sorted(parsed), ['1-3', 'R10-12', 'U1-1', 'U1-2', 'U2-4', 'U3-1'])
+        self.assertTrue('U1-2' in parsed)
+        self.assertFalse('U2' in parsed)
+        self.assertEqual(designators.get_range('U1-U3'), ('U', 1, 3))
+        sub_parts = designators.Designators.parse('U1-1, U1-2, U1-3')
+        self.assertEqual(designators.Designators.parse(str(sub_parts)), sub_parts)
+
+    def testLeadingZeros(self):
+        parsed = designators.Designators.parse('R01, R1, R2')
+        self.assertEqual(len(parsed), 3)
+        self.assertTrue('R01' in parsed)
+        self.assertFalse('R3' in parsed)
+        self.assertEqual(str(parsed), 'R01, R1, R2')
+
+    def testDifference(self):
+        first = designators.Designators.parse('C1-C1000, R5, J1')
+        second = designators.Designators.parse('C10-C20, C500, R1-R4, J1')
+        self.assertEqual(str(first.difference(second)), 'C1-C9, C21-C499, C501-C1000, R5')
+        self.assertEqual(str(second.difference(first)), 'R1-R4')
+        self.assertEqual(len(first.difference(second)), len(set(first) - set(second)))
+
+    def testList(self):
+        references = ['R%i' % number for number in range(1, 2001)] + ['C3', 'C1']
+        compact = designators.Designators(references)
+        self.assertEqual(compact, references)
+        self.assertEqual(compact.ranges, {'R': [(1, 2000)], 'C': [(1, 1), (3, 3)]})
+        self.assertTrue('R1500' in compact)
+        copy = compact.copy()
+        copy.extend(['C2'])
+        self.assertEqual(str(copy), 'R1-R2000, C1-C3')
+        self.assertEqual(len(compact), 2002)
+
+    def testParsedComponents(self):
+        components, _ = xlsx_parce.get_components_from_xlxs(filename)
+        for component in components:
+            self.assertEqual(designators.Designators.parse(str(component.designator)), component.designator)
+
+
+class CacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.bom_dir = tempfile.mkdtemp()
+        self.bom = os.path.join(self.bom_dir, 'v2.1.xlsx')
+        shutil.copy(filename, self.bom)
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir)
+        shutil.rmtree(self.bom_dir)
+
+    def testCachedTheSame(self):
+        etalon = xlsx_parce.get_components_from_xlxs(self.bom)
+        self.assertEqual(bom_cache.get_components_cached(self.bom, self.cache_dir), etalon)
+        self.assertTrue(os.path.exists(bom_cache.get_entry_name(self.bom, self.cache_dir)))
+        self.assertEqual(bom_cache.get_components_cached(self.bom, self.cache_dir), etalon)
+
+    def testTouchedFile(self):
+        data, _ = bom_cache.get_components_cached(self.bom, self.cache_dir)
+        os.utime(self.bom, (0, 0))
+        self.assertEqual(bom_cache.get_components_cached(self.bom, self.cache_dir)[0], data)
+        self.assertEqual(bom_cache.read_entry(bom_cache.get_entry_name(self.bom, self.cache_dir))[2],
+                         os.stat(self.bom).st_mtime_ns)
+
+    def testChangedFile(self):
+        bom_cache.get_components_cached(self.bom, self.cache_dir)
+        shutil.copy(filename_old, self.bom)
+        data, _ = bom_cache.get_components_cached(self.bom, self.cache_dir)
+        self.assertEqual(len(data), len(xlsx_parce.get_components_from_xlxs(filename_old)[0]))
+
+    def testEviction(self):
+        bom_cache.get_components_cached(self.bom, self.cache_dir, max_size=0)
+        self.assertEqual(os.listdir(self.cache_dir), list())
+
+    def testEvictionOnce(self):
+        bom_cache.get_components_cached(self.bom, self.cache_dir, max_size=0, evict_entries=False)
+        self.assertEqual(len(os.listdir(self.cache_dir)), 1)
+        bom_cache.evict_cache(self.cache_dir, max_size=0)
+        self.assertEqual(os.listdir(self.cache_dir), list())
+        bom_cache.evict_cache(os.path.join(self.cache_dir, 'absent'))
+
+
+class WhereUsedTest(unittest.TestCase):
+
+    def setUp(self):
+        self.bom_dir = tempfile.mkdtemp()
+        self.bom = os.path.join(self.bom_dir, 'BOM_Test.xlsx')
+        shutil.copy(filename_duplicate, self.bom)
+        shutil.copy(filename, os.path.join(self.bom_dir, 'v2.1.xlsx'))
+        self.connection = where_used.connect(os.path.join(self.bom_dir, 'where_used.sqlite'))
+        self.changed, _ = where_used.update_index(self.connection, find_duplicates.get_bom_filenames(self.bom_dir),
+                                                  self.bom_dir)
+
+    def tearDown(self):
+        self.connection.close()
+        shutil.rmtree(self.bom_dir)
+
+    def testSkipUnchanged(self):
+        self.assertEqual(len(self.changed), 2)
+        self.assertEqual(where_used.update_index(self.connection, [self.bom], self.bom_dir),
+                         ([os.path.join(self.bom_dir, 'v2.1.xlsx')], ""))
+        self.assertEqual(where_used.update_index(self.connection, [self.bom])[0], list())
+        os.utime(self.bom, (0, 0))
+        self.assertEqual(where_used.update_index(self.connection, [self.bom])[0], list())
+
+    def testPn(self):
+        self.assertEqual([(os.path.basename(name), row) for (name, row, _, _, _, _) in
+                          where_used.find_pn(self.connection, 'tlv62569pddc')],
+                         [('BOM_Test.xlsx', 26), ('v2.1.xlsx', 25)])
+        self.assertEqual(where_used.find_pn(self.connection, 'unknown'), list())
+
+    def testValue(self):
+        self.assertEqual(where_used.get_value_keys('100n'), ['100000pf'])
+        self.assertEqual(where_used.get_value_keys('4k7'), ['4700R'])
+        self.assertEqual([(os.path.basename(name), row) for (name, row, _, _, _, _) in
+                          where_used.find_value(self.connection, '4k7', '0402')],
+                         [('BOM_Test.xlsx', 52), ('BOM_Test.xlsx', 53), ('v2.1.xlsx', 48)])
+
+    def testAlternatives(self):
+        self.assertEqual([(os.path.basename(name), row) for (name, row, _, _, _, _) in
+                          where_used.find_alternatives(self.connection, 'S905X2')],
+                         [('BOM_Test.xlsx', 19), ('v2.1.xlsx', 18)])
+        self.assertEqual([(os.path.basename(name), row) for (name, row, _, _, _, _) in
+                          where_used.find_alternatives(self.connection, 'AT24C01D‑MAHM‑E')],
+                         [('BOM_Test.xlsx', 23)])
+
+
+class DirectoryParceTest(unittest.TestCase):
+
+    def setUp(self):
+        self.cache_dir = bom_cache.cache_dir
+        bom_cache.cache_dir = ""
+        self.bom_dir = tempfile.mkdtemp()
+        for bom in [filename_new, filename_old, filename_duplicate]:
+            shutil.copy(bom, os.path.join(self.bom_dir, os.path.basename(bom.replace('\\', '/'))))
+        with open(os.path.join(self.bom_dir, 'broken.xlsx'), 'w') as f:
+            f.write('not a workbook')
+
+    def tearDown(self):
+        bom_cache.cache_dir = self.cache_dir
+        shutil.rmtree(self.bom_dir)
+
+    def testBrokenFileSkipped(self):
+        data, errors = find_duplicates.get_components_from_dir(self.bom_dir)
+        self.assertEqual(len(data), 65 + 73 + 69)
+        self.assertTrue('broken.xlsx skipped' in errors)
+
+    def testJobsTheSame(self):
+        self.assertEqual(find_duplicates.get_components_from_dir(self.bom_dir, jobs=2),
+                         find_duplicates.get_components_from_dir(self.bom_dir))
+
+    def testCountedParce(self):
+        result, stats = find_duplicates.parse_bom_counted(os.path.join(self.bom_dir, 'v2.1.xlsx'))
+        self.assertEqual(result, find_duplicates.parse_bom(os.path.join(self.bom_dir, 'v2.1.xlsx')))
+        self.assertEqual(set(stats.keys()), set(xlsx_parce.get_value_cache_stats().keys()))
+        self.assertTrue(sum(parcer['hits'] + parcer['misses'] for parcer in stats.values()) > 0)
+
+
+class MatchKeysTest(unittest.TestCase):
+
+    def setUp(self):
+        self.data, _ = xlsx_parce.get_components_from_xlxs(filename_duplicate)
+
+    def testKeys(self):
+        component = [component for component in self.data if component.row == 17][0]
+        self.assertEqual(component.pn_key, component.pn.lower())
+        self.assertEqual(component.type_code, component.component_type.value)
+
+    def testInterned(self):
+        first = [component for component in self.data if component.row == 17][0]
+        second = [component for component in self.data if component.row == 35][0]
+        self.assertIs(first.pn_key, second.pn_key)
+
+    def testCanonicalValue(self):
+        capacitors = [component for component in self.data if component.row in [2, 5]]
+        self.assertEqual(capacitors[0].value_key, '100000pf')
+        self.assertIs(capacitors[0].value_key, capacitors[1].value_key)
+        resistors = [component for component in self.data if component.row in [52, 53]]
+        self.assertEqual([resistor.value_key for resistor in resistors], ['4700R', '4700R'])
+
+    def testNoValue(self):
+        component = make_component(1, data_types.ComponentType.RESISTOR, pn='R1',
+                                   details=data_types.Resistor(value=-1, tolerance=1))
+        self.assertEqual(component.value_key, "")
+
+
+class ComponentTableTest(unittest.TestCase):
+
+    def setUp(self):
+        self.data, _ = xlsx_parce.get_components_from_xlxs(filename_duplicate)
+        self.table = component_table.get_table_from_files([filename_duplicate])
+
+    @unittest.skipIf(sys.version_info < (3, 10), "dataclasses have no slots")
+    def testSlots(self):
+        self.assertFalse(hasattr(self.data[0], '__dict__'))
+        self.assertFalse(hasattr(self.data[0].details, '__dict__'))
+
+    def testColumns(self):
+        self.assertEqual(len(self.table), len(self.data))
+        for (index, component) in enumerate(self.data):
+            self.assertEqual(self.table.get_pn(index), component.pn)
+            self.assertEqual(self.table.get_type(index), component.component_type)
+            self.assertEqual(self.table.get_designators(index), component.designator)
+            self.assertEqual(self.table.get_alternatives(index), component.pn_alt)
+
+    def testSharedStrings(self):
+        table = component_table.get_table_from_files([filename_duplicate, filename_duplicate])
+        self.assertEqual(len(table.strings), len(self.table.strings))
+
+    def testCompareCapacitors(self):
+        self.assertEqual(duplicates.compare_capacitors_table(self.table), duplicates.compare_capacitors(self.data))
+
+    def testCompareResistors(self):
+        self.assertEqual(duplicates.compare_resistors_table(self.table), duplicates.compare_resistors(self.data))
+        self.assertEqual([(row1, row2) for (_, _, row1, _, _, row2) in duplicates.compare_resistors_table(self.table)],
+                         [(52, 53), (55, 56)])
+
+    def testFootprintKeys(self):
+        table = component_table.ComponentTable()
+        for footprint in ['0402', '0402 ']:
+            table.append(make_component(2, data_types.ComponentType.RESISTOR, footprint=footprint,
+                                        filename='test.xlsx', details=data_types.Resistor(value=100, tolerance=1)))
+        self.assertEqual(duplicates.compare_resistors_table(table), [('test.xlsx', '100R', 2, 'test.xlsx', '100R', 2)])
+
+    def testCompListPrecise(self):
+        pns, _, _, inductors = compare_boms.get_comp_list_precise(self.data)
+        table_pns, _, _, table_inductors = compare_boms.get_comp_list_precise_table(self.table)
+        self.assertEqual(pns, table_pns)
+        self.assertEqual(inductors, table_inductors)
+
+
+class ComponentTableZeroTest(unittest.TestCase):
+
+    def setUp(self):
+        self.data = list()
+        for (row, comp_type, details) in [
+                (2, data_types.ComponentType.RESISTOR, data_types.Resistor(value=0, tolerance=1)),
+                (3, data_types.ComponentType.RESISTOR, data_types.Resistor(value=0, tolerance=1)),
+                (4, data_types.ComponentType.CAPACITOR, data_types.Capacitor(value=0, unit=data_types.CapUnits.PF,
+                                                                             absolute_pf_value=0, dielectric=[])),
+                (5, data_types.ComponentType.CAPACITOR, data_types.Capacitor(value=0, unit=data_types.CapUnits.PF,
+                                                                             absolute_pf_value=0, dielectric=[])),
+                (6, data_types.ComponentType.CAPACITOR, data_types.Capacitor(value=100, unit=data_types.CapUnits.PF,
+                                                                             absolute_pf_value=100, dielectric=[])),
+                (7, data_types.ComponentType.CAPACITOR, data_types.Capacitor(value=100, unit=data_types.CapUnits.PF,
+                                                                             absolute_pf_value=100, dielectric=[])),
+                (8, data_types.ComponentType.RESISTOR, data_types.Resistor(value=-1, tolerance=1))]:
+            self.data.append(make_component(row, comp_type, footprint='0402', filename='test.xlsx', details=details))
+        self.table = component_table.ComponentTable()
+        self.table.extend(self.data)
+
+    def testCompare(self):
+        self.assertEqual(duplicates.compare_resistors(self.data), [('test.xlsx', '0R', 2, 'test.xlsx', '0R', 3)])
+        self.assertEqual(duplicates.compare_resistors_table(self.table), duplicates.compare_resistors(self.data))
+        self.assertEqual(duplicates.compare_capacitors_table(self.table), duplicates.compare_capacitors(self.data))
+
+    def testCompListPrecise(self):
+        self.assertEqual(compare_boms.get_comp_list_precise(self.data)[:3],
+                         compare_boms.get_comp_list_precise_table(self.table)[:3])
+
+
+class WatchTest(unittest.TestCase):
+
+    def setUp(self):
+        self.cache_dir = bom_cache.cache_dir
+        bom_cache.cache_dir = ""
+        self.bom_dir = tempfile.mkdtemp()
+        shutil.copy(filename_duplicate, os.path.join(self.bom_dir, 'BOM_Test.xlsx'))
+        self.index = duplicate_index.DuplicateIndex()
+        self.mtimes = dict()
+        self.changed, _ = find_duplicates.update_index(self.bom_dir, self.index, self.mtimes)
+
+    def tearDown(self):
+        bom_cache.cache_dir = self.cache_dir
+        shutil.rmtree(self.bom_dir)
+
+    def testFindingsTheSame(self):
+        data, _ = xlsx_parce.get_components_from_xlxs(filename_duplicate)
+        findings = self.index.get_findings()
+        name = 'BOM_Test.xlsx'
+        self.assertEqual(findings['equal'], [(name, row1, name, row2) for (_, row1, _, _, row2, _)
+                                             in duplicates.compare_pns(data, 8, True)[0]])
+        self.assertEqual(findings['capacitors'], sorted((name, row1, name, row2) for (_, _, row1, _, _, row2)
+                                                        in duplicates.compare_capacitors(data)))
+        self.assertEqual(findings['resistors'], sorted((name, row1, name, row2) for (_, _, row1, _, _, row2)
+                                                       in duplicates.compare_resistors(data)))
+        self.assertEqual(findings['alternative'], [(name, 19, name, 23), (name, 30, name, 31)])
+        similar = duplicates.compare_pns(data, 8, False, 0)[1]
+        self.assertTrue(similar)
+        self.assertEqual(findings['similar'], sorted((name, min(row1, row2), name, max(row1, row2))
+                                                     for (_, row1, _, _, row2, _) in similar))
+
+    def testShortPnSimilar(self):
+        components = [make_component(row, data_types.ComponentType.CHIP, pn=pn, footprint=footprint,
+                                     filename='short.xlsx')
+                      for (row, pn, footprint) in [(2, 'LM358DR2G', 'SOIC-8'), (3, 'LM358', 'SOIC-8'),
+                                                   (4, 'LM358DT', 'soic-8 '), (5, 'LM358', 'SOT23'),
+                                                   (6, 'LM35', 'SO8')]]
+        index = duplicate_index.DuplicateIndex(8, 0)
+        index.update_file('short.xlsx', components)
+        pairs = sorted((min(row1, row2), max(row1, row2)) for (_, row1, _, _, row2, _)
+                       in duplicates.compare_pns(components, 8, False, 0)[1])
+        self.assertEqual(pairs, [(2, 3), (3, 4)])
+        self.assertEqual([(row1, row2) for (_, row1, _, row2) in index.get_findings(['short.xlsx'])['similar']],
+                         pairs)
+        index.remove_file('short.xlsx')
+        self.assertEqual(index.prefixes.pns, dict())
+
+    def testOnlyChangedParsed(self):
+        self.assertEqual(len(self.changed), 1)
+        shutil.copy(filename_old, os.path.join(self.bom_dir, 'V1.6.xlsx'))
+        changed, _ = find_duplicates.update_index(self.bom_dir, self.index, self.mtimes)
+        self.assertEqual(changed, [os.path.join(self.bom_dir, 'V1.6.xlsx')])
+        findings = self.index.get_findings(changed)
+        self.assertTrue(all('V1.6.xlsx' in (pair[0], pair[2]) for kind in duplicate_index.kinds
+                            for pair in findings[kind]))
+        self.assertTrue(findings['equal'])
+        self.assertEqual(find_duplicates.update_index(self.bom_dir, self.index, self.mtimes)[0], list())
+
+    def testRemovedFile(self):
+        os.remove(os.path.join(self.bom_dir, 'BOM_Test.xlsx'))
+        find_duplicates.update_index(self.bom_dir, self.index, self.mtimes)
+        self.assertEqual(self.index.get_findings(), {kind: list() for kind in duplicate_index.kinds})
+        self.assertEqual(self.index.pns, dict())
+        self.assertEqual(self.index.alt_grams.grams, dict())
+
+
+class DuplicateGroupsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.data = xlsx_parce.get_components_from_xlxs(filename_duplicate)[0]
+        self.groups = duplicates.get_duplicate_groups(self.data, 8)
+
+    def get_group(self, row: int) -> int:
+        return [number for (number, group) in enumerate(self.groups)
+                if row in [component.row for component in group.members]][0]
+
+    def testPairsInGroups(self):
+        equal, similar, alternative, _ = duplicates.compare_pns(self.data, 8, False)
+        pairs = [(row1, row2) for (_, row1, _, _, row2, _) in equal + similar + alternative]
+        pairs += [(row1, row2) for (_, _, row1, _, _, row2) in duplicates.compare_capacitors(self.data) +
+                  duplicates.compare_resistors(self.data)]
+        for (row1, row2) in pairs:
+            self.assertEqual(self.get_group(row1), self.get_group(row2))
+
+    def testLinks(self):
+        for group in self.groups:
+            self.assertEqual(len(group.links), len(group.members) - 1)
+        self.assertEqual([(group.members[0].row, group.members[1].row, group.links[0][2]) for group in self.groups
+                          if group.links[0][2] in ['equal', 'alternative', 'similar']],
+                         [(17, 35, 'equal'), (19, 23, 'alternative'), (30, 31, 'similar')])
+
+    def testShortPn(self):
+        components = [make_component(row, data_types.ComponentType.CHIP, pn=pn, footprint='SOIC-8')
+                      for (row, pn) in [(2, 'LM358DR2G'), (3, 'LM358'), (4, 'LM358DT'), (5, 'LM358DR2G')]]
+        groups = duplicates.get_duplicate_groups(components, 8, 0)
+        self.assertEqual([[component.row for component in group.members] for group in groups], [[2, 3, 4, 5]])
+        self.assertEqual(sorted(reason for (_, _, reason) in groups[0].links), ['equal', 'similar', 'similar'])
+
+    def testDisjointSet(self):
+        disjoint = duplicates.DisjointSet(5)
+        self.assertTrue(disjoint.union(0, 1))
+        self.assertTrue(disjoint.union(3, 1))
+        self.assertFalse(disjoint.union(0, 3))
+        self.assertEqual(disjoint.find(3), disjoint.find(0))
+        self.assertNotEqual(disjoint.find(2), disjoint.find(0))
+
+
+class PrefixIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        self.index = pn_index.PrefixIndex()
+        for (item, pn) in enumerate(sorted(['GRM155R71C104KA88D', 'GRM155R71C105KA88D', 'GRM188R71C104KA01D',
+                                            'KX-6', 'KX-6 25.0 MHz'])):
+            self.index.add(pn, 'footprint', item)
+
+    def testPrefixLen(self):
+        self.assertEqual(self.index.get_items('GRM', 'footprint'), [0, 1, 2])
+        self.assertEqual(self.index.get_items('GRM155', 'footprint'), [0, 1])
+        self.assertEqual(self.index.get_items('GRM155R71C104', 'footprint'), [0])
+        self.assertEqual(self.index.get_items('KX-6', 'footprint', 3), [4])
+        self.assertEqual(self.index.get_items('GRM', 'other footprint'), list())
+        self.assertEqual(self.index.get_items('', 'footprint', 2), [3, 4])
+
+    def testInsertRemove(self):
+        index = pn_index.PrefixIndex()
+        for (item, pn) in [(7, 'KX-6'), (3, 'GRM155'), (5, 'KX-6'), (1, 'KX-6 25.0 MHz')]:
+            index.insert(pn, 'footprint', item)
+        self.assertEqual(index.pns['footprint'], ['GRM155', 'KX-6', 'KX-6', 'KX-6 25.0 MHz'])
+        self.assertEqual(index.get_items('KX', 'footprint'), [5, 7, 1])
+        self.assertEqual(index.get_equal_items('KX-6', 'footprint'), [5, 7])
+        index.remove('KX-6', 'footprint', 7)
+        index.remove('KX-6', 'footprint', 8)
+        self.assertEqual(index.get_items('KX', 'footprint'), [5, 1])
+
+
+class ResistorToleranceTest(unittest.TestCase):
+
+    def setUp(self):
+        self.data = list()
+        for (row, value, tolerance, footprint) in [(2, 4990, 0.01, '0402'), (3, 5100, '5%', '0402'),
+                                                   (4, 4700, 0.01, '0402'), (5, 5100, 1, '0603'),
+                                                   (6, 5110, None, '0402')]:
+            self.data.append(make_component(row, data_types.ComponentType.RESISTOR, footprint=footprint,
+                                            filename='test.xlsx',
+                                            details=data_types.Resistor(value=value, tolerance=tolerance)))
+
+    def testTolerance(self):
+        self.assertEqual(data_types.get_tolerance(data_types.Resistor(100, 0.05)), 0.05)
+        self.assertEqual(data_types.get_tolerance(data_types.Resistor(100, '1%, [NoValue]')), 0.01)
+        self.assertEqual(data_types.get_tolerance(data_types.Resistor(100, 5)), 0.05)
+        self.assertEqual(data_types.get_tolerance(data_types.Resistor(100, None)), 0)
+        # text is in percents without «%» too
+        self.assertEqual(data_types.get_tolerance(data_types.Resistor(100, '0.5')), 0.005)
+        self.assertEqual(data_types.get_tolerance(data_types.Resistor(100, '5')), 0.05)
+
+    def testSeries(self):
+        self.assertEqual(data_types.get_series_value(4990, 'e24'), 5100)
+        self.assertEqual(data_types.get_series_value(4990, 'e96'), 4990)
+        self.assertEqual(data_types.get_series_value(9.9, 'e24'), 10)
+        self.assertEqual(data_types.get_series_value(0.47, 'e24'), 0.47)
+
+    def testBands(self):
+        self.assertEqual([(row1, row2) for (_, _, row1, _, _, row2) in
+                          duplicates.compare_resistors_tolerance(self.data)], [(2, 3), (3, 6)])
+        self.assertEqual([(row1, row2) for (_, _, row1, _, _, row2) in
+                          duplicates.compare_resistors_tolerance(self.data, 'e24')], [(2, 3), (2, 6), (3, 6)])
+
+    def testOverlappingPairs(self):
+        intervals = [(1, 3), (2, 4), (5, 6), (0, 10), (4, 4.5)]
+        self.assertEqual(sorted(duplicates.get_overlapping_pairs(intervals)),
+                         sorted([(3, 0), (0, 1), (3, 1), (3, 2), (3, 4), (1, 4)]))
+
+
+class ValueGroupsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.data = xlsx_parce.get_components_from_xlxs(filename_duplicate)[0]
+        self.table = component_table.ComponentTable()
+        self.table.extend(self.data)
+
+    def tearDown(self):
+        value_groups.use_numpy = True
+
+    def get_results(self):
+        return (duplicates.compare_capacitors(self.data), duplicates.compare_resistors(self.data),
+                duplicates.compare_capacitors_table(self.table), duplicates.compare_resistors_table(self.table))
+
+    def testGroups(self):
+        self.assertEqual(value_groups.get_groups([1, 1, 1, 0, 1, 1], [10, 4.7, 10, 10, float('nan'), 10],
+                                                 [0, 0, 0, 0, 0, 1], 1), [[0, 2]])
+        self.assertEqual(value_groups.get_groups([0, 0, 0], [0, 0, 5], [2, 2, 2], 0), [[0, 1]])
+        self.assertEqual(value_groups.get_groups([0, 0, 0], [0, 0, 5], [2, 2, 2], 0, skip_zero=True), list())
+
+    def testPythonGroups(self):
+        results = self.get_results()
+        value_groups.use_numpy = False
+        self.assertEqual(self.get_results(), results)
+
+    def testWithoutNumpy(self):
+        numpy_module = sys.modules.get('numpy')
+        value_groups.import_numpy.cache_clear()
+        sys.modules['numpy'] = None
+        try:
+            self.assertIsNone(value_groups.get_numpy())
+            self.assertEqual(len(duplicates.compare_resistors(self.data)), 2)
+        finally:
+            if numpy_module is None:
+                sys.modules.pop('numpy')
+            else:
+                sys.modules['numpy'] = numpy_module
+            value_groups.import_numpy.cache_clear()
+
+    def testTableColumns(self):
+        groups = value_groups.get_table_groups(self.table, data_types.ComponentType.RESISTOR)
+        self.assertEqual(groups, value_groups.get_component_groups(self.data, data_types.ComponentType.RESISTOR))
+        # cached columns are made again for added components
+        self.table.extend(self.data)
+        self.assertEqual(value_groups.get_table_groups(self.table, data_types.ComponentType.RESISTOR),
+                         value_groups.get_component_groups(self.data * 2, data_types.ComponentType.RESISTOR))
+        self.assertEqual(len(self.table.numpy_columns[0]) if self.table.numpy_columns else 0,
+                         len(self.table) if value_groups.get_numpy() is not None else 0)
+
+
+class FuzzyTest(unittest.TestCase):
+
+    def setUp(self):
+        self.data = list()
+        for (row, pn, value) in [(2, 'GRM155R71C104KA88D', 100000), (3, 'GRM155R71C104KA88J', 100000),
+                                 (4, 'GRM155R71C105KA88D', 1000000), (5, 'GRM155R17C104KA88D', 100000),
+                                 (6, 'grm155r71c104ka88d', 100000)]:
+            self.data.append(make_component(row, data_types.ComponentType.CAPACITOR, pn=pn, footprint='0402',
+                                            filename='test.xlsx',
+                                            details=data_types.Capacitor(value / 1000, data_types.CapUnits.N,
+                                                                         value, list())))
+
+    def testEditDistance(self):
+        self.assertEqual(pn_index.get_edit_distance('GRM155R71C104KA88D', 'GRM155R71C104KA88J'), 1)
+        # transposition of adjacent symbols is one edit
+        self.assertEqual(pn_index.get_edit_distance('GRM155R71C104KA88D', 'GRM155R17C104KA88D'), 1)
+        self.assertEqual(pn_index.get_edit_distance('GRM155R71C104KA88D', 'GRM155R71C140KA88D'), 1)
+        self.assertEqual(pn_index.get_edit_distance('ca', 'abc'), 3)
+        self.assertEqual(pn_index.get_edit_distance('KX-6', 'KX-6 '), 1)
+        self.assertEqual(pn_index.get_edit_distance('', 'abc'), 3)
+
+    def testDeletionIndex(self):
+        index = pn_index.DeletionIndex(1)
+        for key in ['abcd', 'abd', 'abce', 'xbcd', 'ab']:
+            index.add(key)
+        self.assertEqual(index.search('abcd'), [(0, 0), (1, 1), (2, 1), (3, 1)])
+        self.assertEqual(index.search('ac'), [(4, 1)])
+        self.assertEqual(index.search('xyz'), list())
+
+    def testFuzzyPns(self):
+        # transposition is 1 edit, different values are not compared
+        self.assertEqual([(row1, row2) for (_, row1, _, _, row2, _) in duplicates.compare_pns_fuzzy(self.data, 1)],
+                         [(2, 3), (2, 5), (3, 6), (5, 6)])
+        self.assertEqual([(row1, row2) for (_, row1, _, _, row2, _) in duplicates.compare_pns_fuzzy(self.data, 2)],
+                         [(2, 3), (2, 5), (3, 5), (3, 6), (5, 6)])
+
+    def testFuzzyGroups(self):
+        for component in self.data:
+            component.component_type = data_types.ComponentType.CHIP
+            component.details = None
+            data_types.set_match_keys(component)
+        groups = duplicates.get_duplicate_groups(self.data, max_distance=1)
+        self.assertEqual([[component.row for component in group.members] for group in groups], [[2, 3, 4, 5, 6]])
+        # 88J and 105 pns are similar by root, transposed R17C is found by fuzzy search only
+        self.assertEqual(groups[0].links, [(0, 4, 'equal'), (0, 1, 'similar'), (0, 2, 'similar'), (0, 3, 'fuzzy')])
+        links = duplicates.get_duplicate_groups(self.data, tail_len=4, max_distance=1)[0].links
+        self.assertEqual(links, [(0, 4, 'equal'), (0, 2, 'similar'), (0, 1, 'fuzzy'), (0, 3, 'fuzzy')])
+
+
+class AhoCorasickTest(unittest.TestCase):
+
+    def setUp(self):
+        self.automaton = pn_index.AhoCorasick()
+        for pattern in ['he', 'she', 'his', 'hers', 'GRM155']:
+            self.automaton.add(pattern)
+        self.automaton.build()
+
+    def testSearch(self):
+        self.assertEqual({self.automaton.patterns[pattern_id] for pattern_id in self.automaton.search('ushers')},
+                         {'he', 'she', 'hers'})
+        self.assertEqual(self.automaton.search('GRM155R71C104KA88D'), {4})
+        self.assertEqual(self.automaton.search('GRM15'), set())
+
+    def testSameAsSubstrings(self):
+        components = xlsx_parce.get_components_from_xlxs(filename_duplicate)[0]
+        automaton = pn_index.AhoCorasick()
+        pns = sorted({component.pn for component in components if component.pn})
+        for pn in pns:
+            automaton.add(pn)
+        automaton.build()
+        for alt in [alt for component in components for alt in component.pn_alt]:
+            self.assertEqual({automaton.patterns[pattern_id] for pattern_id in automaton.search(alt)},
+                             {pn for pn in pns if pn in alt})
+
+
+class GramIndexTest(unittest.TestCase):
+
+    def testSameAsSubstrings(self):
+        components = xlsx_parce.get_components_from_xlxs(filename_duplicate)[0]
+        index = pn_index.GramIndex()
+        alts = {alt for component in components for alt in component.pn_alt}
+        for alt in alts:
+            index.add(alt)
+        for pn in {component.pn for component in components} | {'', 'GR', 'X'}:
+            self.assertEqual(set(index.search(pn)), {alt for alt in alts if pn in alt})
+
+    def testRemove(self):
+        index = pn_index.GramIndex()
+        for text in ['GRM155R71C104', 'GRM188R61A105', 'GRM155']:
+            index.add(text)
+        index.remove('GRM155R71C104')
+        index.remove('absent')
+        self.assertEqual(sorted(index.search('GRM1')), ['GRM155', 'GRM188R61A105'])
+        self.assertEqual(index.search('R71C'), list())
+
+
+class StartupTest(unittest.TestCase):
+
+    def testLazyImports(self):
+        for module in bench_startup.budgets.keys():
+            self.assertEqual(bench_startup.get_lazy_modules_loaded(module), list())
+
+
 class TestPNDescription(unittest.TestCase):
 
     def setUp(self):
@@ -0,0 +1,117 @@
+# service module for grouping capacitors and resistors by value and footprint
+# components are given as columns: type codes, values and footprint ids, groups are lists of component indexes
+# NumPy lexsort is used if NumPy is installed, otherwise components are sorted in python
+# NumPy is imported at first grouping only to keep start fast
+# columns of component table are converted to NumPy arrays once, so table is grouped again without building columns
+
+from functools import lru_cache
+from itertools import groupby
+from typing import List, Sequence, Optional, Any, Dict
+
+import data_types
+from component_table import ComponentTable
+
+# set False to group in python even if NumPy is installed
+use_numpy: bool = True
+
+
+@lru_cache(maxsize=1)
+def import_numpy() -> Optional[Any]:
+    """
+    imports NumPy once
+    :return: numpy module or None if it is not installed
+    """
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+
+def get_numpy() -> Optional[Any]:
+    """
+    gets NumPy for grouping
+    :return: numpy module or None if it is not installed or not used
+    """
+    return import_numpy() if use_numpy else None
+
+
+def get_groups(type_codes: Sequence[int], values: Sequence[float], footprint_ids: Sequence[int], type_code: int,
+               skip_zero: bool = False) -> List[List[int]]:
+    """
+    groups components of type by value and footprint, components without value (nan) are not grouped
+    :param type_codes: type codes of components
+    :param values: values of components
+    :param footprint_ids: footprint ids of components
+    :param type_code: type code of components to group
+    :param skip_zero: do not group components with zero value
+    :return: groups of two and more indexes in the order of value and footprint id, indexes increase in group
+    """
+    numpy = get_numpy()
+    if numpy is None:
+        indexes: List[int] = [index for index in range(len(type_codes)) if type_codes[index] == type_code
+                              and values[index] == values[index] and (values[index] or not skip_zero)]
+        indexes.sort(key=lambda x: (values[x], footprint_ids[x]))
+        groups: List[List[int]] = [list(group) for (_, group) in
+                                   groupby(indexes, key=lambda x: (values[x], footprint_ids[x]))]
+        return [group for group in groups if len(group) > 1]
+    type_array = numpy.asarray(type_codes)
+    value_array = numpy.asarray(values, dtype=numpy.float64)
+    footprint_array = numpy.asarray(footprint_ids)
+    mask = (type_array == type_code) & (value_array == value_array)
+    if skip_zero:
+        mask &= value_array != 0
+    indexes = numpy.flatnonzero(mask)
+    if not len(indexes):
+        return list()
+    # lexsort is stable and sorts by the last key first
+    indexes = indexes[numpy.lexsort((footprint_array[indexes], value_array[indexes]))]
+    sorted_values = value_array[indexes]
+    sorted_footprints = footprint_array[indexes]
+    changed = (sorted_values[1:] != sorted_values[:-1]) | (sorted_footprints[1:] != sorted_footprints[:-1])
+    starts = numpy.concatenate(([0], numpy.flatnonzero(changed) + 1))
+    ends = numpy.append(starts[1:], len(indexes))
+    big = ends - starts > 1
+    return [indexes[start:end].tolist() for (start, end) in zip(starts[big].tolist(), ends[big].tolist())]
+
+
+def get_component_groups(components: List[data_types.Component], comp_type: data_types.ComponentType) \
+        -> List[List[int]]:
+    """
+    groups components of type by value key and footprint key, components without value key are not grouped
+    :param components: list of components
+    :param comp_type: capacitor or resistor
+    :return: groups of two and more indexes of components
+    """
+    footprint_ids: Dict[str, int] = dict()
+    type_codes: List[int] = list()
+    values: List[float] = list()
+    footprints: List[int] = list()
+    for component in components:
+        type_codes.append(component.type_code)
+        footprints.append(footprint_ids.setdefault(component.footprint_key, len(footprint_ids)))
+        if component.type_code != comp_type.value or not component.value_key:
+            values.append(float('nan'))
+        elif comp_type == data_types.ComponentType.CAPACITOR:
+            values.append(float(component.details.absolute_pf_value))
+        else:
+            values.append(float(component.details.value))
+    return get_groups(type_codes, values, footprints, comp_type.value)
+
+
+def get_table_groups(table: ComponentTable, comp_type: data_types.ComponentType) -> List[List[int]]:
+    """
+    groups components of table by value and footprint key, NumPy arrays of table columns are cached in table
+    until component is added
+    :param table: component table
+    :param comp_type: capacitor or resistor
+    :return: groups of two and more indexes of components
+    """
+    numpy = get_numpy()
+    if numpy is None:
+        return get_groups(table.type_codes, table.values, table.footprint_key_ids, comp_type.value)
+    if table.numpy_columns is None:
+        table.numpy_columns = (numpy.array(table.type_codes), numpy.array(table.values, dtype=numpy.float64),
+                               numpy.array(table.footprint_key_ids))
+    type_array, value_array, footprint_array = table.numpy_columns
+    return get_groups(type_array, value_array, footprint_array, comp_type.value)
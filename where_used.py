@@ -0,0 +1,205 @@
+# service module, persistent where-used index of all project BOMs in SQLite database
+# components are stored with their pns, alternative pns, canonical values and footprints, so questions like
+# "where is pn used" or "every 100n 0402 capacitor" are answered by database indexes without parcing BOMs
+# BOM is indexed again only if its size and mtime or content hash are changed
+
+import os
+import sqlite3
+from typing import List, Tuple, Optional, Set
+
+import bom_cache
+import data_types
+import xlsx_parce
+
+# bump if tables change, old database is recreated then
+index_version = 3
+default_db = os.path.join(os.path.expanduser('~'), '.cache', 'duplicate_bom', 'where_used.sqlite')
+
+# filename, row, pn, footprint, value, designators
+UsedRow = Tuple[str, int, str, str, str, str]
+
+schema: List[str] = [
+    "CREATE TABLE IF NOT EXISTS files (id INTEGER PRIMARY KEY, filename TEXT UNIQUE, size INTEGER, "
+    "mtime_ns INTEGER, hash TEXT)",
+    "CREATE TABLE IF NOT EXISTS components (file_id INTEGER, row INTEGER, type_code INTEGER, pn TEXT, pn_key TEXT, "
+    "footprint TEXT, footprint_key TEXT, value_key TEXT, designators TEXT)",
+    "CREATE TABLE IF NOT EXISTS alternatives (file_id INTEGER, row INTEGER, pn_key TEXT, alt_key TEXT)",
+    "CREATE INDEX IF NOT EXISTS components_pn ON components (pn_key)",
+    "CREATE INDEX IF NOT EXISTS components_value ON components (value_key, footprint_key)",
+    "CREATE INDEX IF NOT EXISTS components_file ON components (file_id, row)",
+    "CREATE INDEX IF NOT EXISTS alternatives_alt ON alternatives (alt_key)",
+    "CREATE INDEX IF NOT EXISTS alternatives_pn ON alternatives (pn_key)",
+    "CREATE INDEX IF NOT EXISTS alternatives_file ON alternatives (file_id)",
+]
+
+
+def connect(db_name: str = default_db) -> sqlite3.Connection:
+    """
+    opens where-used database, creates tables if they are absent
+    :param db_name: name of database file
+    :return: connection
+    """
+    directory: str = os.path.dirname(os.path.abspath(db_name))
+    os.makedirs(directory, exist_ok=True)
+    connection = sqlite3.connect(db_name)
+    version: int = connection.execute("PRAGMA user_version").fetchone()[0]
+    if version != index_version:
+        for table in ['files', 'components', 'alternatives']:
+            connection.execute("DROP TABLE IF EXISTS %s" % table)
+        connection.execute("PRAGMA user_version = %i" % index_version)
+    for statement in schema:
+        connection.execute(statement)
+    connection.commit()
+    return connection
+
+
+def remove_file(connection: sqlite3.Connection, file_id: int):
+    """
+    removes BOM components from database
+    :param connection: database connection
+    :param file_id: id of BOM
+    :return:
+    """
+    connection.execute("DELETE FROM components WHERE file_id = ?", (file_id,))
+    connection.execute("DELETE FROM alternatives WHERE file_id = ?", (file_id,))
+    connection.execute("DELETE FROM files WHERE id = ?", (file_id,))
+
+
+def index_file(connection: sqlite3.Connection, filename: str) -> Tuple[bool, str]:
+    """
+    adds BOM components to database if BOM was changed since last indexing
+    :param connection: database connection
+    :param filename: name of BOM
+    :return: True if BOM was indexed, error str
+    """
+    filename = os.path.abspath(filename)
+    stat = os.stat(filename)
+    stored: Optional[Tuple[int, int, int, str]] = connection.execute(
+        "SELECT id, size, mtime_ns, hash FROM files WHERE filename = ?", (filename,)).fetchone()
+    if stored and stored[1] == stat.st_size and stored[2] == stat.st_mtime_ns:
+        return False, ""
+    file_hash: str = bom_cache.get_file_hash(filename)
+    if stored and stored[3] == file_hash:
+        connection.execute("UPDATE files SET size = ?, mtime_ns = ? WHERE id = ?",
+                           (stat.st_size, stat.st_mtime_ns, stored[0]))
+        return False, ""
+    try:
+        components, _ = bom_cache.get_components_cached(filename)
+    except Exception as e:
+        return False, "File %s skipped: %s\n" % (filename, e)
+    if stored:
+        remove_file(connection, stored[0])
+    file_id: int = connection.execute("INSERT INTO files (filename, size, mtime_ns, hash) VALUES (?, ?, ?, ?)",
+                                      (filename, stat.st_size, stat.st_mtime_ns, file_hash)).lastrowid
+    connection.executemany("INSERT INTO components VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                           [(file_id, component.row, component.type_code, component.pn, component.pn_key,
+                             component.footprint, component.footprint_key, component.value_key,
+                             str(component.designator)) for component in components])
+    connection.executemany("INSERT INTO alternatives VALUES (?, ?, ?, ?)",
+                           [(file_id, component.row, component.pn_key, alt.lower()) for component in components
+                            for alt in component.pn_alt])
+    return True, ""
+
+
+def update_index(connection: sqlite3.Connection, filenames: List[str], path: Optional[str] = None) \
+        -> Tuple[List[str], str]:
+    """
+    indexes changed BOMs, BOMs of path that do not exist anymore are removed from database
+    :param connection: database connection
+    :param filenames: names of BOMs
+    :param path: directory of BOMs, None to not remove absent BOMs
+    :return: names of indexed or removed BOMs, errors str
+    """
+    changed: List[str] = list()
+    errors: str = ""
+    with connection:
+        for filename in filenames:
+            indexed, error = index_file(connection, filename)
+            errors += error
+            if indexed:
+                changed.append(filename)
+        if path is not None:
+            existing: Set[str] = {os.path.abspath(filename) for filename in filenames}
+            directory: str = os.path.join(os.path.abspath(path), '')
+            for (file_id, filename) in connection.execute("SELECT id, filename FROM files").fetchall():
+                if filename.startswith(directory) and filename not in existing:
+                    remove_file(connection, file_id)
+                    changed.append(filename)
+    return changed, errors
+
+
+def get_rows(connection: sqlite3.Connection, condition: str, parameters: Tuple, tables: str = "components c") \
+        -> List[UsedRow]:
+    """
+    gets components by condition
+    :param connection: database connection
+    :param condition: sql condition on components table c
+    :param parameters: parameters of condition
+    :param tables: tables with components table c
+    :return: list of (filename, row, pn, footprint, value, designators) sorted by filename and row
+    """
+    return connection.execute("SELECT f.filename, c.row, c.pn, c.footprint, c.value_key, c.designators "
+                              "FROM %s JOIN files f ON f.id = c.file_id WHERE %s "
+                              "ORDER BY f.filename, c.row" % (tables, condition), parameters).fetchall()
+
+
+def find_pn(connection: sqlite3.Connection, pn: str) -> List[UsedRow]:
+    """
+    finds where pn is used
+    :param connection: database connection
+    :param pn: pn, case is ignored
+    :return: list of (filename, row, pn, footprint, value, designators)
+    """
+    return get_rows(connection, "c.pn_key = ?", (pn.strip().lower(),))
+
+
+def get_value_keys(value: str) -> List[str]:
+    """
+    gets canonical values of capacitor and resistor for value str
+    :param value: value like 100n, 4k7 or 100
+    :return: list of value keys, capacitor first
+    """
+    keys: List[str] = list()
+    _, _, absolute_pf_value = xlsx_parce.parse_capacitor_value(value.strip().lower())
+    if absolute_pf_value:
+        keys.append(data_types.format_value(absolute_pf_value) + 'pf')
+    resistor_value = xlsx_parce.get_resistor_value(value.strip().lower())
+    if resistor_value is not None:
+        keys.append(data_types.format_value(resistor_value) + 'R')
+    return keys
+
+
+def find_value(connection: sqlite3.Connection, value: str, footprint: str) -> List[UsedRow]:
+    """
+    finds capacitors and resistors with value and footprint
+    :param connection: database connection
+    :param value: value like 100n, 4k7 or 100
+    :param footprint: footprint, case is ignored
+    :return: list of (filename, row, pn, footprint, value, designators)
+    """
+    keys: List[str] = get_value_keys(value)
+    if not keys:
+        return list()
+    return get_rows(connection, "c.value_key IN (%s) AND c.footprint_key = ?" % ', '.join('?' * len(keys)),
+                    (*keys, footprint.strip().lower()))
+
+
+def find_alternatives(connection: sqlite3.Connection, pn: str) -> List[UsedRow]:
+    """
+    finds components which are alternatives of pn: components with pn listed as alternative of pn and
+    components with pn in alternatives
+    :param connection: database connection
+    :param pn: pn, case is ignored
+    :return: list of (filename, row, pn, footprint, value, designators)
+    """
+    pn_key: str = pn.strip().lower()
+    alternatives: Set[str] = {alt_key for (alt_key,) in
+                              connection.execute("SELECT alt_key FROM alternatives WHERE pn_key = ?", (pn_key,))}
+    alternatives.discard(pn_key)
+    rows: Set[UsedRow] = set()
+    if alternatives:
+        rows.update(get_rows(connection, "c.pn_key IN (%s)" % ', '.join('?' * len(alternatives)),
+                             tuple(alternatives)))
+    rows.update(get_rows(connection, "a.alt_key = ?", (pn_key,),
+                         "alternatives a JOIN components c ON c.file_id = a.file_id AND c.row = a.row"))
+    return sorted(rows)
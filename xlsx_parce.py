@@ -1,32 +1,62 @@
 # service module, xlsx BOM file parcing for find_duplicates
 
-from openpyxl import Workbook
-from openpyxl import load_workbook, worksheet
-from typing import List, Optional, Union, Tuple, Any, Dict
+from typing import List, Optional, Union, Tuple, Any, Dict, Iterator, TYPE_CHECKING
 from string import ascii_uppercase
+import io
 import os
-from openpyxl.styles import PatternFill, Border, Side, Alignment, Protection, Font
+import re
+import csv
+from functools import lru_cache
 
 import data_types
+from designators import Designators
+from diagnostics import Diagnostics, WarningCode
+
+# openpyxl is imported only when xlsx file is read, csv and cached BOMs do not need it
+if TYPE_CHECKING:
+    from openpyxl.worksheet.worksheet import Worksheet
 
 headers = ['type', 'pn', 'manufacturer', 'pn alternative 1', 'pn alternative 2', 'designator', 'footprint',
            'dielectric', 'value', 'voltage', 'tolerance', 'description', 'ref', 'reference', 'quantity']
 recommended = ['type', 'pn', 'designator', 'footprint', 'value']
+# columns with numeric cells in xlsx, text in these columns of csv files is converted to numbers
+numeric_headers = ['value', 'tolerance', 'quantity']
+# BOM extensions with reader delimiters for text BOMs
+delimiters = {'.csv': ',', '.tsv': '\t'}
+bom_extensions = ['.xlsx'] + list(delimiters.keys())
+# encodings of text BOMs in the order of trying, latin-1 reads any bytes
+csv_encodings = ['utf-8-sig', 'cp1251', 'latin-1']
+number_grammar = re.compile(r'-?\d+(?:\.\d+)?')
 multiplier = {'m': 6, 'k': 3, 'r': 0}
-warning = ""
+multiplier_cap = {'u': 6, 'n': 3, 'p': 0}
+capacitor_prefixes = {'u': data_types.CapUnits.U, 'n': data_types.CapUnits.N, 'p': data_types.CapUnits.PF}
+resistor_units = ['', 'r', 'ohm', 'ω']
+capacitor_units = ['', 'f']
+# value grammar: digits, unit letter, digits after unit letter (fraction), unit: 4k7, 0r01, 2u2F, 1.5pF, 10kOhm
+value_grammar = re.compile(r'(?P<head>\d*(?:\.\d*)?)\s*(?P<prefix>[pnumkr]?)(?P<tail>\d*)\s*(?P<unit>f|ohm|ω)?')
+# max number of memoized value strings for every value parcer
+value_cache_size = 4096
+# hits and misses of value parcers of other processes (find_duplicates --jobs) by parcer name
+added_cache_stats: Dict[str, Dict[str, int]] = dict()
 
 Row = Tuple[Any, int, Dict[str, Optional[Any]]]
 
 
-def get_value(key: str, sheet: worksheet, row: int,  header_index: Dict[str, Optional[int]]) -> str:
+def get_value(key: str, sheet: 'Worksheet', row: int,  header_index: Dict[str, Optional[int]]) -> str:
     """
     gets value from sheet row by the key
+    sheet may be a tuple of row values (read only mode), header_index has tuple offsets then
     :param row: row of value
     :param key: key of header
-    :param sheet: sheet with data
+    :param sheet: sheet with data or tuple with row values
     :param header_index: list of header indexes
     :return: value
     """
+    if isinstance(sheet, tuple):
+        offset: Optional[int] = header_index[key]
+        if offset is not None and offset < len(sheet):
+            return sheet[offset]
+        return ""
     if header_index[key] and sheet.cell(row=row, column=header_index[key]):
         return sheet.cell(row=row, column=header_index[key]).value
     return ""
@@ -59,6 +89,55 @@ def get_component_type_by_footprint(footprint_str: str) -> data_types.ComponentT
     return data_types.ComponentType.OTHER
 
 
+def get_scaled_value(head: str, tail: str, exponent: int) -> Union[float, int]:
+    """
+    gets value from digits before and after unit letter (4k7: head 4, tail 7)
+    value is float for str with . and int for others
+    :param head: digits before unit letter
+    :param tail: digits after unit letter
+    :param exponent: power of 10 for unit letter
+    :return: value
+    """
+    digits: str = head + tail
+    value: Union[float, int] = float(digits) if '.' in digits else int(digits)
+    # 47r != 4r7: digits after the letter are fraction
+    exponent -= len(tail)
+    return value * 10 ** exponent if exponent >= 0 else value / 10 ** -exponent
+
+
+@lru_cache(maxsize=value_cache_size)
+def parse_value(value_str: str) -> Optional[Tuple[str, str, str, str]]:
+    """
+    parces value string by value grammar
+    :param value_str: value from BOM: 4k7, 100n, 4u7, 2u2F, 1.5pF, 0R
+    :return: digits before unit letter, unit letter, digits after unit letter, unit or None if value is incorrect
+    """
+    value_str = value_str.replace(',', '.').replace('µ', 'u').replace('μ', 'u').strip().lower()
+    match = value_grammar.fullmatch(value_str)
+    if not match or not any(symbol.isdigit() for symbol in match.group('head') + match.group('tail')):
+        return None
+    # digits after unit letter are fraction, so there is no other fraction and unit letter is required
+    if match.group('tail') and ('.' in match.group('head') or not match.group('prefix')):
+        return None
+    return match.group('head'), match.group('prefix'), match.group('tail'), match.group('unit') or ''
+
+
+@lru_cache(maxsize=value_cache_size)
+def parse_resistor_value(resistor_str: str) -> Optional[Union[float, int]]:
+    """
+    converts str value of resistor to float, memoized
+    :param resistor_str: value from BOM
+    :return: value in ohms or None
+    """
+    parsed: Optional[Tuple[str, str, str, str]] = parse_value(resistor_str)
+    if not parsed:
+        return None
+    head, prefix, tail, unit = parsed
+    if (prefix and prefix not in multiplier) or unit not in resistor_units:
+        return None
+    return get_scaled_value(head, tail, multiplier.get(prefix, 0))
+
+
 def get_resistor_value(resistor_str: str) -> Optional[Union[float, int]]:
     """
     converts str value of fesistor to float
@@ -75,23 +154,25 @@ def get_resistor_value(resistor_str: str) -> Optional[Union[float, int]]:
     # if resistor_str is already a digital value return itself
     if isinstance(resistor_str, float) or isinstance(resistor_str, int):
         return resistor_str
-    resistor_str = resistor_str.replace(',', '.').lower()
-    # we have float value for str with . and int for others
-    convert = float if '.' in resistor_str else int
-    for key in multiplier.keys():
-        if key in resistor_str:
-            try:
-                # get a digital value,  multiply it according unit letter (r, k, m) and it place in string (47r != 4r7)
-                index = resistor_str.index(key)
-                tail = len(resistor_str) - index
-                value = convert(resistor_str[:index] + resistor_str[index + 1:])
-                return value * 10 ** (multiplier[key] - tail + 1)
-            except ValueError:
-                return None
-    try:
-        return convert(resistor_str)
-    except ValueError:
-        return None
+    return parse_resistor_value(resistor_str)
+
+
+@lru_cache(maxsize=value_cache_size)
+def parse_capacitor_value(capacitor_str: str) -> Tuple[Optional[Union[int, float]], Optional[data_types.CapUnits],
+                                                       Optional[Union[int, float]]]:
+    """
+    converts str value of capacitor to value, unit and absolute value in pfs, memoized
+    :param capacitor_str: value from BOM
+    :return: value, unit, absolute value in pfs or Nones
+    """
+    parsed: Optional[Tuple[str, str, str, str]] = parse_value(capacitor_str)
+    if not parsed:
+        return None, None, None
+    head, prefix, tail, unit = parsed
+    if prefix not in multiplier_cap or unit not in capacitor_units:
+        return None, None, None
+    value: Union[float, int] = get_scaled_value(head, tail, 0)
+    return value, capacitor_prefixes[prefix], 10 ** multiplier_cap[prefix] * value
 
 
 def get_capacitor_value_and_unit(capacitor_str: str) -> Tuple[Optional[Union[int, float]],
@@ -100,29 +181,49 @@ def get_capacitor_value_and_unit(capacitor_str: str) -> Tuple[Optional[Union[int
                                                               Optional[Union[int, float]]]:
     """
     gets capacitor value, unit and dielectric
-    unit is nf, uf (micro) or pf
+    unit is nf, uf (micro) or pf, 4n7 and 2u2F are 4.7nf and 2.2uf
     dielectric is X5R or X7R for uf and nf and np0 for pf
     :param capacitor_str: string with capacitor description
     :return: value, unit and dielectric or None, absolute value in pfs
     """
-    capacitor_str = capacitor_str.replace(',', '.').lower()
-    # we have float value for str with . and int for others
-    convert = float if '.' in capacitor_str else int
-    try:
-        if 'pf' in capacitor_str:
-            value = convert(capacitor_str.replace("pf", ""))
-            return value, data_types.CapUnits.PF, [data_types.Dielectric.NP0], value
-        capacitor_str = capacitor_str.replace('µ', 'u')
-        capacitor_str = capacitor_str.replace('f', '')
-        if 'u' in capacitor_str:
-            value = convert(capacitor_str.replace("u", ""))
-            return value, data_types.CapUnits.U, [data_types.Dielectric.X5R, data_types.Dielectric.X7R], 10**6*value
-        if 'n' in capacitor_str:
-            value = convert(capacitor_str.replace("n", ""))
-            return value, data_types.CapUnits.N, [data_types.Dielectric.X5R, data_types.Dielectric.X7R], 10**3*value
-    except ValueError:
+    if not capacitor_str or not isinstance(capacitor_str, str):
+        return None, None, None, None
+    value, unit, abs_value = parse_capacitor_value(capacitor_str)
+    if unit is None:
         return None, None, None, None
-    return None, None, None, None
+    if unit == data_types.CapUnits.PF:
+        return value, unit, [data_types.Dielectric.NP0], abs_value
+    return value, unit, [data_types.Dielectric.X5R, data_types.Dielectric.X7R], abs_value
+
+
+def get_value_cache_stats() -> Dict[str, Dict[str, Union[int, float]]]:
+    """
+    gets hits, misses, size and hit rate of memoized value parcers, hits and misses of other processes are added
+    by add_value_cache_stats, size is size of cache of this process
+    :return: statistics by parcer name
+    """
+    stats: Dict[str, Dict[str, Union[int, float]]] = dict()
+    for (name, parcer) in [('grammar', parse_value), ('resistor', parse_resistor_value),
+                           ('capacitor', parse_capacitor_value)]:
+        info = parcer.cache_info()
+        added: Dict[str, int] = added_cache_stats.get(name, dict())
+        hits: int = info.hits + added.get('hits', 0)
+        misses: int = info.misses + added.get('misses', 0)
+        stats[name] = {'hits': hits, 'misses': misses, 'size': info.currsize,
+                       'hit_rate': hits / (hits + misses) if hits + misses else 0.0}
+    return stats
+
+
+def add_value_cache_stats(stats: Dict[str, Dict[str, Union[int, float]]]):
+    """
+    adds hits and misses of value parcers of other process to statistics of this process
+    :param stats: hits and misses by parcer name
+    :return:
+    """
+    for (name, parcer_stats) in stats.items():
+        added: Dict[str, int] = added_cache_stats.setdefault(name, {'hits': 0, 'misses': 0})
+        added['hits'] += int(parcer_stats['hits'])
+        added['misses'] += int(parcer_stats['misses'])
 
 
 def get_footprint_data(footprint_str: str, comp_type: data_types.ComponentType) -> str:
@@ -150,26 +251,37 @@ def get_footprint_data(footprint_str: str, comp_type: data_types.ComponentType)
     return footprint_str_new
 
 
-def get_headers(sheet: Workbook) -> Dict[str, Optional[int]]:
+def get_headers(sheet: 'Worksheet', diagnostics: Optional[Diagnostics] = None) -> Dict[str, Optional[int]]:
     """
     get header indexes
+    :param diagnostics: warning collector
     :param sheet: sheet with data
     :return:
     """
-    header_index: Dict[str, Optional[str]] = dict.fromkeys(headers, None)
-    for col in ascii_uppercase:
-        col_header: str = sheet['%s1' % col].value
-        if col_header and col_header.lower() in headers:
-            header_index[col_header.lower()] = ascii_uppercase.index(col) + 1
+    return get_headers_from_values(tuple(sheet['%s1' % col].value for col in ascii_uppercase), diagnostics)
+
+
+def get_headers_from_values(header_row: Tuple[Any, ...], diagnostics: Optional[Diagnostics] = None) \
+        -> Dict[str, Optional[int]]:
+    """
+    get header indexes from values of the first row
+    :param diagnostics: warning collector
+    :param header_row: values of header row
+    :return:
+    """
+    header_index: Dict[str, Optional[int]] = dict.fromkeys(headers, None)
+    for (col, col_header) in enumerate(header_row[:len(ascii_uppercase)]):
+        if col_header and isinstance(col_header, str) and col_header.lower() in headers:
+            header_index[col_header.lower()] = col + 1
     if not header_index['designator']:
         if header_index['ref']:
             header_index['designator'] = header_index['ref']
         elif header_index['reference']:
             header_index['designator'] = header_index['reference']
     absent_headers: List[str] = [header for header in recommended if not header_index[header]]
-    if absent_headers:
-        global warning
-        warning = 'The following columns are recommended but absent: ' + ', '.join(absent_headers) + '\n'
+    if absent_headers and diagnostics is not None:
+        diagnostics.add(WarningCode.ABSENT_HEADERS,
+                        'The following columns are recommended but absent: ' + ', '.join(absent_headers) + '\n')
     return header_index
 
 
@@ -186,9 +298,10 @@ def get_resistor_data(row_addr: Row) -> data_types.Resistor:
     return resistor
 
 
-def get_capacitor_data(row_addr: Row) -> data_types.Capacitor:
+def get_capacitor_data(row_addr: Row, diagnostics: Optional[Diagnostics] = None) -> data_types.Capacitor:
     """
     get capacitor data from bom row
+    :param diagnostics: warning collector
     :param row_addr: row address
     :return:
     """
@@ -200,8 +313,10 @@ def get_capacitor_data(row_addr: Row) -> data_types.Capacitor:
         for new_dielectric in dielectric_bom.replace("or ", "").lower().split():
             if new_dielectric not in data_types.dielectrics or\
                     data_types.Dielectric(data_types.dielectrics.index(new_dielectric)) not in dielectric:
-                global warning
-                warning += 'Dielectric from BOM does not match capacitor value in %i row\n' % row_addr[1]
+                if diagnostics is not None:
+                    diagnostics.add(WarningCode.DIELECTRIC_MISMATCH,
+                                    'Dielectric from BOM does not match capacitor value in %i row\n' % row_addr[1],
+                                    row_addr[1])
     try:
         voltage = float(get_value('voltage', *row_addr).lower().replace("v", ""))
     except (ValueError, AttributeError):
@@ -215,9 +330,10 @@ def get_capacitor_data(row_addr: Row) -> data_types.Capacitor:
     return capacitor
 
 
-def validate_and_repair(component: data_types.Component):
+def validate_and_repair(component: data_types.Component, diagnostics: Optional[Diagnostics] = None):
     """
     validates component, prints warning, returns corrected component
+    :param diagnostics: warning collector
     :param component: component to validate
     :return: corrected component
     """
@@ -226,7 +342,7 @@ def validate_and_repair(component: data_types.Component):
         errors += "Unknown type\n"
     if not component.designator:
         errors += 'No designators\n'
-        component.designator = list()
+        component.designator = Designators()
     if not component.description:
         component.description = ""
     if not component.pn_alt:
@@ -258,10 +374,10 @@ def validate_and_repair(component: data_types.Component):
                     or (component.component_type == data_types.ComponentType.INDUCTOR and not component.pn):
                 errors += "No %s value\n" % type_str
                 component.details.value = -1
-    if errors:
-        global warning
-        warning += 'Component in row %i file %s  is incorrect: ' % (component.row, component.filename)
-        warning += errors
+    if errors and diagnostics is not None:
+        diagnostics.add(WarningCode.INCORRECT_COMPONENT,
+                        'Component in row %i file %s  is incorrect: ' % (component.row, component.filename) + errors,
+                        component.row)
 
 
 def check_for_not_used(row_addr: Row) -> bool:
@@ -270,6 +386,8 @@ def check_for_not_used(row_addr: Row) -> bool:
     :param row_addr: information about sheei and row
     :return: true or false
     """
+    if isinstance(row_addr[0], tuple):
+        return any(value and "not used" in str(value).lower() for value in row_addr[0])
     for i in range(1, row_addr[0].max_column+1):
         cell = row_addr[0].cell(row=row_addr[1], column=i)
         if cell.value and "not used" in str(cell.value).lower():
@@ -300,7 +418,7 @@ def get_main_comp_data(row_addr: Row) -> Optional[data_types.Component]:
     # remove empty alternative pns
     pn_alternative = [x for x in pn_alternative if x]
     designator_raw: str = get_value('designator', *row_addr)
-    designator: List[str] = designator_raw.split(', ') if designator_raw else list()
+    designator: Designators = Designators.parse(str(designator_raw)) if designator_raw else Designators()
     if not designator and not pn and (not footprint or footprint == 'None'):
         return None
     component = data_types.Component(row=row_addr[1], component_type=comp_type, footprint=footprint,
@@ -311,33 +429,173 @@ def get_main_comp_data(row_addr: Row) -> Optional[data_types.Component]:
     return component
 
 
-def get_components_from_xlxs(filename) -> Tuple[List[data_types.Component], str]:
+def get_offsets(header_index: Dict[str, Optional[int]]) -> Dict[str, Optional[int]]:
     """
-    parce Bom to get component list
+    converts header indexes (columns from 1) to offsets in row value tuples
+    :param header_index: header indexes
+    :return: header offsets
+    """
+    return {key: column - 1 if column else None for (key, column) in header_index.items()}
+
+
+def get_rows(filename: str, read_only: bool, diagnostics: Optional[Diagnostics] = None) -> Iterator[Row]:
+    """
+    yields row addresses of BOM data rows
+    in read only mode workbook is streamed and every row is read once as a tuple of values
+    :param diagnostics: warning collector
     :param filename: name of BOM
-    :return: component list, warning str
+    :param read_only: use openpyxl read only mode
+    :return: row addresses
     """
-    global warning
-    warning = ""
-    wb = load_workbook(filename=filename)
+    from openpyxl import load_workbook
+    wb = load_workbook(filename=filename, read_only=read_only)
     sheet = wb.active
+    if not read_only:
+        header_index: Dict[str, Optional[int]] = get_headers(sheet, diagnostics)
+        for row in range(2, sheet.max_row + 1):
+            yield sheet, row, header_index
+        return
+    try:
+        rows = sheet.iter_rows(values_only=True)
+        header_row: Tuple[Any, ...] = next(rows, ())
+        offsets: Dict[str, Optional[int]] = get_offsets(get_headers_from_values(header_row, diagnostics))
+        for (row, values) in enumerate(rows, start=2):
+            yield values, row, offsets
+    finally:
+        wb.close()
+
+
+def read_csv_text(filename: str, diagnostics: Optional[Diagnostics] = None) -> str:
+    """
+    reads text BOM in the first of csv_encodings that decodes it, BOM that is not utf-8 is reported
+    :param diagnostics: warning collector
+    :param filename: name of BOM
+    :return: text of BOM
+    """
+    with open(filename, 'rb') as f:
+        data: bytes = f.read()
+    for encoding in csv_encodings:
+        try:
+            text: str = data.decode(encoding)
+        except UnicodeDecodeError:
+            continue
+        if encoding != csv_encodings[0] and diagnostics is not None:
+            diagnostics.add(WarningCode.ENCODING, "File %s is not utf-8, it is read as %s\n" % (filename, encoding))
+        return text
+    return data.decode(csv_encodings[-1], errors='replace')
+
+
+def get_csv_rows(filename: str, diagnostics: Optional[Diagnostics] = None) -> Iterator[Row]:
+    """
+    yields row addresses of csv/tsv BOM data rows as tuples of values
+    empty cells are None and numbers in numeric columns are int or float like in xlsx sheets
+    :param diagnostics: warning collector
+    :param filename: name of BOM
+    :return: row addresses
+    """
+    delimiter: str = delimiters[os.path.splitext(filename)[1].lower()]
+    with io.StringIO(read_csv_text(filename, diagnostics), newline='') as f:
+        reader = csv.reader(f, delimiter=delimiter)
+        header_row: Tuple[Any, ...] = tuple(next(reader, ()))
+        offsets: Dict[str, Optional[int]] = get_offsets(get_headers_from_values(header_row, diagnostics))
+        numeric_offsets: List[int] = [offsets[key] for key in numeric_headers if offsets[key] is not None]
+        for (row, cells) in enumerate(reader, start=2):
+            values: List[Any] = [cell if cell else None for cell in cells]
+            for offset in numeric_offsets:
+                if offset < len(values) and values[offset] and number_grammar.fullmatch(values[offset]):
+                    values[offset] = float(values[offset]) if '.' in values[offset] else int(values[offset])
+            yield tuple(values), row, offsets
+
+
+def get_components_from_rows(filename: str, rows: Iterator[Row], diagnostics: Diagnostics) \
+        -> Tuple[List[data_types.Component], str]:
+    """
+    gets component list from BOM rows
+    :param filename: name of BOM
+    :param rows: row addresses of BOM
+    :param diagnostics: warning collector of the BOM
+    :return: component list, warning str
+    """
     result: List[data_types.Component] = list()
-    header_index:  Dict[str, Optional[int]] = get_headers(sheet)
-    for row in range(2, sheet.max_row+1):
-        row_addr: Row = (sheet, row, header_index)
+    for row_addr in rows:
+        row: int = row_addr[1]
         component: data_types.Component = get_main_comp_data(row_addr)
         if not component:
-            warning += "Row %i filename %s not used, skipped\n" % (row, filename)
+            diagnostics.add(WarningCode.NOT_USED, "Row %i filename %s not used, skipped\n" % (row, filename), row)
             continue
         component.filename = os.path.basename(filename)
         if component.component_type == data_types.ComponentType.RESISTOR:
             component.details = get_resistor_data(row_addr)
         elif component.component_type == data_types.ComponentType.CAPACITOR:
-            component.details = get_capacitor_data(row_addr)
+            component.details = get_capacitor_data(row_addr, diagnostics)
         elif component.component_type == data_types.ComponentType.INDUCTOR:
             component.details = data_types.Inductor(value=get_value('value', *row_addr))
-        validate_and_repair(component)
+        validate_and_repair(component, diagnostics)
+        data_types.set_match_keys(component)
         result.append(component)
+    warning: str = diagnostics.render()
     if warning:
         warning = 'WARNINGS FOR %s:\n' % filename.upper() + warning
     return result, warning
+
+
+def get_components_from_xlxs(filename, read_only: bool = False, diagnostics: Optional[Diagnostics] = None) \
+        -> Tuple[List[data_types.Component], str]:
+    """
+    parce Bom to get component list
+    :param diagnostics: warning collector, gets all warnings of the BOM
+    :param read_only: stream workbook rows as value tuples (faster for big BOMs, same result)
+    :param filename: name of BOM
+    :return: component list, warning str
+    """
+    file_diagnostics = Diagnostics(filename)
+    result = get_components_from_rows(filename, get_rows(filename, read_only, file_diagnostics), file_diagnostics)
+    if diagnostics is not None:
+        diagnostics.extend(file_diagnostics)
+    return result
+
+
+def get_components_from_csv(filename, diagnostics: Optional[Diagnostics] = None) \
+        -> Tuple[List[data_types.Component], str]:
+    """
+    parce csv or tsv Bom to get component list
+    :param diagnostics: warning collector, gets all warnings of the BOM
+    :param filename: name of BOM
+    :return: component list, warning str
+    """
+    file_diagnostics = Diagnostics(filename)
+    result = get_components_from_rows(filename, get_csv_rows(filename, file_diagnostics), file_diagnostics)
+    if diagnostics is not None:
+        diagnostics.extend(file_diagnostics)
+    return result
+
+
+def get_components_from_file(filename, diagnostics: Optional[Diagnostics] = None) \
+        -> Tuple[List[data_types.Component], str]:
+    """
+    parce xlsx, csv or tsv Bom to get component list, reader is selected by file extension
+    :param diagnostics: warning collector, gets all warnings of the BOM
+    :param filename: name of BOM
+    :return: component list, warning str
+    """
+    if os.path.splitext(filename)[1].lower() in delimiters:
+        return get_components_from_csv(filename, diagnostics)
+    return get_components_from_xlxs(filename, read_only=True, diagnostics=diagnostics)
+
+
+def get_file_headers(filename: str) -> Dict[str, Optional[int]]:
+    """
+    get header indexes of xlsx, csv or tsv BOM
+    :param filename: name of BOM
+    :return: header indexes
+    """
+    extension: str = os.path.splitext(filename)[1].lower()
+    if extension in delimiters:
+        with io.StringIO(read_csv_text(filename), newline='') as f:
+            return get_headers_from_values(tuple(next(csv.reader(f, delimiter=delimiters[extension]), ())))
+    from openpyxl import load_workbook
+    wb = load_workbook(filename=filename, read_only=True)
+    try:
+        return get_headers_from_values(next(wb.active.iter_rows(max_row=1, values_only=True), ()))
+    finally:
+        wb.close()